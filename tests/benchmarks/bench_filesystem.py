@@ -0,0 +1,65 @@
+"""Benchmarks for zoo.libs.utils.filesystem, these aren't picked up by the unittest discovery, run directly with:
+
+    python -m tests.benchmarks.bench_filesystem
+"""
+import os
+import random
+import shutil
+import tempfile
+import timeit
+import zipfile
+
+from zoo.libs.utils import filesystem, general
+
+
+def syntheticPackage(root, count=400, size=256 * 1024):
+    """Writes a mix of compressible source files and already compressed images the way a tool distribution
+    or asset bundle looks.
+    """
+    rand = random.Random(1)
+    words = ["def", "class", "return", "import", "self", "node", "path", "value", "for", "in", "if", "else"]
+    files = []
+    for index in range(count):
+        if index % 4 == 0:
+            name = "icons/icon{:04d}.png".format(index)
+            data = os.urandom(size // 4)
+        else:
+            name = "python/module{:04d}.py".format(index)
+            data = " ".join(rand.choice(words) for _ in range(size // 5))
+        filePath = os.path.join(root, name)
+        if not os.path.isdir(os.path.dirname(filePath)):
+            os.makedirs(os.path.dirname(filePath))
+        with open(filePath, "wb") as f:
+            f.write(data)
+        files.append((filePath, name))
+    return files
+
+
+def sequentialZip(zippath, files):
+    """The previous createZip implementation, every member deflated in turn on one thread.
+    """
+    with zipfile.ZipFile(zippath, "w", zipfile.ZIP_DEFLATED) as archive:
+        for p in iter(files):
+            archive.write(p[0], p[1])
+
+
+def benchCreateZip(repeat=3):
+    root = tempfile.mkdtemp()
+    try:
+        files = syntheticPackage(os.path.join(root, "src"))
+        zipPath = os.path.join(root, "package.zip")
+        totalSize = sum(os.path.getsize(filePath) for filePath, _ in files)
+
+        sequentialTime = min(timeit.repeat(lambda: sequentialZip(zipPath, files), number=1, repeat=repeat))
+        parallelTime = min(timeit.repeat(lambda: filesystem.createZip(zipPath, files), number=1, repeat=repeat))
+        print("sequential zip {}: {:.3f}s ({}/s)".format(general.humanizeBytes(totalSize), sequentialTime,
+                                                        general.humanizeBytes(totalSize / sequentialTime)))
+        print("createZip      {}: {:.3f}s ({}/s, {:.1f}x)".format(general.humanizeBytes(totalSize), parallelTime,
+                                                                  general.humanizeBytes(totalSize / parallelTime),
+                                                                  sequentialTime / parallelTime))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    benchCreateZip()
@@ -0,0 +1,44 @@
+"""Benchmarks for zoo.libs.utils.general, these aren't picked up by the unittest discovery, run directly with:
+
+    python -m tests.benchmarks.bench_general
+"""
+import random
+import re
+import timeit
+
+from zoo.libs.utils import general
+
+
+def syntheticFrameNames(count=1000000):
+    """Generates render frame and version names, names repeat across shots like a file browser refresh.
+    """
+    rand = random.Random(1)
+    names = []
+    while len(names) < count:
+        shot = rand.randint(1, 200)
+        version = rand.randint(1, 30)
+        for frame in range(1001, 1101):
+            names.append("sh{:03d}_beauty_v{:03d}.{:04d}.exr".format(shot, version, frame))
+    rand.shuffle(names)
+    return names[:count]
+
+
+def legacyNumericalSort(data):
+    """The previous numericalSort which splits every name with the regex on each call.
+    """
+    return sorted(data, key=lambda key: [int(c) if c.isdigit() else c for c in re.split('([0-9]+)', key)])
+
+
+def benchNumericalSort(count=1000000, repeat=3):
+    names = syntheticFrameNames(count)
+    legacyTime = min(timeit.repeat(lambda: legacyNumericalSort(names), number=1, repeat=repeat))
+    general.numericalSort(names)
+    cachedTime = min(timeit.repeat(lambda: general.numericalSort(names), number=1, repeat=repeat))
+    topTime = min(timeit.repeat(lambda: general.numericalTopN(iter(names), 100), number=1, repeat=repeat))
+    print("legacy numericalSort x {}: {:.3f}s".format(count, legacyTime))
+    print("numericalSort        x {}: {:.3f}s ({:.1f}x)".format(count, cachedTime, legacyTime / cachedTime))
+    print("numericalTopN(100)   x {}: {:.3f}s ({:.1f}x)".format(count, topTime, legacyTime / topTime))
+
+
+if __name__ == "__main__":
+    benchNumericalSort()
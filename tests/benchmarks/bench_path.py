@@ -0,0 +1,46 @@
+"""Benchmarks for zoo.libs.utils.path, these aren't picked up by the unittest discovery, run directly with:
+
+    python -m tests.benchmarks.bench_path
+"""
+import timeit
+
+from zoo.libs.utils import path
+
+
+def syntheticTexturePaths(count=100000):
+    """Generates texture paths which share env variables and directory prefixes the same way a publish does.
+    """
+    channels = ("diffuse", "specular", "roughness", "normal", "displacement",
+                "metalness", "coat", "emission", "opacity", "subsurface")
+    paths = []
+    asset = 0
+    while len(paths) < count:
+        for channel in channels:
+            for udim in range(1001, 1101):
+                paths.append("%ZOO_BENCH_ROOT%/assets/char{0:03d}/publish/textures/{1}/{1}_{2}.exr".format(asset,
+                                                                                                         channel,
+                                                                                                         udim))
+        asset += 1
+    return paths[:count]
+
+
+def benchResolveMany(count=100000, repeat=3):
+    env = {"ZOO_BENCH_ROOT": "%ZOO_BENCH_DRIVE%/projects/show", "ZOO_BENCH_DRIVE": "//server/share"}
+    paths = syntheticTexturePaths(count)
+
+    def single():
+        for p in paths:
+            path.resolveAndSplit(p, env)
+
+    def many():
+        for _ in path.resolveMany(paths, env):
+            pass
+
+    singleTime = min(timeit.repeat(single, number=1, repeat=repeat))
+    manyTime = min(timeit.repeat(many, number=1, repeat=repeat))
+    print("resolveAndSplit x {}: {:.3f}s".format(count, singleTime))
+    print("resolveMany     x {}: {:.3f}s ({:.1f}x)".format(count, manyTime, singleTime / manyTime))
+
+
+if __name__ == "__main__":
+    benchResolveMany()
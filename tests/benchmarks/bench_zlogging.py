@@ -0,0 +1,81 @@
+"""Benchmarks for zoo.libs.utils.zlogging, these aren't picked up by the unittest discovery, run directly with:
+
+    python -m tests.benchmarks.bench_zlogging
+"""
+import datetime
+import logging
+import platform
+import timeit
+
+import jsonlogger
+from zoo.libs.utils import zlogging
+
+
+class LegacyZooJsonFormatter(jsonlogger.JsonFormatter):
+    """The previous ZooJsonFormatter which merges the static fields into every record and calls json.dumps.
+    """
+
+    def __init__(self, fmt="%(message)", datefmt="%Y-%m-%dT%H:%M:%SZ%z", extra={}, *args, **kwargs):
+        self._extra = extra
+        jsonlogger.JsonFormatter.__init__(self, fmt=fmt, datefmt=datefmt, *args, **kwargs)
+
+    def add_fields(self, log_record, record, message_dict):
+        for field in self._required_fields:
+            log_record[field] = record.__dict__.get(field)
+        log_record.update(message_dict)
+        jsonlogger.merge_record_extra(record, log_record, reserved=self._skip_fields)
+
+        if self.timestamp:
+            key = self.timestamp if type(self.timestamp) == str else 'timestamp'
+            log_record[key] = datetime.datetime.now().isoformat()
+        for key, value in self._extra.items():
+            log_record[key] = value
+
+
+def syntheticRecords(count=1000):
+    records = []
+    for index in range(count):
+        record = logging.LogRecord("zoo.commands", logging.INFO, "/zoo/libs/command/base.py", 120,
+                                   "Executed command %s in %.3fs", ("zoo.nodes.create", index * 0.001), None,
+                                   "execute")
+        record.commandId = "zoo.nodes.create"
+        record.frame = index
+        records.append(record)
+    return records
+
+
+def benchFormat(count=20000, repeat=3):
+    extra = {"machine": platform.node(), "platform": platform.platform(), "application": "maya",
+             "applicationVersion": "2018", "user": "artist"}
+    fmt = zlogging.CentralLogManager().jsonFormatter
+    records = syntheticRecords(count)
+    results = []
+    for label, formatter in (("legacy", LegacyZooJsonFormatter(fmt, extra=extra, timestamp=True)),
+                             ("current", zlogging.ZooJsonFormatter(fmt, extra=extra, timestamp=True)),
+                             ("ordered", zlogging.ZooJsonFormatter(fmt, extra=extra, timestamp=True,
+                                                                   orderedFields=True))):
+        seconds = min(timeit.repeat(lambda: [formatter.format(record) for record in records], number=1,
+                                    repeat=repeat))
+        results.append(seconds)
+        print("{:<8} {:>10.0f} records/s".format(label, count / seconds))
+    print("speedup  {:>10.1f}x".format(results[0] / results[1]))
+    print("ordered  {:>10.1f}x".format(results[0] / results[2]))
+
+
+def benchDisabledDebug(count=1000000, repeat=3):
+    logger = zlogging.getLogger("zoo.benchmarks.disabled")
+    logger.setLevel(logging.INFO)
+    zlogging.invalidateLevelCache()
+    lazy = zlogging.LazyLogger(logger)
+    name = "zoo.nodes.create"
+    eagerTime = min(timeit.repeat(lambda: logger.debug("registering plugin -> {}".format(name)), number=count,
+                                  repeat=repeat))
+    lazyTime = min(timeit.repeat(lambda: lazy.debug("registering plugin -> {}", name), number=count,
+                                 repeat=repeat))
+    print("eager debug x {}: {:.3f}s".format(count, eagerTime))
+    print("lazy debug  x {}: {:.3f}s ({:.1f}x)".format(count, lazyTime, eagerTime / lazyTime))
+
+
+if __name__ == "__main__":
+    benchFormat()
+    benchDisabledDebug()
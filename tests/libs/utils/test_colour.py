@@ -0,0 +1,66 @@
+import random
+import unittest
+
+from zoo.libs.utils import colour
+
+
+class TestColourArrays(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(1)
+        self.colours = [[rand.random() for _ in range(3)] for _ in range(200)]
+        self.colours.extend([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0], [0.5, 0.5, 0.5], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+        self.intColours = [[rand.randint(0, 255) for _ in range(3)] + [128] for _ in range(200)]
+
+    def assertColoursEqual(self, first, second, places=12):
+        self.assertEquals(len(first), len(second))
+        for colA, colB in zip(first, second):
+            self.assertEquals(len(colA), len(colB))
+            for a, b in zip(colA, colB):
+                self.assertAlmostEqual(float(a), float(b), places=places)
+
+    def test_srgbLinear(self):
+        self.assertColoursEqual(colour.convertSrgbArrayToLinear(self.colours),
+                                [colour.convertColorSrgbToLinear(c) for c in self.colours])
+        self.assertColoursEqual(colour.convertLinearArrayToSrgb(self.colours),
+                                [colour.convertColorLinearToSrgb(c) for c in self.colours])
+
+    def test_alphaPassThrough(self):
+        result = colour.convertSrgbArrayToLinear([[0.5, 0.5, 0.5, 0.25]])
+        self.assertEquals(float(result[0][3]), 0.25)
+
+    def test_hsvRgb(self):
+        hsv = [colour.convertRgbToHsv(c) for c in self.colours]
+        self.assertColoursEqual(colour.convertRgbArrayToHsv(self.colours), hsv)
+        self.assertColoursEqual(colour.convertHsvArrayToRgb(hsv), [colour.convertHsvToRgb(c) for c in hsv])
+
+    def test_hslOffsets(self):
+        for offsets in ((30, 0, 0), (-50, 0.2, 0), (0, -0.3, 0.1), (400, 0.1, -0.2)):
+            self.assertColoursEqual(colour.hslColourOffsetFloatArray(self.colours, *offsets),
+                                    [colour.hslColourOffsetFloat(c, *offsets) for c in self.colours])
+        for offsets in ((30, 20, 0), (-50, 0, -30)):
+            self.assertColoursEqual(colour.hslColourOffsetIntArray(self.intColours, *offsets),
+                                    [list(colour.hslColourOffsetInt(c[:3], *offsets)) + [128]
+                                     for c in self.intColours])
+
+    def test_hueShift(self):
+        self.assertColoursEqual(colour.hueShiftArray(self.intColours, 45),
+                                [list(colour.hueShift(c[:3], 45)) + [128] for c in self.intColours])
+
+    def test_srgb8LookupTables(self):
+        for value in range(256):
+            self.assertEquals(colour.convertSingleSrgb8ToLinear(value),
+                              colour.convertSingleSrgbToLinear(value / 255.0))
+            self.assertEquals(colour.convertSingleLinear8ToSrgb(value),
+                              colour.convertSingleLinearToSrgb(value / 255.0))
+        result = colour.convertSrgb8ArrayToLinear([c[:3] for c in self.intColours])
+        self.assertColoursEqual(result, [colour.convertColorSrgb8ToLinear(c) for c in self.intColours])
+
+    def test_linearToSrgb8(self):
+        for value in range(1001):
+            value /= 1000.0
+            expected = int(colour.convertSingleLinearToSrgb(value) * 255.0 + 0.5)
+            self.assertTrue(abs(colour.convertSingleLinearToSrgb8(value) - expected) <= 1)
+        self.assertEquals(colour.convertSingleLinearToSrgb8(1.0), 255)
+        self.assertEquals(colour.convertSingleLinearToSrgb8(-1.0), 0)
+        result = colour.convertLinearArrayToSrgb8(self.colours)
+        self.assertColoursEqual(result, [colour.convertColorLinearToSrgb8(c) for c in self.colours])
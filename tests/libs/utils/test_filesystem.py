@@ -0,0 +1,497 @@
+import errno
+import json
+import os
+import shutil
+import StringIO
+import tempfile
+import unittest
+import zipfile
+
+from zoo.libs.utils import filesystem
+
+
+class TestBatchRename(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def createFiles(self, *names):
+        result = []
+        for name in names:
+            filePath = os.path.join(self.root, name)
+            with open(filePath, "w") as f:
+                f.write(name)
+            result.append(filePath)
+        return result
+
+    def contents(self):
+        result = {}
+        for name in os.listdir(self.root):
+            with open(os.path.join(self.root, name)) as f:
+                result[name] = f.read()
+        return result
+
+    def test_chainedRenames(self):
+        first, second, third = self.createFiles("d_u1_v1.exr", "d_u2_v1.exr", "d_u3_v1.exr")
+        logPath = os.path.join(tempfile.gettempdir(), "zooBatchRenameTest.log")
+        filesystem.batchRename({first: second, second: third, third: first + ".new"}, logPath=logPath)
+        self.assertEquals(self.contents(), {"d_u2_v1.exr": "d_u1_v1.exr",
+                                            "d_u3_v1.exr": "d_u2_v1.exr",
+                                            "d_u1_v1.exr.new": "d_u3_v1.exr"})
+        self.assertFalse(os.path.exists(logPath))
+
+    def test_failureReverts(self):
+        first, second = self.createFiles("a.exr", "b.exr")
+        missing = os.path.join(self.root, "missing.exr")
+        with self.assertRaises(OSError):
+            filesystem.batchRename([(first, first + ".new"), (second, second + ".new"),
+                                    (missing, missing + ".new")], processes=2)
+        self.assertEquals(self.contents(), {"a.exr": "a.exr", "b.exr": "b.exr"})
+
+    def test_existingDestination(self):
+        first, second = self.createFiles("a.exr", "b.exr")
+        self.assertRaises(ValueError, filesystem.batchRename, {first: second})
+
+    def test_rollbackLog(self):
+        first, second = self.createFiles("a.exr", "b.exr")
+        logPath = os.path.join(self.root, "rename.log")
+        os.rename(first, first + ".tmp")
+        os.rename(first + ".tmp", second + ".new")
+        with open(logPath, "w") as f:
+            f.write('["{0}", "{0}.tmp"]\n["{0}.tmp", "{1}.new"]\n["{1}'.format(first, second))
+        filesystem.rollbackRenames(logPath)
+        self.assertEquals(self.contents(), {"a.exr": "a.exr", "b.exr": "b.exr"})
+
+
+class TestCopyFiles(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.sources = []
+        for index in range(6):
+            filePath = os.path.join(self.root, "src", "tile_{}.exr".format(1001 + index))
+            if not os.path.isdir(os.path.dirname(filePath)):
+                os.makedirs(os.path.dirname(filePath))
+            with open(filePath, "wb") as f:
+                f.write(os.urandom(1024 * (index + 1)))
+            self.sources.append(filePath)
+        self.pairs = [(source, source.replace("src", os.path.join("dst", "nested"))) for source in self.sources]
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_copyAndSkip(self):
+        progress = []
+        manifest = filesystem.copyFiles(self.pairs, processes=3, bufferSize=1000,
+                                        progress=lambda copied, total: progress.append((copied, total)))
+        self.assertEquals([r["status"] for r in manifest], [filesystem.COPY_COPIED] * len(self.pairs))
+        for source, destination in self.pairs:
+            self.assertEquals(filesystem.fileHash(source), filesystem.fileHash(destination))
+        total = sum(os.path.getsize(source) for source in self.sources)
+        self.assertEquals(progress[-1], (total, total))
+
+        # copies unconditionally unless a skip check is requested
+        manifest = filesystem.copyFiles(self.pairs)
+        self.assertEquals([r["status"] for r in manifest], [filesystem.COPY_COPIED] * len(self.pairs))
+        manifest = filesystem.copyFiles(self.pairs, skip="stat")
+        self.assertEquals([r["status"] for r in manifest], [filesystem.COPY_SKIPPED] * len(self.pairs))
+        with open(self.pairs[0][1], "ab") as f:
+            f.write("changed")
+        manifest = filesystem.copyFiles(self.pairs, skip="hash")
+        self.assertEquals(manifest[0]["status"], filesystem.COPY_COPIED)
+        self.assertEquals(manifest[1]["status"], filesystem.COPY_SKIPPED)
+
+    def test_permissionsLeaveUmask(self):
+        oldMask = os.umask(0o022)
+        try:
+            filesystem.copyFiles(self.pairs, processes=6, permissions=0o750)
+            self.assertEquals(os.umask(0o022), 0o022)
+        finally:
+            os.umask(oldMask)
+        for folder in ("dst", os.path.join("dst", "nested")):
+            self.assertEquals(os.stat(os.path.join(self.root, folder)).st_mode & 0o777, 0o750)
+
+    def test_failures(self):
+        missing = os.path.join(self.root, "missing.exr")
+        pairs = self.pairs[:2] + [(missing, missing + ".copy")]
+        self.assertEquals(filesystem.batchCopyFiles(pairs), [(missing, missing + ".copy")])
+        manifest = filesystem.copyFiles(pairs)
+        self.assertEquals(manifest[-1]["status"], filesystem.COPY_FAILED)
+        self.assertTrue(manifest[-1]["error"])
+
+
+class TestFolderSize(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for index, relative in enumerate(("a.txt", "sub/b.txt", "sub/deep/c.txt", "other/d.txt")):
+            filePath = os.path.join(self.root, relative)
+            if not os.path.isdir(os.path.dirname(filePath)):
+                os.makedirs(os.path.dirname(filePath))
+            with open(filePath, "w") as f:
+                f.write("x" * (index + 1) * 100)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        filesystem.clearFolderSizeCache()
+
+    def walkSize(self):
+        return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(self.root) for f in files)
+
+    def test_stats(self):
+        self.assertEquals(filesystem.folderSize(self.root), self.walkSize())
+        self.assertEquals(filesystem.folderStats(self.root, processes=1),
+                          {"size": 1000, "files": 4, "directories": 3})
+        self.assertEquals(filesystem.folderSize(os.path.join(self.root, "missing")), 0)
+
+    def test_changedDirectoryIsRemeasured(self):
+        filesystem.folderSize(self.root, useCache=True)
+        deep = os.path.join(self.root, "sub", "deep")
+        with open(os.path.join(deep, "e.txt"), "w") as f:
+            f.write("x" * 50)
+        # make sure the change is visible on filesystems with a coarse mtime
+        os.utime(deep, (0, 0))
+        self.assertEquals(filesystem.folderSize(self.root, useCache=True), self.walkSize())
+
+    def test_inPlaceEditWithoutCache(self):
+        filesystem.folderSize(self.root, useCache=True)
+        with open(os.path.join(self.root, "sub", "b.txt"), "a") as f:
+            f.write("x" * 50)
+        self.assertEquals(filesystem.folderSize(self.root), self.walkSize())
+
+    def test_persistentCache(self):
+        filesystem.folderSize(self.root, useCache=True)
+        cachePath = os.path.join(self.root, "cache.json")
+        filesystem.saveFolderSizeCache(cachePath)
+        filesystem.clearFolderSizeCache()
+        filesystem.loadFolderSizeCache(cachePath)
+        self.assertEquals(filesystem.folderStats(os.path.join(self.root, "sub"), useCache=True),
+                          {"size": 500, "files": 2, "directories": 1})
+
+    def test_cacheSize(self):
+        filesystem.folderStats(self.root, processes=1)
+        self.assertEquals(len(filesystem._FOLDER_STATS_CACHE), 0)
+        cacheSize = filesystem.FOLDER_STATS_CACHE_SIZE
+        filesystem.FOLDER_STATS_CACHE_SIZE = 2
+        try:
+            self.assertEquals(filesystem.folderSize(self.root, useCache=True), self.walkSize())
+        finally:
+            filesystem.FOLDER_STATS_CACHE_SIZE = cacheSize
+        self.assertEquals(len(filesystem._FOLDER_STATS_CACHE), 2)
+
+
+class TestDirectoryTree(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for relative in ("a.ma", "a.txt", "sub/b.ma", "sub/deep/c.ma"):
+            filePath = os.path.join(self.root, relative)
+            if not os.path.isdir(os.path.dirname(filePath)):
+                os.makedirs(os.path.dirname(filePath))
+            open(filePath, "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def flattenDict(self, data):
+        result = [os.path.relpath(data["path"], self.root)]
+        for child in data.get("children", []):
+            result.extend(self.flattenDict(child))
+        return result
+
+    def test_dictMatchesFlatten(self):
+        data = filesystem.directoryTreeToDict(self.root)
+        self.assertEquals(sorted(self.flattenDict(data)),
+                          [".", "a.ma", "a.txt", "sub", "sub/b.ma", "sub/deep", "sub/deep/c.ma"])
+        tree = filesystem.directoryTree(self.root)
+        self.assertEquals([node.path for node in tree.iterFlatten()],
+                          [os.path.join(self.root, p) if p != "." else self.root for p in self.flattenDict(data)])
+
+    def test_limits(self):
+        tree = filesystem.directoryTree(self.root, maxDepth=2, extensions=("ma",))
+        paths = sorted(os.path.relpath(node.path, self.root) for node in tree.iterFlatten())
+        self.assertEquals(paths, [".", "a.ma", "sub", "sub/b.ma", "sub/deep"])
+        tree = filesystem.directoryTree(self.root, filterFunc=lambda entry: entry.name.startswith("a"))
+        self.assertEquals(sorted(node.name for node in tree.children), ["a.ma", "a.txt", "sub"])
+
+    def test_jsonLines(self):
+        output = StringIO.StringIO()
+        filesystem.directoryTree(self.root).writeJsonLines(output)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEquals(len(records), 7)
+        byPath = dict((record["path"], record) for record in records)
+        for record in records[1:]:
+            self.assertEquals(byPath[record["parent"]]["depth"], record["depth"] - 1)
+            self.assertEquals(os.path.dirname(record["path"]), record["parent"])
+
+
+class TestZipWalk(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        nested = StringIO.StringIO()
+        with zipfile.ZipFile(nested, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("inner/a.txt", "a" * 1000)
+            archive.writestr("inner/b.txt", "b")
+        self.zipPath = os.path.join(self.root, "outer.zip")
+        with zipfile.ZipFile(self.zipPath, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("top.txt", "top" * 100)
+            archive.writestr("nested.zip", nested.getvalue())
+            archive.writestr("broken.zip", "not a zip")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_walk(self):
+        for threshold in (filesystem.ZIPWALK_STREAM_THRESHOLD, 10):
+            result = [(info.filename, data.read()) for info, data in filesystem.zipwalk(self.zipPath, threshold)]
+            self.assertEquals(result, [("top.txt", "top" * 100), ("inner/a.txt", "a" * 1000), ("inner/b.txt", "b")])
+
+    def test_lazyReaders(self):
+        readers = dict((info.filename, data) for info, data in filesystem.zipwalk(self.zipPath, 500)
+                       if info.filename == "top.txt")
+        self.assertTrue(readers["top.txt"]._file is None)
+        self.assertFalse(readers["top.txt"].isStreamed())
+        for info, data in filesystem.zipwalk(self.zipPath, 500):
+            if info.filename == "inner/a.txt":
+                self.assertTrue(data.isStreamed())
+                self.assertEquals(data.getvalue(), "a" * 1000)
+            elif info.filename == "top.txt":
+                data.seek(3)
+                self.assertEquals(data.read(3), "top")
+
+
+class TestCreateZip(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.files = []
+        for name, data in (("a.py", "print 'a'\n" * 500), ("b.png", os.urandom(2000)), ("c.txt", ""),
+                           ("sub/d.json", "{}" * 1000)):
+            filePath = os.path.join(self.root, "src", name)
+            if not os.path.isdir(os.path.dirname(filePath)):
+                os.makedirs(os.path.dirname(filePath))
+            with open(filePath, "wb") as f:
+                f.write(data)
+            self.files.append((filePath, os.path.join("pkg", name)))
+        self.files.append((os.path.join(self.root, "src", "sub"), "pkg/sub"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_roundTrip(self):
+        zipPath = os.path.join(self.root, "out", "package.zip")
+        stats = filesystem.createZip(zipPath, self.files, processes=3)
+        self.assertEquals(stats["files"], len(self.files))
+        self.assertArchive(zipPath)
+
+    def test_zipfileWritesMembers(self):
+        # a.py is written by zipfile and the rest by the pool, across two batches
+        zipPath = os.path.join(self.root, "mixed.zip")
+        maxSize = filesystem.ZIP_PARALLEL_MAX_SIZE
+        filesystem.ZIP_PARALLEL_MAX_SIZE = 3000
+        try:
+            filesystem.createZip(zipPath, self.files, processes=1)
+        finally:
+            filesystem.ZIP_PARALLEL_MAX_SIZE = maxSize
+        self.assertArchive(zipPath)
+        # large files and unsupported python versions still store the compressed formats
+        for name, value in (("ZIP_PARALLEL_MAX_SIZE", 0), ("_ZIP_PARALLEL_SUPPORTED", False)):
+            zipPath = os.path.join(self.root, "{}.zip".format(name))
+            original = getattr(filesystem, name)
+            setattr(filesystem, name, value)
+            try:
+                filesystem.createZip(zipPath, self.files, processes=2)
+            finally:
+                setattr(filesystem, name, original)
+            self.assertArchive(zipPath)
+
+    def assertArchive(self, zipPath):
+        with zipfile.ZipFile(zipPath) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEquals(archive.namelist(), ["pkg/a.py", "pkg/b.png", "pkg/c.txt", "pkg/sub/d.json", "pkg/sub/"])
+            self.assertEquals(archive.getinfo("pkg/b.png").compress_type, zipfile.ZIP_STORED)
+            self.assertEquals(archive.getinfo("pkg/a.py").compress_type, zipfile.ZIP_DEFLATED)
+            for filePath, arcname in self.files[:-1]:
+                with open(filePath, "rb") as f:
+                    self.assertEquals(archive.read(arcname), f.read())
+
+
+class TestContentStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.library = os.path.join(self.root, "library")
+        for relative, data in (("a/thumb.png", "image"), ("b/thumb.png", "image"), ("b/preset.json", "{}")):
+            filePath = os.path.join(self.library, relative)
+            if not os.path.isdir(os.path.dirname(filePath)):
+                os.makedirs(os.path.dirname(filePath))
+            with open(filePath, "w") as f:
+                f.write(data)
+        self.store = filesystem.ContentStore(os.path.join(self.root, "store"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_ingestAndMaterialise(self):
+        manifest = self.store.ingestDirectory(self.library)
+        self.assertEquals(sorted(manifest), ["a/thumb.png", "b/preset.json", "b/thumb.png"])
+        self.assertEquals(manifest["a/thumb.png"], manifest["b/thumb.png"])
+        blob = self.store.blobPath(manifest["a/thumb.png"])
+        # the library is copied into the store and left untouched
+        libraryFile = os.path.join(self.library, "b", "thumb.png")
+        self.assertNotEquals(os.stat(blob).st_ino, os.stat(libraryFile).st_ino)
+        self.assertTrue(os.access(libraryFile, os.W_OK))
+        with open(libraryFile, "w") as f:
+            f.write("edited")
+        with open(blob) as f:
+            self.assertEquals(f.read(), "image")
+
+        destination = os.path.join(self.root, "show")
+        for linkType in (filesystem.ContentStore.LINK_HARDLINK, filesystem.ContentStore.LINK_COPY,
+                         filesystem.ContentStore.LINK_REFLINK):
+            created = self.store.materialise(manifest, os.path.join(destination, linkType), linkType)
+            self.assertEquals(len(created), 3)
+            with open(os.path.join(destination, linkType, "b", "preset.json")) as f:
+                self.assertEquals(f.read(), "{}")
+
+    def test_ingestLink(self):
+        filePath = os.path.join(self.library, "a", "thumb.png")
+        digest = self.store.ingestFile(filePath, link=True)
+        self.assertEquals(os.stat(self.store.blobPath(digest)).st_ino, os.stat(filePath).st_ino)
+
+    def test_materialiseReplacesStaleFiles(self):
+        destination = os.path.join(self.root, "show")
+        filePath = os.path.join(destination, "b", "preset.json")
+        self.store.materialise(self.store.ingestDirectory(self.library), destination,
+                               filesystem.ContentStore.LINK_COPY)
+        with open(os.path.join(self.library, "b", "preset.json"), "w") as f:
+            f.write('{"v": 2}')
+        manifest = self.store.ingestDirectory(self.library)
+        link = os.link
+
+        def crossDevice(source, destination):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        # hardlinks fail across devices, the stale file is replaced with a copy
+        os.link = crossDevice
+        try:
+            self.assertIn(filePath, self.store.materialise(manifest, destination))
+        finally:
+            os.link = link
+        with open(filePath) as f:
+            self.assertEquals(f.read(), '{"v": 2}')
+
+    def test_hashCache(self):
+        filePath = os.path.join(self.library, "b", "preset.json")
+        digest = self.store.hashFile(filePath)
+        self.store.saveIndex()
+        store = filesystem.ContentStore(self.store.root)
+        self.assertEquals(store._hashCache, self.store._hashCache)
+        with open(filePath, "w") as f:
+            f.write("{'changed': 1}")
+        os.utime(filePath, (0, 0))
+        self.assertNotEquals(store.hashFile(filePath), digest)
+
+
+class TestMoveFileContext(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.journalPath = os.path.join(self.root, "move.journal")
+        os.makedirs(os.path.join(self.root, "target"))
+        for name in ("a.ma", "b.ma"):
+            open(os.path.join(self.root, name), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_commit(self):
+        with filesystem.MoveFileContext(self.journalPath) as context:
+            context.move(os.path.join(self.root, "a.ma"), os.path.join(self.root, "target"))
+            context.move(os.path.join(self.root, "b.ma"), os.path.join(self.root, "target", "c.ma"))
+        self.assertEquals(sorted(os.listdir(os.path.join(self.root, "target"))), ["a.ma", "c.ma"])
+        self.assertFalse(os.path.exists(self.journalPath))
+
+    def test_rollback(self):
+        source = os.path.join(self.root, "a.ma")
+        with self.assertRaises(ValueError):
+            with filesystem.MoveFileContext(self.journalPath) as context:
+                context.move(source, os.path.join(self.root, "c.ma"))
+                context.move(os.path.join(self.root, "c.ma"), os.path.join(self.root, "target", "d.ma"))
+                raise ValueError("raise an error so we revert")
+        self.assertTrue(os.path.exists(source))
+        self.assertEquals(os.listdir(os.path.join(self.root, "target")), [])
+        self.assertFalse(os.path.exists(self.journalPath))
+
+    def test_syncBeforeCommit(self):
+        events = []
+        syncDirectories = filesystem._syncDirectories
+        writeJournal = filesystem.MoveFileContext._writeJournal
+
+        def sync(directories):
+            events.append(("sync", sorted(directories)))
+            syncDirectories(directories)
+
+        def write(context, record):
+            events.append(("journal", record["op"]))
+            writeJournal(context, record)
+
+        filesystem._syncDirectories = sync
+        filesystem.MoveFileContext._writeJournal = write
+        try:
+            with filesystem.MoveFileContext(self.journalPath) as context:
+                context.move(os.path.join(self.root, "a.ma"), os.path.join(self.root, "target"))
+        finally:
+            filesystem._syncDirectories = syncDirectories
+            filesystem.MoveFileContext._writeJournal = writeJournal
+        self.assertEquals(events, [("sync", [self.root]),
+                                   ("journal", "move"),
+                                   ("sync", [self.root, os.path.join(self.root, "target")]),
+                                   ("journal", "commit")])
+
+    def test_failedRollbackKeepsJournal(self):
+        sourceDirectory = os.path.join(self.root, "source")
+        source = os.path.join(sourceDirectory, "a.ma")
+        destination = os.path.join(self.root, "target", "a.ma")
+        os.makedirs(sourceDirectory)
+        open(source, "w").close()
+        with self.assertRaises(OSError):
+            with filesystem.MoveFileContext(self.journalPath) as context:
+                context.move(source, destination)
+                # the rollback can't move the file back into a missing directory
+                os.rmdir(sourceDirectory)
+                raise ValueError("raise an error so we revert")
+        self.assertTrue(os.path.exists(self.journalPath))
+        os.makedirs(sourceDirectory)
+        self.assertEquals(filesystem.MoveFileContext.recover(self.journalPath), [(source, destination)])
+        self.assertTrue(os.path.exists(source))
+        self.assertFalse(os.path.exists(self.journalPath))
+
+    def test_moveOverwrites(self):
+        source = os.path.join(self.root, "a.ma")
+        destination = os.path.join(self.root, "b.ma")
+        with open(source, "w") as f:
+            f.write("a")
+        rename = os.rename
+
+        def windowsRename(first, second):
+            if os.path.exists(second):
+                raise OSError(errno.EEXIST, "Cannot create a file when that file already exists")
+            rename(first, second)
+
+        # os.rename on windows doesn't replace an existing file
+        os.rename = windowsRename
+        try:
+            with filesystem.MoveFileContext() as context:
+                context.move(source, destination)
+        finally:
+            os.rename = rename
+        with open(destination) as f:
+            self.assertEquals(f.read(), "a")
+        self.assertFalse(os.path.exists(source))
+
+    def test_recoverInterrupted(self):
+        context = filesystem.MoveFileContext(self.journalPath).__enter__()
+        context.move(os.path.join(self.root, "a.ma"), os.path.join(self.root, "target", "a.ma"))
+        # simulate the process dying part way through writing the next intent
+        context._journal.write('{"op": "mo')
+        context._journal.close()
+        reverted = filesystem.MoveFileContext.recover(self.journalPath)
+        self.assertEquals(len(reverted), 1)
+        self.assertEquals(sorted(os.listdir(self.root)), ["a.ma", "b.ma", "target"])
@@ -0,0 +1,110 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from zoo.libs.utils import filewatcher
+
+
+class TestSubscription(unittest.TestCase):
+    def test_coalesce(self):
+        subscription = filewatcher.Subscription("/root", None, True)
+        subscription.add("/root/a", filewatcher.CREATED, 1.0)
+        subscription.add("/root/a", filewatcher.MODIFIED, 1.0)
+        subscription.add("/root/b", filewatcher.CREATED, 1.0)
+        subscription.add("/root/b", filewatcher.DELETED, 1.0)
+        subscription.add("/root/c", filewatcher.DELETED, 1.0)
+        subscription.add("/root/c", filewatcher.CREATED, 1.0)
+        self.assertEquals(subscription.takeEvents(1.1, 0.2), [])
+        self.assertEquals(subscription.takeEvents(1.3, 0.2), [filewatcher.FileEvent("/root/a", filewatcher.CREATED),
+                                                              filewatcher.FileEvent("/root/c", filewatcher.MODIFIED)])
+        self.assertEquals(subscription.takeEvents(2.0, 0.2), [])
+
+    def test_matches(self):
+        subscription = filewatcher.Subscription("/root", None, False)
+        self.assertTrue(subscription.matches("/root/a"))
+        self.assertFalse(subscription.matches("/root/a/b"))
+        self.assertFalse(subscription.matches("/rootOther/a"))
+
+
+class TestFileWatcher(unittest.TestCase):
+    usePolling = False
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, "sub"))
+        self.watcher = filewatcher.FileWatcher(debounce=0.05, pollInterval=0.01, usePolling=self.usePolling)
+        self.events = []
+        self.subscription = self.watcher.subscribe(self.root, self.events.extend)
+
+    def tearDown(self):
+        self.watcher.stop()
+        shutil.rmtree(self.root)
+
+    def waitForEvents(self, timeout=2.0):
+        end = time.time() + timeout
+        while not self.events and time.time() < end:
+            self.watcher.processEvents(0.02)
+        result = sorted((os.path.relpath(e.path, self.root), e.type) for e in self.events)
+        del self.events[:]
+        return result
+
+    def test_events(self):
+        if sys.platform.startswith("linux"):
+            self.assertEquals(self.watcher.isPolling(), self.usePolling)
+        filePath = os.path.join(self.root, "sub", "a.txt")
+        with open(filePath, "w") as f:
+            f.write("a")
+        self.assertEquals(self.waitForEvents(), [(os.path.join("sub", "a.txt"), filewatcher.CREATED)])
+        time.sleep(0.02)
+        with open(filePath, "w") as f:
+            f.write("changed")
+        self.assertEquals(self.waitForEvents(), [(os.path.join("sub", "a.txt"), filewatcher.MODIFIED)])
+        os.makedirs(os.path.join(self.root, "new", "deep"))
+        with open(os.path.join(self.root, "new", "deep", "b.txt"), "w") as f:
+            f.write("b")
+        self.assertEquals(self.waitForEvents(), [("new", filewatcher.CREATED),
+                                                 (os.path.join("new", "deep"), filewatcher.CREATED),
+                                                 (os.path.join("new", "deep", "b.txt"), filewatcher.CREATED)])
+        os.remove(filePath)
+        self.assertEquals(self.waitForEvents(), [(os.path.join("sub", "a.txt"), filewatcher.DELETED)])
+        self.watcher.unsubscribe(self.subscription)
+        open(filePath, "w").close()
+        self.assertEquals(self.waitForEvents(0.3), [])
+
+    def test_restart(self):
+        self.watcher.start()
+        self.watcher.stop()
+        self.watcher.start()
+        self.watcher.stop()
+        # the subscriptions are watched again once the watcher is used after a stop
+        self.watcher.processEvents()
+        open(os.path.join(self.root, "a.txt"), "w").close()
+        self.assertEquals(self.waitForEvents(), [("a.txt", filewatcher.CREATED)])
+
+
+class TestPollingBackend(unittest.TestCase):
+    def test_removeWhileReading(self):
+        root = tempfile.mkdtemp()
+        try:
+            backend = filewatcher._PollingBackend(0.0)
+            backend.addRoot(root, True)
+            snapshot = backend._snapshot
+
+            def removeDuringScan(*args):
+                # another thread unsubscribes while the root is scanned
+                backend.removeRoot(root, True)
+                return snapshot(*args)
+
+            backend._snapshot = removeDuringScan
+            open(os.path.join(root, "a.txt"), "w").close()
+            self.assertEquals(backend.read(0.0), [])
+            self.assertEquals(backend._snapshots, {})
+        finally:
+            shutil.rmtree(root)
+
+
+class TestPollingFileWatcher(TestFileWatcher):
+    usePolling = True
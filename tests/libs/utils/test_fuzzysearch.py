@@ -0,0 +1,48 @@
+import unittest
+
+from zoo.libs.utils import fuzzysearch, general
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    def setUp(self):
+        self.items = ["createJoint", "deleteJoint", "jointOrient", "createCurve", "curveToJoint", "hello_world"]
+        self.index = fuzzysearch.FuzzyIndex(self.items)
+
+    def test_wordStarts(self):
+        self.assertEquals(sorted(fuzzysearch.wordStarts("createJoint_L01")), [0, 6, 12, 13])
+        self.assertEquals(sorted(fuzzysearch.wordStarts("_hello world")), [1, 7])
+
+    def test_ranking(self):
+        self.assertEquals(self.index.search("cj"), ["createJoint", "curveToJoint"])
+        self.assertEquals(self.index.search("jo", limit=2), ["jointOrient", "createJoint"])
+        self.assertEquals(self.index.search("hw"), ["hello_world"])
+        self.assertEquals(self.index.search("xyz"), [])
+        self.assertEquals(self.index.search(""), self.items)
+
+    def test_matchesSubsequences(self):
+        # every subsequence match has to be found, same as a regex with .*? between the characters
+        for query in ("te", "joint", "cre", "rv", "oo", "eJ"):
+            expected = set(item for item in self.items if fuzzysearch.score(query.lower(), item) is not None)
+            self.assertEquals(set(self.index.search(query)), expected)
+            self.assertTrue(expected)
+
+    def test_incrementalNarrowing(self):
+        for query in ("c", "cr", "cre", "crea", "creaj"):
+            results = self.index.search(query)
+        self.assertEquals(results, ["createJoint"])
+        # a query which doesn't extend the previous one searches everything again
+        self.assertEquals(self.index.search("dj"), ["deleteJoint"])
+        self.index.add("drawJoint")
+        # shorter matches rank higher
+        self.assertEquals(self.index.search("dj"), ["drawJoint", "deleteJoint"])
+
+    def test_key(self):
+        index = fuzzysearch.FuzzyIndex([{"name": "createJoint"}, {"name": "deleteJoint"}], key=lambda i: i["name"])
+        self.assertEquals(index.search("dj"), [{"name": "deleteJoint"}])
+
+    def test_fuzzyFinder(self):
+        result = list(general.fuzzyFinder("te", ["gete", "test", "hello", "job", "lbsknasdvte", "3rya8d^&%()te)VHF"]))
+        self.assertEquals(result, ["test", "gete", "lbsknasdvte", "3rya8d^&%()te)VHF"])
+        # case sensitive, de-duplicated and sorted by match length
+        self.assertEquals(list(general.fuzzyFinder("T", ["test", "Test", "Test"])), ["Test"])
+        self.assertEquals(list(general.fuzzyFinder("", ["b", "a", "a"])), ["a", "b"])
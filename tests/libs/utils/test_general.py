@@ -0,0 +1,142 @@
+import random
+import re
+import time
+import unittest
+
+from zoo.libs.utils import general
+
+
+def legacyNumericalSort(data):
+    return sorted(data, key=lambda key: [int(c) if c.isdigit() else c for c in re.split('([0-9]+)', key)])
+
+
+class TestNumericalSort(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(2)
+        self.names = ["shot{}_v{:03d}.{:04d}.exr".format(rand.randint(1, 30), rand.randint(1, 12), rand.randint(1, 200))
+                      for _ in range(500)]
+        self.names.extend(["ctrl1", "ctrl50", "ctrl2", "ctrl", "10", "2", "", "a01", "a1"])
+
+    def test_matchesLegacy(self):
+        self.assertEquals(general.numericalSort(self.names), legacyNumericalSort(self.names))
+        self.assertEquals(general.numericalSort(["ctrl1", "ctrl50", "ctrl2", "ctrl"]),
+                          ["ctrl", "ctrl1", "ctrl2", "ctrl50"])
+
+    def test_longNumbers(self):
+        names = ["id{}".format("9" * 300), "id{}".format("1" * 256), "id2", "id{}".format("1" * 40)]
+        self.assertEquals(general.numericalSort(names), legacyNumericalSort(names))
+
+    def test_topN(self):
+        expected = legacyNumericalSort(self.names)
+        self.assertEquals(general.numericalTopN(iter(self.names), 10), expected[:10])
+        self.assertEquals(general.numericalTopN(iter(self.names), 10, reverse=True), expected[::-1][:10])
+
+    def test_sortedList(self):
+        sortedNames = general.NumericalSortedList(self.names[:100])
+        for name in self.names[100:]:
+            sortedNames.add(name)
+        self.assertEquals(list(sortedNames), legacyNumericalSort(self.names))
+        self.assertTrue("ctrl50" in sortedNames)
+        sortedNames.remove("ctrl50")
+        self.assertFalse("ctrl50" in sortedNames)
+        self.assertRaises(ValueError, sortedNames.remove, "ctrl50")
+        # equal keys keep their insertion order
+        self.assertEquals(list(general.NumericalSortedList(["a1", "a01"])), ["a1", "a01"])
+
+
+class TestMerge(unittest.TestCase):
+    def setUp(self):
+        self.base = {"rules": {"default": "{side}_{type}"},
+                     "tokens": {"side": {"L": "left"}, "type": {"jnt": "joint"}},
+                     "version": 1}
+
+    def test_mergeInPlace(self):
+        result = general.merge(self.base, {"tokens": {"side": {"R": "right"}}, "version": 1, "new": [1]})
+        self.assertIs(result, self.base)
+        self.assertEquals(self.base["tokens"]["side"], {"L": "left", "R": "right"})
+        self.assertEquals(self.base["new"], [1])
+
+    def test_conflicts(self):
+        with self.assertRaises(Exception) as context:
+            general.merge(self.base, {"tokens": {"side": {"L": "links"}}})
+        self.assertEquals(str(context.exception), "Conflict at tokens.side.L")
+        general.merge(self.base, {"tokens": {"side": {"L": "links"}}}, onConflict=general.preferSecond)
+        self.assertEquals(self.base["tokens"]["side"]["L"], "links")
+
+    def test_deep(self):
+        first, second = {}, {}
+        a, b = first, second
+        for _ in range(5000):
+            a["child"] = {}
+            b["child"] = {}
+            a, b = a["child"], b["child"]
+        b["leaf"] = 1
+        self.assertEquals(general.mergedCopy(first, second)["child"]["child"]["child"].keys(), ["child"])
+        general.merge(first, second)
+        self.assertEquals(a, {"leaf": 1})
+
+    def test_mergedCopy(self):
+        other = {"tokens": {"side": {"R": "right"}}, "rules": {"default": "{side}_{type}"}}
+        merged = general.mergedCopy(self.base, other)
+        self.assertEquals(merged["tokens"]["side"], {"L": "left", "R": "right"})
+        self.assertEquals(self.base["tokens"]["side"], {"L": "left"})
+        self.assertIs(merged["rules"], self.base["rules"])
+        self.assertIs(merged["tokens"]["type"], self.base["tokens"]["type"])
+        self.assertIs(merged["tokens"]["side"]["R"], other["tokens"]["side"]["R"])
+        self.assertIs(general.mergedCopy(self.base, {"version": 1, "tokens": {}}), self.base)
+        self.assertEquals(general.mergedCopy(self.base, {"version": 2}, onConflict=general.preferFirst), self.base)
+        self.assertRaises(Exception, general.mergedCopy, self.base, {"version": 2})
+
+
+class TestChunks(unittest.TestCase):
+    def test_iteratorsMatchSequences(self):
+        for length in range(12):
+            data = range(length)
+            for size in range(1, 6):
+                for overlap in range(size):
+                    expected = list(general.chunks(data, size, overlap))
+                    self.assertEquals(list(general.chunks(iter(data), size, overlap)), expected)
+                    self.assertEquals(list(general.chunks(tuple(data), size, overlap)),
+                                      [tuple(chunk) for chunk in expected])
+
+    def test_buffers(self):
+        data = bytearray("abcdefg")
+        result = list(general.chunks(data, 3, overlap=1))
+        self.assertTrue(all(isinstance(chunk, memoryview) for chunk in result))
+        self.assertEquals([chunk.tobytes() for chunk in result], ["abc", "cde", "efg"])
+        data[2] = "X"
+        self.assertEquals(result[1].tobytes(), "Xde")
+        self.assertEquals(list(general.chunks("abcde", 2)), ["ab", "cd", "e"])
+        self.assertRaises(ValueError, list, general.chunks("abc", 2, overlap=2))
+
+    def test_mapChunks(self):
+        self.assertEquals(list(general.mapChunks(sum, iter(range(10)), 3, processes=3)), [3, 12, 21, 9])
+        self.assertEquals(sorted(general.mapChunks(len, range(10), 4, overlap=2, ordered=False)), [4, 4, 4, 4])
+
+    def test_mapChunksStopsEarly(self):
+        calls = []
+
+        def count(chunk):
+            calls.append(chunk)
+            time.sleep(0.001)
+            return len(chunk)
+
+        results = general.mapChunks(count, iter(xrange(100000)), 2, processes=2)
+        self.assertEquals(next(results), 2)
+        results.close()
+        called = len(calls)
+        # only the first batch of processes * 4 chunks was submitted
+        self.assertTrue(called <= 8)
+        time.sleep(0.1)
+        self.assertEquals(len(calls), called)
+
+    def test_mapChunksEndless(self):
+        def naturals():
+            value = 0
+            while True:
+                yield value
+                value += 1
+
+        results = general.mapChunks(sum, naturals(), 2, processes=2)
+        self.assertEquals([next(results) for _ in xrange(3)], [1, 5, 9])
+        results.close()
@@ -0,0 +1,280 @@
+import ntpath
+import os
+import shutil
+import tempfile
+import unittest
+
+from zoo.libs.utils import path
+
+
+class TestPathCache(unittest.TestCase):
+    def setUp(self):
+        path.clearPathCache()
+        os.environ["ZOO_TEST_PATH_ROOT"] = "/projects/show"
+
+    def tearDown(self):
+        del os.environ["ZOO_TEST_PATH_ROOT"]
+        path.clearPathCache()
+
+    def test_cachedMatchesResolve(self):
+        for p in ("a/b/../c", "//server/share/x", "a\\\\b\\c/", "%ZOO_TEST_PATH_ROOT%/shots", "/a/b/"):
+            resolved, toks, isUNC = path.resolveAndSplit(p)
+            self.assertEquals(path.resolveAndSplitCached(p), (resolved, tuple(toks), isUNC))
+            # second call is served by the cache
+            self.assertEquals(path.resolveAndSplitCached(p), (resolved, tuple(toks), isUNC))
+
+    def test_envChangesAreHonoured(self):
+        self.assertEquals(path.Path("%ZOO_TEST_PATH_ROOT%/shots"), "/projects/show/shots")
+        os.environ["ZOO_TEST_PATH_ROOT"] = "/projects/other"
+        self.assertEquals(path.Path("%ZOO_TEST_PATH_ROOT%/shots"), "/projects/other/shots")
+        self.assertEquals(path.Path("%ZOO_TEST_PATH_ROOT%/shots", envDict={"ZOO_TEST_PATH_ROOT": "/custom"}),
+                          "/custom/shots")
+
+    def test_joinMatchesFullResolve(self):
+        parents = ("/a/b", "a/b/", "//server/share", "/", "%ZOO_TEST_PATH_ROOT%", "a")
+        others = ("c", "c/d/", "/c", "../c", "..", "", "c//d", "c\\\\d", "%ZOO_TEST_PATH_ROOT%/c", "../../..")
+        for parent in parents:
+            parent = path.Path(parent)
+            for other in others:
+                path.clearPathCache()
+                try:
+                    expected = path.Path("".join([parent, "/", other]), parent.caseMatters)
+                except IndexError:
+                    # resolveAndSplit can't handle paths which collapse to nothing
+                    continue
+                path.clearPathCache()
+                joined = parent / other
+                self.assertEquals(str(joined), str(expected))
+                self.assertEquals(joined.split(), expected.split())
+                self.assertEquals(joined.isUNC, expected.isUNC)
+                self.assertEquals(joined.unresolved(), expected.unresolved())
+
+
+class TestPathEquality(unittest.TestCase):
+    def test_caseInsensitive(self):
+        first = path.Path("/Projects/Show/Render.EXR", caseMatters=False)
+        second = path.Path("/projects/show/render.exr/", caseMatters=False)
+        self.assertEquals(first, second)
+        self.assertEquals(first, "/PROJECTS/show/render.exr")
+        self.assertEquals(hash(first), hash(second))
+        self.assertEquals(len({first, second}), 1)
+
+    def test_caseSensitive(self):
+        first = path.Path("/Projects/Show/Render.EXR", caseMatters=True)
+        second = path.Path("/projects/show/render.exr", caseMatters=True)
+        self.assertNotEquals(first, second)
+        self.assertEquals(first, path.Path("/Projects/Show/Render.EXR/", caseMatters=True))
+        self.assertEquals(len({first, second}), 2)
+
+    def test_mixedCaseSensitivity(self):
+        insensitive = path.Path("/Projects/Show", caseMatters=False)
+        sensitive = path.Path("/projects/show", caseMatters=True)
+        # the left hand side decides whether case matters
+        self.assertTrue(insensitive.isEqual(sensitive))
+        self.assertFalse(sensitive.isEqual(insensitive))
+
+
+class TestResolveMany(unittest.TestCase):
+    def test_matchesResolveAndSplit(self):
+        env = {"ROOT": "/projects/show", "NET": "\\\\server\\share", "NESTED": "%ROOT%/nested", "EMPTY": ""}
+        paths = ["%ROOT%/assets/char/textures/diffuse_1001.exr",
+                 "%ROOT%/assets/char/textures/diffuse_1002.exr",
+                 "%NET%/cache/shot010/",
+                 "%NESTED%/../other/file.abc",
+                 "%EMPTY%/a/b/../c",
+                 "%MISSING%/a/b",
+                 "relative\\\\path\\file.ma",
+                 "a/b/c/..",
+                 "//server/share/x.ma",
+                 "/"]
+        expected = []
+        for p in paths:
+            resolved, toks, isUNC = path.resolveAndSplit(p, env)
+            expected.append((resolved, tuple(toks), isUNC))
+        self.assertEquals(list(path.resolveMany(paths, env)), expected)
+
+    def test_lazy(self):
+        generator = path.resolveMany(("a/b" for _ in range(3)), {})
+        self.assertEquals(next(generator), ("a/b", ("a", "b"), False))
+
+
+class TestScanDirectory(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for relative in ("a/b/deep.exr", "a/top.EXR", "a/notes.txt", "c/d/e/f.ma", "root.ma"):
+            filePath = os.path.join(self.root, relative)
+            if not os.path.isdir(os.path.dirname(filePath)):
+                os.makedirs(os.path.dirname(filePath))
+            open(filePath, "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def relativeWalk(self, dirs=True, files=True):
+        result = []
+        for root, dirNames, fileNames in os.walk(self.root):
+            names = (dirNames if dirs else []) + (fileNames if files else [])
+            result.extend(os.path.relpath(os.path.join(root, n), self.root) for n in names)
+        return sorted(result)
+
+    def relative(self, entries):
+        return sorted(os.path.relpath(str(e), self.root) for e in entries)
+
+    def test_matchesWalk(self):
+        root = path.Path(self.root)
+        self.assertEquals(self.relative(root.files(recursive=True)), self.relativeWalk(dirs=False))
+        self.assertEquals(self.relative(root.dirs(recursive=True)), self.relativeWalk(files=False))
+        self.assertEquals(self.relative(root.files()), ["root.ma"])
+        self.assertTrue(all(isinstance(p, path.Path) for p in root.files(recursive=True)))
+
+    def test_filters(self):
+        entries = path.scanDirectory(self.root, recursive=True, dirs=False, extensions=("exr",))
+        self.assertEquals(self.relative(e.path for e in entries), ["a/b/deep.exr", "a/top.EXR"])
+        entries = path.scanDirectory(self.root, recursive=True, pattern="*.ma")
+        self.assertEquals(self.relative(e.path for e in entries), ["c/d/e/f.ma", "root.ma"])
+
+    def test_patternCase(self):
+        # windows is case insensitive so upper case patterns match every entry
+        normcase = os.path.normcase
+        os.path.normcase = ntpath.normcase
+        try:
+            entries = list(path.scanDirectory(self.root, recursive=True, pattern="*.EXR"))
+        finally:
+            os.path.normcase = normcase
+        self.assertEquals(self.relative(e.path for e in entries), ["a/b/deep.exr", "a/top.EXR"])
+        entries = path.scanDirectory(self.root, recursive=True, pattern="*.EXR")
+        self.assertEquals(self.relative(e.path for e in entries), ["a/top.EXR"])
+
+    def test_maxDepth(self):
+        entries = list(path.scanDirectory(self.root, recursive=True, maxDepth=1))
+        self.assertEquals(max(e.depth for e in entries), 1)
+        self.assertEquals(self.relative(e.path for e in entries if e.isDir()), ["a", "a/b", "c", "c/d"])
+
+    def test_missing(self):
+        self.assertEquals(list(path.Path(os.path.join(self.root, "missing")).files()), [])
+
+    def test_closesListings(self):
+        listings = []
+
+        class Listing(object):
+            def __init__(self, directory):
+                self.entries = iter([path._ListDirEntry(directory, n) for n in sorted(os.listdir(directory))])
+                self.closed = False
+                listings.append(self)
+
+            def __iter__(self):
+                return self.entries
+
+            def close(self):
+                self.closed = True
+
+        scandir = path._scandir
+        path._scandir = Listing
+        try:
+            self.assertEquals(len(list(path.scanDirectory(self.root, recursive=True))), len(self.relativeWalk()))
+            self.assertTrue(all(listing.closed for listing in listings))
+            del listings[:]
+            entries = path.scanDirectory(self.root, recursive=True)
+            next(entries)
+            entries.close()
+            self.assertEquals(len(listings), 1)
+            self.assertTrue(listings[0].closed)
+        finally:
+            path._scandir = scandir
+
+
+class TestFrameSequences(unittest.TestCase):
+    def test_collapse(self):
+        paths = ["/renders/beauty.%04d.exr" % frame for frame in range(1, 101) + range(102, 201)]
+        paths += ["/renders/beauty.1.exr", "/renders/notes.txt", "C:\\renders\\diffuse_1001.tif",
+                  "C:\\renders\\diffuse_1002.tif", "C:\\renders\\diffuse_1011.tif"]
+        sequences, others = path.collapseFrameSequences(reversed(paths))
+        self.assertEquals(sorted(others), ["/renders/beauty.1.exr", "/renders/notes.txt"])
+        self.assertEquals(len(sequences), 2)
+        beauty = sequences[0]
+        self.assertEquals(beauty.path(), path.getFrameSequencePath("/renders/beauty.0001.exr"))
+        self.assertEquals(beauty.rangeString(), "1-100,102-200")
+        self.assertEquals(beauty.missingFrames(), [101])
+        self.assertFalse(beauty.isUdim())
+        self.assertEquals(list(beauty)[:2], paths[:2])
+        textures = sequences[1]
+        self.assertTrue(textures.isUdim())
+        self.assertEquals(textures.udims(), [(0, 0), (1, 0), (0, 1)])
+        self.assertEquals(textures.udimPath(), "C:\\renders\\diffuse_<UDIM>.tif")
+        self.assertEquals(list(textures), paths[-3:])
+
+    def test_udimTenthColumn(self):
+        sequences, _ = path.collapseFrameSequences(["diffuse_{}.tif".format(patch) for patch in range(1001, 1011)])
+        self.assertTrue(sequences[0].isUdim())
+        self.assertEquals(sequences[0].udims()[-1], (9, 0))
+        sequences, _ = path.collapseFrameSequences(["beauty.{:04d}.exr".format(frame) for frame in range(1, 3)])
+        self.assertFalse(sequences[0].isUdim())
+
+    def test_scanDirectoryEntries(self):
+        root = tempfile.mkdtemp()
+        try:
+            for frame in (1, 2):
+                open(os.path.join(root, "r.{:04d}.exr".format(frame)), "w").close()
+            sequences, others = path.collapseFrameSequences(path.scanDirectory(root, dirs=False))
+            self.assertEquals(others, [])
+            self.assertEquals(sequences[0].path(), os.path.join(root, "r.%04d.exr"))
+            self.assertEquals(sequences[0].frames, [1, 2])
+        finally:
+            shutil.rmtree(root)
+
+    def test_minLength(self):
+        sequences, others = path.collapseFrameSequences(["a.0001.exr", "b.0001.exr", "b.0002.exr"], minLength=2)
+        self.assertEquals([s.path() for s in sequences], ["b.%04d.exr"])
+        self.assertEquals(others, ["a.0001.exr"])
+
+
+class TestTextureNames(unittest.TestCase):
+    def test_batchConversions(self):
+        patches = range(1001, 1200)
+        udims = [path.udimFromPatch(patch) for patch in patches]
+        self.assertEquals(path.udimsFromPatches(patches), udims)
+        self.assertEquals(path.patchesFromUdims(udims), [path.patchFromUdim(udim) for udim in udims])
+
+    def test_namesMap(self):
+        renames, unmatched = path.getTexturesNamesMap(["tex/Diffuse_1001.exr", "tex/Diffuse_1010.exr", "bad.exr"],
+                                                      "mari", "mudbox")
+        self.assertEquals(renames, {"tex/Diffuse_1001.exr": "tex/Diffuse_u1_v1.exr",
+                                    "tex/Diffuse_1010.exr": "tex/Diffuse_u10_v1.exr"})
+        self.assertEquals(unmatched, ["bad.exr"])
+        self.assertEquals(path.getTexturesNames(["Diffuse_u0_v0.exr", "Diffuse_u9_v0.exr"], prefix="Color_"),
+                          [("Diffuse_u0_v0.exr", "Color_1001.exr"), ("Diffuse_u9_v0.exr", "Color_1010.exr")])
+
+
+class TestVersionIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name in ("asset_v001.ma", "asset_v002.ma", "asset_v002.abc", "asset_v010.ma", "rig.v003.ma", "notes.txt"):
+            open(os.path.join(self.root, name), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        path.clearVersionIndexCache()
+
+    def test_queries(self):
+        index = path.versionIndex(self.root)
+        self.assertEquals(index.baseNames(), ["asset", "rig"])
+        self.assertEquals(index.versions("asset"), [1, 2, 10])
+        self.assertEquals(index.latestVersion("asset"),
+                          path.getVersionNumber(os.path.join(self.root, "asset_v010.ma")))
+        self.assertEquals(index.latestVersion("missing"), -1)
+        self.assertEquals(index.nextVersion("asset"), 11)
+        self.assertEquals(index.nextVersion("missing"), 1)
+        self.assertEquals(index.previousVersion("asset", 10), 2)
+        self.assertTrue(index.hasVersion("rig", 3))
+        self.assertFalse(index.hasVersion("asset", 3))
+        self.assertEquals(index.paths("asset", 2), [os.path.join(self.root, "asset_v002.abc"),
+                                                    os.path.join(self.root, "asset_v002.ma")])
+
+    def test_invalidation(self):
+        index = path.versionIndex(self.root)
+        self.assertIs(path.versionIndex(self.root), index)
+        self.assertFalse(index.refresh())
+        open(os.path.join(self.root, "asset_v011.ma"), "w").close()
+        # make sure the change is visible on filesystems with a coarse mtime
+        os.utime(self.root, (0, 0))
+        self.assertEquals(index.latestVersion("asset"), 11)
@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from zoo.libs.utils import profiling
+
+
+@profiling.timed("tests.decorated")
+def _decorated(value):
+    with profiling.span("tests.inner"):
+        return value * 2
+
+
+def _busyLoop(seconds):
+    end = time.time() + seconds
+    total = 0
+    while time.time() < end:
+        total += 1
+    return total
+
+
+class TestSpans(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        profiling.clear()
+        profiling.enable()
+
+    def tearDown(self):
+        profiling.disable()
+        profiling.clear()
+        profiling.setBufferSize(10000)
+        shutil.rmtree(self.root)
+
+    def test_spans(self):
+        self.assertEquals(_decorated(2), 4)
+        with profiling.span("tests.block") as block:
+            time.sleep(0.01)
+        self.assertTrue(block.duration >= 5000000)
+        recorded = profiling.spans()
+        self.assertEquals([item[0] for item in recorded], ["tests.decorated", "tests.inner", "tests.block"])
+        # name, threadId, start, duration, depth
+        self.assertEquals([item[4] for item in recorded], [0, 1, 0])
+        summary = profiling.summary()
+        self.assertEquals(summary["tests.block"]["count"], 1)
+
+    def test_disabled(self):
+        profiling.disable()
+        _decorated(1)
+        with profiling.span("tests.block"):
+            pass
+        profiling.increment("tests.counter")
+        self.assertEquals(profiling.spans(), [])
+        self.assertEquals(profiling.counters(), {})
+
+    def test_ringBuffer(self):
+        profiling.setBufferSize(5)
+        for index in range(20):
+            with profiling.span("span{}".format(index)):
+                pass
+        self.assertEquals([item[0] for item in profiling.spans()], ["span{}".format(i) for i in range(15, 20)])
+
+    def test_countersAcrossThreads(self):
+        def work():
+            for _ in range(100):
+                profiling.increment("tests.counter")
+            _decorated(1)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(profiling.counters(), {"tests.counter": 400})
+        self.assertEquals(len(profiling.spans()), 8)
+
+    def test_exportTrace(self):
+        _decorated(1)
+        profiling.increment("tests.counter", 3)
+        filePath = os.path.join(self.root, "trace.json")
+        self.assertEquals(profiling.exportTrace(filePath), 2)
+        with open(filePath) as f:
+            events = json.load(f)["traceEvents"]
+        self.assertEquals(sorted(e["name"] for e in events if e["ph"] == "X"), ["tests.decorated", "tests.inner"])
+        self.assertEquals([e["args"] for e in events if e["ph"] == "C"], [{"tests.counter": 3}])
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_collapsedStacks(self):
+        root = tempfile.mkdtemp()
+        try:
+            sampler = profiling.startSampling(interval=0.001)
+            self.assertIs(profiling.samplingProfiler(), sampler)
+            _busyLoop(0.3)
+            self.assertIs(profiling.stopSampling(), sampler)
+            self.assertFalse(sampler.isRunning())
+            self.assertTrue(sampler.sampleCount > 0)
+            lines = sampler.collapsedStacks()
+            self.assertTrue(any("_busyLoop" in line for line in lines))
+            stack, count = lines[0].rsplit(" ", 1)
+            self.assertTrue(int(count) > 0)
+            # the sampling thread doesn't sample itself
+            self.assertFalse(any("ZooSamplingProfiler" in line for line in lines))
+            filePath = os.path.join(root, "samples.folded")
+            sampler.writeCollapsed(filePath)
+            with open(filePath) as f:
+                self.assertEquals(f.read().splitlines(), lines)
+        finally:
+            profiling.stopSampling()
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,274 @@
+import json
+import logging
+import os
+import shutil
+import StringIO
+import sys
+import tempfile
+import threading
+import unittest
+from collections import namedtuple
+
+from zoo.libs.utils import zlogging
+
+
+class _BlockingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.unblock = threading.Event()
+        self.entered = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.entered.set()
+        self.unblock.wait(5)
+        self.records.append(record.getMessage())
+
+
+class TestJsonFormatter(unittest.TestCase):
+    def record(self, msg="created %s", args=("joint",), exc_info=None):
+        record = logging.LogRecord("zoo.tests", logging.INFO, __file__, 10, msg, args, exc_info, "create")
+        record.application = "overridden"
+        record.node = object()
+        record.frame = 1001
+        record._private = True
+        return record
+
+    def formatted(self, formatter, record):
+        result = json.loads(formatter.format(record))
+        self.assertTrue(result.pop("timestamp"))
+        return result
+
+    def test_matchesOrdered(self):
+        fmt = zlogging.CentralLogManager().jsonFormatter
+        extra = {"application": "maya", "machine": "workstation"}
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            exc_info = sys.exc_info()
+        for record in (self.record(), self.record({"custom": 1}, ()), self.record(exc_info=exc_info)):
+            ordered = self.formatted(zlogging.ZooJsonFormatter(fmt, extra=extra, timestamp=True,
+                                                               orderedFields=True), record)
+            fast = self.formatted(zlogging.ZooJsonFormatter(fmt, extra=extra, timestamp=True), record)
+            self.assertEquals(fast, ordered)
+            self.assertEquals(fast["application"], "maya")
+            self.assertEquals(fast["frame"], 1001)
+            self.assertNotIn("_private", fast)
+
+    def test_namedTuple(self):
+        point = namedtuple("Point", "x y")
+        fmt = zlogging.CentralLogManager().jsonFormatter
+        record = self.record({"point": point(1, 2)}, ())
+        ordered = self.formatted(zlogging.ZooJsonFormatter(fmt, timestamp=True, orderedFields=True), record)
+        fast = self.formatted(zlogging.ZooJsonFormatter(fmt, timestamp=True), record)
+        self.assertEquals(fast, ordered)
+        self.assertEquals(fast["point"], [1, 2])
+
+    def test_setExtra(self):
+        formatter = zlogging.ZooJsonFormatter("%(message)")
+        result = json.loads(formatter.format(self.record()))
+        self.assertEquals(sorted(result), ["application", "frame", "message", "node"])
+        self.assertEquals(result["application"], "overridden")
+        formatter.setExtra({"application": "maya", "machine": "workstation"})
+        result = json.loads(formatter.format(self.record()))
+        self.assertEquals(sorted(result), ["application", "frame", "machine", "message", "node"])
+        self.assertEquals(result["application"], "maya")
+
+
+class _RecordingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class _FailingHandler(logging.Handler):
+    """Raises for every other record.
+    """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.count = 0
+        self.records = []
+
+    def emit(self, record):
+        self.count += 1
+        if self.count % 2:
+            raise RuntimeError("failed")
+        self.records.append(record.getMessage())
+
+
+class _FormatCounter(object):
+    count = 0
+
+    def __format__(self, spec):
+        _FormatCounter.count += 1
+        return "counted"
+
+
+class TestLazyLogger(unittest.TestCase):
+    def setUp(self):
+        self.logger = zlogging.getLogger("zoo.tests.lazyLogging")
+        self.logger.propagate = False
+        self.handler = _RecordingHandler()
+        self.logger.addHandler(self.handler)
+        self.lazy = zlogging.LazyLogger(self.logger)
+        zlogging.CentralLogManager().changeLevel(self.logger.name, logging.INFO)
+        _FormatCounter.count = 0
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_lazyFormatting(self):
+        self.lazy.debug("skipped {}", _FormatCounter())
+        self.assertEquals(_FormatCounter.count, 0)
+        self.assertEquals(self.handler.records, [])
+        self.lazy.info("written {} {}", _FormatCounter(), 2)
+        self.assertEquals(_FormatCounter.count, 0)
+        record = self.handler.records[0]
+        self.assertEquals(record.getMessage(), "written counted 2")
+        self.assertEquals(_FormatCounter.count, 1)
+        # the record points at the caller rather than the wrapper
+        self.assertEquals(record.funcName, "test_lazyFormatting")
+        self.assertEquals(os.path.splitext(record.pathname)[0], os.path.splitext(__file__)[0])
+        # messages without arguments aren't formatted
+        self.lazy.warning("{not a field}")
+        self.assertEquals(self.handler.records[-1].getMessage(), "{not a field}")
+
+    def test_levelCache(self):
+        self.assertFalse(self.lazy.isEnabledFor(logging.DEBUG))
+        # direct level changes aren't seen until the cache is invalidated
+        self.logger.setLevel(logging.DEBUG)
+        self.assertFalse(self.lazy.isEnabledFor(logging.DEBUG))
+        zlogging.invalidateLevelCache()
+        self.assertTrue(self.lazy.isEnabledFor(logging.DEBUG))
+        zlogging.CentralLogManager().changeLevel(self.logger.name, logging.WARNING)
+        self.assertFalse(self.lazy.isEnabledFor(logging.INFO))
+        self.lazy.info("skipped")
+        self.assertEquals(self.handler.records, [])
+        self.lazy.setLevel(logging.DEBUG)
+        self.assertEquals(self.logger.level, logging.DEBUG)
+        self.assertTrue(self.lazy.isEnabledFor(logging.DEBUG))
+
+    def test_exception(self):
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            self.lazy.exception("failed {}", "joint")
+        record = self.handler.records[0]
+        self.assertEquals(record.levelno, logging.ERROR)
+        self.assertIs(record.exc_info[0], ValueError)
+        self.assertEquals(self.lazy.name, self.logger.name)
+
+
+class TestAsyncLogging(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.logger = zlogging.getLogger("zoo.tests.asyncLogging")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+        shutil.rmtree(self.root)
+
+    def test_rotateHandler(self):
+        filePath = os.path.join(self.root, "zoo.log")
+        handler = zlogging.CentralLogManager().addAsyncRotateHandler(self.logger.name, filePath,
+                                                                     extra={"application": "tests"})
+        values = [1]
+        for index in range(100):
+            self.logger.info("record %d %s", index, values)
+        # arguments are merged when the record is queued
+        values.append(2)
+        self.assertTrue(handler.flush(5))
+        with open(filePath) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEquals(len(records), 100)
+        self.assertEquals(records[-1]["message"], "record 99 [1]")
+        self.assertEquals(records[0]["application"], "tests")
+        self.assertEquals(records[0]["levelname"], "INFO")
+
+    def test_closeWritesQueue(self):
+        target = _BlockingHandler()
+        handler = zlogging.CentralLogManager().addAsyncHandler(self.logger.name, [target], maxSize=0)
+        for index in range(50):
+            self.logger.info("record %d", index)
+        target.unblock.set()
+        self.logger.removeHandler(handler)
+        handler.close()
+        self.assertEquals(target.records, ["record %d" % index for index in range(50)])
+
+    def test_dropNewest(self):
+        target = _BlockingHandler()
+        handler = zlogging.AsyncLogHandler([target], maxSize=5, policy=zlogging.QUEUE_DROP_NEWEST, batchSize=1)
+        self.logger.addHandler(handler)
+        self.logger.info("record 0")
+        # wait for the listener to take the first record
+        self.assertTrue(target.entered.wait(5))
+        for index in range(1, 20):
+            self.logger.info("record %d", index)
+        target.unblock.set()
+        self.assertTrue(handler.flush(5))
+        # the listener holds one record, the queue the next five
+        self.assertEquals(handler.droppedCount, 14)
+        # the drops are reported with the next batch
+        self.assertEquals(target.records, ["record 0", "Logging queue full, dropped 14 log records"] +
+                          ["record %d" % index for index in range(1, 6)])
+
+    def test_dropOldest(self):
+        target = _BlockingHandler()
+        handler = zlogging.AsyncLogHandler([target], maxSize=5, policy=zlogging.QUEUE_DROP_OLDEST, batchSize=1)
+        self.logger.addHandler(handler)
+        self.logger.info("record 0")
+        # wait for the listener to take the first record
+        self.assertTrue(target.entered.wait(5))
+        for index in range(1, 20):
+            self.logger.info("record %d", index)
+        target.unblock.set()
+        self.assertTrue(handler.flush(5))
+        self.assertEquals(handler.droppedCount, 14)
+        self.assertEquals(target.records[-5:], ["record %d" % index for index in range(15, 20)])
+
+    def test_block(self):
+        target = _BlockingHandler()
+        target.unblock.set()
+        handler = zlogging.AsyncLogHandler([target], maxSize=2, policy=zlogging.QUEUE_BLOCK)
+        self.logger.addHandler(handler)
+        for index in range(200):
+            self.logger.info("record %d", index)
+        self.assertTrue(handler.flush(5))
+        self.assertEquals(handler.droppedCount, 0)
+        self.assertEquals(len(target.records), 200)
+
+    def test_failingHandler(self):
+        target = _RecordingHandler()
+        failing = _FailingHandler()
+        handler = zlogging.AsyncLogHandler([failing, target], maxSize=2, policy=zlogging.QUEUE_BLOCK, batchSize=1,
+                                           blockTimeout=1)
+        self.logger.addHandler(handler)
+        stderr = sys.stderr
+        sys.stderr = StringIO.StringIO()
+        try:
+            for index in range(20):
+                self.logger.info("record %d", index)
+            self.assertTrue(handler.flush(5))
+            errors = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        self.assertTrue(handler.listener.isRunning())
+        self.assertIn("RuntimeError: failed", errors)
+        self.assertEquals([r.getMessage() for r in target.records], ["record %d" % index for index in range(20)])
+        self.assertEquals(failing.records, ["record %d" % index for index in range(1, 20, 2)])
+
+    def test_invalidPolicy(self):
+        with self.assertRaises(ValueError):
+            zlogging.AsyncLogHandler([], policy="unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
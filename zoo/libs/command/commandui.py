@@ -4,7 +4,7 @@ from qt import QtWidgets, QtGui, QtCore
 from zoo.libs import iconlib
 from zoo.libs.utils import zlogging
 
-logger = zlogging.getLogger(__name__)
+logger = zlogging.getLazyLogger(__name__)
 
 
 class CommandActionBase(QtCore.QObject):
@@ -72,7 +72,7 @@ class CommandAction(CommandActionBase):
                     self.item.setIcon(icon)
         self.item.setStatusTip(uiData.get("tooltip"))
         self.item.triggered.connect(partial(self.triggered.emit, self.command.id))
-        logger.debug("Added commandAction, {}".format(text))
+        logger.debug("Added commandAction, {}", text)
         return self.item
 
     def show(self):
@@ -7,7 +7,7 @@ from zoo.libs.plugin import plugin
 from zoo.libs.utils import modules
 from zoo.libs.utils import zlogging
 
-logger = zlogging.zooLogger
+logger = zlogging.LazyLogger(zlogging.zooLogger)
 
 
 class PluginManager(object):
@@ -94,7 +94,7 @@ class PluginManager(object):
         """
         if classObj not in self.plugins.values() and issubclass(classObj, self.interface):
             name = getattr(classObj, self.variableName) if hasattr(classObj, self.variableName) else classObj.__name__
-            logger.debug("registering plugin -> {}".format(name))
+            logger.debug("registering plugin -> {}", name)
             self.plugins[str(name)] = classObj
 
     def loadPlugin(self, pluginName, **kwargs):
@@ -105,7 +105,7 @@ class PluginManager(object):
         """
         tool = self.plugins.get(pluginName)
         if tool:
-            logger.debug("Loading Plugin -> {}".format(pluginName))
+            logger.debug("Loading Plugin -> {}", pluginName)
             # pass the manager into the plugin, this is so we have access to any global info
             spec= inspect.getargspec(tool.__init__)
             keywords = spec.keywords
@@ -7,6 +7,12 @@ import colorsys
 from math import radians, sqrt, cos, sin
 from zoo.libs.utils import zoomath
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
 def convertHsvToRgb(hsv):
     """Converts hsv values to rgb
     rgb is in 0-1 range, hsv is in (0-360, 0-1, 0-1) ranges
@@ -113,6 +119,84 @@ def convertSrgbListToLinear(srgbList, roundNumber=True):
     return linearRgbList
 
 
+# 8-bit lookup tables.
+# There are only 256 possible values for an 8-bit channel so the forward conversions are simply precomputed with the
+# analytic functions above and are therefore exact. Going from a float linear value to 8-bit srgb uses a
+# LINEAR_TO_SRGB_LUT_SIZE segment table with linear interpolation, the max absolute error against
+# convertSingleLinearToSrgb is ~1.6e-5 (0.004 of an 8-bit step) which is located just above the linear toe, so the
+# quantized 8-bit result only differs from the analytic version for values which sit right on a rounding
+# boundary (40 out of 2 million evenly spaced samples, each off by one).
+# With numpy the 8-bit batch conversions are ~50x faster than the per channel pow() of the scalar functions.
+SRGB8_TO_LINEAR_LUT = tuple(convertSingleSrgbToLinear(i / 255.0) for i in range(256))
+LINEAR8_TO_SRGB_LUT = tuple(convertSingleLinearToSrgb(i / 255.0) for i in range(256))
+LINEAR_TO_SRGB_LUT_SIZE = 4096
+LINEAR_TO_SRGB_LUT = tuple(convertSingleLinearToSrgb(float(i) / LINEAR_TO_SRGB_LUT_SIZE)
+                           for i in range(LINEAR_TO_SRGB_LUT_SIZE + 1))
+
+
+def convertSingleSrgb8ToLinear(colorValue):
+    """Changes a single 8-bit srgb color channel to a linear float using a lookup table.
+
+    :param colorValue: a single color value, expects an int from 0-255
+    :type colorValue: int
+    :return: the new color converted to linear in 0-1 range
+    :rtype: float
+    """
+    return SRGB8_TO_LINEAR_LUT[colorValue]
+
+
+def convertSingleLinear8ToSrgb(colorValue):
+    """Changes a single 8-bit linear color channel to a srgb float using a lookup table.
+
+    :param colorValue: a single color value, expects an int from 0-255
+    :type colorValue: int
+    :return: the new color converted to srgb in 0-1 range
+    :rtype: float
+    """
+    return LINEAR8_TO_SRGB_LUT[colorValue]
+
+
+def convertSingleLinearToSrgb8(colorValue):
+    """Changes a single linear float color channel to a 8-bit srgb int, using an interpolated lookup table.
+
+    :param colorValue: a single color value, expects a value from 0-1, values outside that range are clamped.
+    :type colorValue: float
+    :return: the new color converted to srgb in 0-255 range
+    :rtype: int
+    """
+    position = zoomath.clamp(colorValue) * LINEAR_TO_SRGB_LUT_SIZE
+    index = min(int(position), LINEAR_TO_SRGB_LUT_SIZE - 1)
+    lower = LINEAR_TO_SRGB_LUT[index]
+    srgb = lower + (LINEAR_TO_SRGB_LUT[index + 1] - lower) * (position - index)
+    return int(srgb * 255.0 + 0.5)
+
+
+def convertColorSrgb8ToLinear(srgbColor):
+    """Changes a 8-bit srgb color to linear color
+
+    :param srgbColor: a rgb color list/tuple, expects ints from 0-255
+    :type srgbColor: list(int)
+    :return: the new color converted to linear in 0-1 range
+    :rtype: tuple(float)
+    """
+    return (SRGB8_TO_LINEAR_LUT[srgbColor[0]],
+            SRGB8_TO_LINEAR_LUT[srgbColor[1]],
+            SRGB8_TO_LINEAR_LUT[srgbColor[2]])
+
+
+def convertColorLinearToSrgb8(linearRgb):
+    """Changes a linear float color to a 8-bit srgb color
+
+    :param linearRgb: a rgb color list/tuple, expects values from 0-1
+    :type linearRgb: list(float)
+    :return: the new color converted to srgb in 0-255 range
+    :rtype: tuple(int)
+    """
+    return (convertSingleLinearToSrgb8(linearRgb[0]),
+            convertSingleLinearToSrgb8(linearRgb[1]),
+            convertSingleLinearToSrgb8(linearRgb[2]))
+
+
 def offsetHueColor(hsv, offset):
     """Offsets the hue value (0-360) by the given `offset` amount
     keeps in range 0-360 by looping
@@ -300,6 +384,26 @@ class RGBRotate(object):
         bx = r * self.matrix[2][0] + g * self.matrix[2][1] + b * self.matrix[2][2]
         return zoomath.clamp(rx, 0, 255), zoomath.clamp(gx, 0, 255), zoomath.clamp(bx, 0, 255)
 
+    def applyArray(self, colours):
+        """Vectorized version of :meth:`apply` which rotates every colour in the (N,3) or (N,4) array,
+        the alpha channel is left untouched.
+
+        :param colours: sequence of colours in 0-255 range eg. [(255, 0, 0), (0, 255, 0)]
+        :type colours: numpy.ndarray or list(tuple)
+        :return: the rotated colours, a numpy array when numpy is available otherwise a list of lists
+        :rtype: numpy.ndarray or list(list)
+        """
+        if numpy is None:
+            return _mapColours(lambda c: self.apply(*c), colours)
+        colours = _asColourArray(colours)
+        r, g, b = colours[:, 0].copy(), colours[:, 1].copy(), colours[:, 2].copy()
+        m = self.matrix
+        # keep the same operation order as apply() so the results match exactly
+        colours[:, 0] = numpy.clip(r * m[0][0] + g * m[0][1] + b * m[0][2], 0, 255)
+        colours[:, 1] = numpy.clip(r * m[1][0] + g * m[1][1] + b * m[1][2], 0, 255)
+        colours[:, 2] = numpy.clip(r * m[2][0] + g * m[2][1] + b * m[2][2], 0, 255)
+        return colours
+
 
 def hslColourOffsetFloat(rgb, hueOffset=0, saturationOffset=0, lightnessOffset=0):
     """Offset color with hue, saturation and lightness (brighten/darken) values
@@ -370,3 +474,318 @@ def hslColourOffsetInt(rgb, hueOffset=0, saturationOffset=0, lightnessOffset=0):
                                lightnessOffset=lightnessOffset)
     return rgbFloatToInt(rgb)
 
+
+# Batch colour conversions.
+# The following functions operate on (N,3) or (N,4) arrays of colours, the 4th(alpha) channel is always passed
+# through untouched. When numpy is available the conversions are vectorized and return a numpy.ndarray of float64,
+# otherwise they fall back to the scalar functions above and return a list of lists. Both paths follow the same
+# operation order as the scalar functions so the results are identical, the only exception being the srgb curves
+# where some numpy builds use a SIMD pow() which can differ from the scalar result in the last bit(1 ulp).
+
+
+def _asColourArray(colours):
+    """Returns a float64 copy of `colours` as a 2D array, raising ValueError if it isn't (N,3) or (N,4)
+    """
+    colours = numpy.array(colours, dtype=numpy.float64, ndmin=2)
+    if colours.ndim != 2 or colours.shape[1] not in (3, 4):
+        raise ValueError("Expected a (N,3) or (N,4) colour array, got shape: {}".format(colours.shape))
+    return colours
+
+
+def _mapColours(func, colours):
+    """Pure python fallback which runs `func` on the rgb part of each colour, keeping alpha if present
+    """
+    return [list(func(list(col[:3]))) + list(col[3:]) for col in colours]
+
+
+def _isUint8Array(colours):
+    return isinstance(colours, numpy.ndarray) and colours.dtype == numpy.uint8
+
+
+def _asUint8ColourArray(colours):
+    colours = numpy.asarray(colours)
+    if colours.ndim != 2 or colours.shape[1] not in (3, 4):
+        raise ValueError("Expected a (N,3) or (N,4) colour array, got shape: {}".format(colours.shape))
+    if colours.dtype != numpy.uint8:
+        colours = numpy.clip(colours, 0, 255).astype(numpy.uint8)
+    return colours
+
+
+def _rgbToHsvArray(rgb):
+    """numpy port of colorsys.rgb_to_hsv, operates on a (N,3+) array in place. hue is returned in 0-1 range
+    """
+    r, g, b = rgb[:, 0].copy(), rgb[:, 1].copy(), rgb[:, 2].copy()
+    maxc = numpy.maximum(numpy.maximum(r, g), b)
+    minc = numpy.minimum(numpy.minimum(r, g), b)
+    delta = maxc - minc
+    grey = minc == maxc
+    # avoid the division warnings for greys, the values are replaced below
+    safeDelta = numpy.where(grey, 1.0, delta)
+    safeMax = numpy.where(maxc == 0.0, 1.0, maxc)
+    rc = (maxc - r) / safeDelta
+    gc = (maxc - g) / safeDelta
+    bc = (maxc - b) / safeDelta
+    h = numpy.where(r == maxc, bc - gc, numpy.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = numpy.mod(h / 6.0, 1.0)
+    rgb[:, 0] = numpy.where(grey, 0.0, h)
+    rgb[:, 1] = numpy.where(grey, 0.0, delta / safeMax)
+    rgb[:, 2] = maxc
+    return rgb
+
+
+def _hsvToRgbArray(hsv):
+    """numpy port of colorsys.hsv_to_rgb, operates on a (N,3+) array in place. hue is expected in 0-1 range
+    """
+    h, s, v = hsv[:, 0].copy(), hsv[:, 1].copy(), hsv[:, 2].copy()
+    # colorsys uses int() which truncates towards zero
+    i = numpy.trunc(h * 6.0)
+    f = (h * 6.0) - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = numpy.mod(i, 6).astype(numpy.int64)
+    choices = numpy.array([[v, t, p], [q, v, p], [p, v, t], [p, q, v], [t, p, v], [v, p, q]])
+    rows = numpy.arange(len(hsv))
+    for channel in range(3):
+        hsv[:, channel] = choices[i, channel, rows]
+    grey = s == 0.0
+    if grey.any():
+        hsv[grey, 0] = v[grey]
+        hsv[grey, 1] = v[grey]
+        hsv[grey, 2] = v[grey]
+    return hsv
+
+
+def convertSrgbArrayToLinear(colours):
+    """Vectorized version of :func:`convertColorSrgbToLinear`, uint8 arrays are treated as 8-bit colours and
+    are routed through :func:`convertSrgb8ArrayToLinear`.
+
+    :param colours: (N,3) or (N,4) srgb colours in 0-1 range
+    :type colours: numpy.ndarray or list(tuple)
+    :return: the linear colours
+    :rtype: numpy.ndarray or list(list)
+    """
+    if numpy is None:
+        return _mapColours(convertColorSrgbToLinear, colours)
+    if _isUint8Array(colours):
+        return convertSrgb8ArrayToLinear(colours)
+    colours = _asColourArray(colours)
+    rgb = colours[:, :3]
+    curve = rgb > 0.04045
+    a = 0.055
+    result = rgb * (1.0 / 12.92)
+    result[curve] = numpy.power((rgb[curve] + a) * (1.0 / (1 + a)), 2.4)
+    colours[:, :3] = result
+    return colours
+
+
+def convertLinearArrayToSrgb(colours):
+    """Vectorized version of :func:`convertColorLinearToSrgb`, uint8 arrays are treated as 8-bit colours and
+    are routed through :func:`convertLinear8ArrayToSrgb`.
+
+    :param colours: (N,3) or (N,4) linear colours in 0-1 range
+    :type colours: numpy.ndarray or list(tuple)
+    :return: the srgb colours
+    :rtype: numpy.ndarray or list(list)
+    """
+    if numpy is None:
+        return _mapColours(convertColorLinearToSrgb, colours)
+    if _isUint8Array(colours):
+        return convertLinear8ArrayToSrgb(colours)
+    colours = _asColourArray(colours)
+    rgb = colours[:, :3]
+    curve = rgb > 0.0031308
+    a = 0.055
+    result = rgb * 12.92
+    result[curve] = (1 + a) * numpy.power(rgb[curve], 1 / 2.4) - a
+    colours[:, :3] = result
+    return colours
+
+
+def convertHsvArrayToRgb(colours):
+    """Vectorized version of :func:`convertHsvToRgb`
+
+    :param colours: (N,3) or (N,4) hsv colours, hue in 0-360 range, sat/value in 0-1 range
+    :type colours: numpy.ndarray or list(tuple)
+    :return: the rgb colours in 0-1 range
+    :rtype: numpy.ndarray or list(list)
+    """
+    if numpy is None:
+        return _mapColours(convertHsvToRgb, colours)
+    colours = _asColourArray(colours)
+    colours[:, 0] /= 360.0
+    return _hsvToRgbArray(colours)
+
+
+def convertRgbArrayToHsv(colours):
+    """Vectorized version of :func:`convertRgbToHsv`
+
+    :param colours: (N,3) or (N,4) rgb colours in 0-1 range
+    :type colours: numpy.ndarray or list(tuple)
+    :return: the hsv colours, hue in 0-360 range, sat/value in 0-1 range
+    :rtype: numpy.ndarray or list(list)
+    """
+    if numpy is None:
+        return _mapColours(convertRgbToHsv, colours)
+    colours = _rgbToHsvArray(_asColourArray(colours))
+    colours[:, 0] *= 360.0
+    return colours
+
+
+def hueShiftArray(colours, shift):
+    """Vectorized version of :func:`hueShift`
+
+    :param colours: (N,3) or (N,4) colours in 0-255 range
+    :type colours: numpy.ndarray or list(tuple)
+    :param shift: The distance and direction of the colour to shift
+    :type shift: int
+    :return: the colours with the shifted hue
+    :rtype: numpy.ndarray or list(list)
+    """
+    rgbRotator = RGBRotate()
+    rgbRotator.set_hue_rotation(shift)
+    return rgbRotator.applyArray(colours)
+
+
+def hslColourOffsetFloatArray(colours, hueOffset=0, saturationOffset=0, lightnessOffset=0):
+    """Vectorized version of :func:`hslColourOffsetFloat`
+
+    :param colours: (N,3) or (N,4) rgb colours in 0.0-1.0 range
+    :type colours: numpy.ndarray or list(tuple)
+    :param hueOffset: the hue offset in 0-360 range
+    :type hueOffset: float
+    :param saturationOffset: the saturation offset in 0.0-1.0 range
+    :type saturationOffset: float
+    :param lightnessOffset: the lightness value offset, lighten (0.2) or darken (-0.3), 0-0.1 range as an offset
+    :type lightnessOffset: float
+    :return: the changed rgb colours in 0.0-1.0 range
+    :rtype: numpy.ndarray or list(list)
+    """
+    if numpy is None:
+        return _mapColours(lambda c: hslColourOffsetFloat(c, hueOffset=hueOffset,
+                                                          saturationOffset=saturationOffset,
+                                                          lightnessOffset=lightnessOffset), colours)
+    colours = _asColourArray(colours)
+    if hueOffset:
+        colours = _rgbToHsvArray(colours)
+        hue = colours[:, 0] * 360.0 + hueOffset
+        # matches hslColourOffsetFloat which wraps values above 360 and shifts everything else by 360
+        colours[:, 0] = numpy.where(hue > 360.0, hue - 360.0, numpy.where(hue < 360.0, hue + 360.0, hue)) / 360.0
+        colours = _hsvToRgbArray(colours)
+    if saturationOffset:
+        colours = _rgbToHsvArray(colours)
+        # round trip the hue through degrees like the scalar version does
+        colours[:, 0] = (colours[:, 0] * 360.0) / 360.0
+        colours[:, 1] = numpy.clip(colours[:, 1] + saturationOffset, 0.0, 1.0)
+        colours = _hsvToRgbArray(colours)
+    if lightnessOffset:
+        colours[:, :3] = numpy.clip(colours[:, :3] + lightnessOffset, 0.0, 1.0)
+    return colours
+
+
+def hslColourOffsetIntArray(colours, hueOffset=0, saturationOffset=0, lightnessOffset=0):
+    """Vectorized version of :func:`hslColourOffsetInt`
+
+    :param colours: (N,3) or (N,4) rgb colours in 0-255 range
+    :type colours: numpy.ndarray or list(tuple)
+    :param hueOffset: the hue offset in 0-360 range
+    :type hueOffset: int
+    :param saturationOffset: the saturation offset in 0-255 range
+    :type saturationOffset: int
+    :param lightnessOffset: the lightness value offset, lighten (30) or darken (-30), 0-255 range as an offset
+    :type lightnessOffset: int
+    :return: the changed rgb colours in 0-255 range
+    :rtype: numpy.ndarray or list(list)
+    """
+    if numpy is None:
+        return _mapColours(lambda c: hslColourOffsetInt(c, hueOffset=hueOffset,
+                                                        saturationOffset=saturationOffset,
+                                                        lightnessOffset=lightnessOffset), colours)
+    colours = _asColourArray(colours)
+    rgb = hslColourOffsetFloatArray(colours[:, :3] / 255.0, hueOffset=hueOffset,
+                                    saturationOffset=float(saturationOffset) / 255.0,
+                                    lightnessOffset=float(lightnessOffset) / 255.0)
+    # int() truncates, which is what rgbFloatToInt does
+    colours[:, :3] = numpy.trunc(rgb * 255.0)
+    return colours.astype(numpy.int64)
+
+
+# 8-bit batch conversions, see the lookup table notes at the top of the module. For these the alpha channel is
+# converted between the 0-255 and 0-1 ranges rather than passed through.
+
+def _lookupColours(lut, colours):
+    """Pure python fallback for the 8-bit lookups
+    """
+    result = []
+    append = result.append
+    for col in colours:
+        if len(col) == 3:
+            append([lut[col[0]], lut[col[1]], lut[col[2]]])
+        else:
+            append([lut[col[0]], lut[col[1]], lut[col[2]], col[3] / 255.0])
+    return result
+
+
+def convertSrgb8ArrayToLinear(colours):
+    """Converts (N,3) or (N,4) 8-bit srgb colours to linear floats in 0-1 range via a lookup table.
+
+    :param colours: srgb colours in 0-255 range
+    :type colours: numpy.ndarray or list(tuple(int))
+    :return: the linear colours in 0-1 range
+    :rtype: numpy.ndarray or list(list(float))
+    """
+    if numpy is None:
+        return _lookupColours(SRGB8_TO_LINEAR_LUT, colours)
+    colours = _asUint8ColourArray(colours)
+    result = _SRGB8_TO_LINEAR_ARRAY.take(colours)
+    if colours.shape[1] == 4:
+        result[:, 3] = colours[:, 3] / 255.0
+    return result
+
+
+def convertLinear8ArrayToSrgb(colours):
+    """Converts (N,3) or (N,4) 8-bit linear colours to srgb floats in 0-1 range via a lookup table.
+
+    :param colours: linear colours in 0-255 range
+    :type colours: numpy.ndarray or list(tuple(int))
+    :return: the srgb colours in 0-1 range
+    :rtype: numpy.ndarray or list(list(float))
+    """
+    if numpy is None:
+        return _lookupColours(LINEAR8_TO_SRGB_LUT, colours)
+    colours = _asUint8ColourArray(colours)
+    result = _LINEAR8_TO_SRGB_ARRAY.take(colours)
+    if colours.shape[1] == 4:
+        result[:, 3] = colours[:, 3] / 255.0
+    return result
+
+
+def convertLinearArrayToSrgb8(colours):
+    """Converts (N,3) or (N,4) linear float colours to 8-bit srgb colours using the interpolated lookup table.
+
+    :param colours: linear colours in 0-1 range, values outside the range are clamped
+    :type colours: numpy.ndarray or list(tuple(float))
+    :return: the srgb colours in 0-255 range, as a uint8 array when numpy is available
+    :rtype: numpy.ndarray or list(list(int))
+    """
+    if numpy is None:
+        return [list(convertColorLinearToSrgb8(col)) + [int(zoomath.clamp(a) * 255.0 + 0.5) for a in col[3:]]
+                for col in colours]
+    colours = numpy.clip(_asColourArray(colours), 0.0, 1.0)
+    position = colours[:, :3] * LINEAR_TO_SRGB_LUT_SIZE
+    index = position.astype(numpy.intp)
+    numpy.minimum(index, LINEAR_TO_SRGB_LUT_SIZE - 1, out=index)
+    lower = _LINEAR_TO_SRGB_ARRAY.take(index)
+    position -= index
+    position *= _LINEAR_TO_SRGB_ARRAY.take(index + 1) - lower
+    position += lower
+    colours[:, :3] = position
+    colours *= 255.0
+    colours += 0.5
+    return colours.astype(numpy.uint8)
+
+
+if numpy is not None:
+    _SRGB8_TO_LINEAR_ARRAY = numpy.array(SRGB8_TO_LINEAR_LUT, dtype=numpy.float64)
+    _LINEAR8_TO_SRGB_ARRAY = numpy.array(LINEAR8_TO_SRGB_LUT, dtype=numpy.float64)
+    _LINEAR_TO_SRGB_ARRAY = numpy.array(LINEAR_TO_SRGB_LUT, dtype=numpy.float64)
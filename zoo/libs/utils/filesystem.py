@@ -3,18 +3,33 @@ import json
 import os
 import subprocess
 import shutil
+import stat
 import errno
 import zipfile
 import cStringIO
 import re
 import functools
+import hashlib
+import itertools
+import multiprocessing
 import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from multiprocessing.pool import ThreadPool
 
-from zoo.libs.utils import zlogging, commandline
+from zoo.libs.utils import zlogging, commandline, general
+from zoo.libs.utils.path import scanDirectory
 
-logger = zlogging.getLogger(zlogging.CENTRAL_LOGGER_NAME)
+logger = zlogging.getLazyLogger(zlogging.CENTRAL_LOGGER_NAME)
 
 FILENAMEEXP = re.compile(u'[^\w\.-1]', re.UNICODE)
+# maximum number of directories kept in the folder size cache
+FOLDER_STATS_CACHE_SIZE = 100000
+# directory: (mtime, size of the directory's files, file count, sub directories)
+_FOLDER_STATS_CACHE = {}
 
 
 def clearUnMasked(func):
@@ -133,16 +148,422 @@ def batchCopyFiles(paths, permissions=0777):
     :return: a list of tuples containing source,destination fails
     :rtype: list(tuple(str, str)
     """
-    failed = []
+    manifest = copyFiles(paths, permissions=permissions, skip=None)
+    return [(record["source"], record["destination"]) for record in manifest if record["status"] == COPY_FAILED]
+
+
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+COPY_COPIED = "copied"
+COPY_SKIPPED = "skipped"
+COPY_FAILED = "failed"
+
+
+def copyFiles(paths, processes=8, permissions=0777, skip=None, progress=None, bufferSize=COPY_BUFFER_SIZE):
+    """Copies files in parallel, preserving the modified time so later copies can be skipped.
+
+    On linux the data is copied in the kernel via os.copy_file_range or os.sendfile where the python build
+    supports them, otherwise the files are copied with large buffers.
+
+    .. code-block:: python
+
+        def onProgress(copied, total):
+            print "{} / {}".format(humanizeBytes(copied), humanizeBytes(total))
+
+        manifest = copyFiles([("/textures/a_1001.exr", "/publish/a_1001.exr")], progress=onProgress)
+        failed = [record for record in manifest if record["status"] == COPY_FAILED]
+
+    :param paths: source path, destination path
+    :type paths: iterable(tuple(str, str))
+    :param processes: the number of copy threads.
+    :type processes: int
+    :param permissions: permissions for any destination folders which are created.
+    :type permissions: int
+    :param skip: "stat" skips files when the destination has the same size and modified time, "hash" \
+    when the size and sha1 match, None(the default) always copies.
+    :type skip: str or None
+    :param progress: called with (copiedBytes, totalBytes) as data is copied, from the copy threads.
+    :type progress: callable or None
+    :param bufferSize: the read size for the buffered copy.
+    :type bufferSize: int
+    :return: the manifest, one dict per file in the order of `paths` with the keys "source", "destination", \
+    "status"(COPY_COPIED, COPY_SKIPPED, COPY_FAILED), "size" and "error".
+    :rtype: list(dict)
+    """
+    manifest = []
+    totalSize = 0
     for source, destination in paths:
+        record = {"source": source, "destination": destination, "status": None, "size": 0, "error": None}
         try:
-            logger.info("Copying %s --> %s..." % (source, destination))
-            copy_file(source, destination, permissions=permissions)
-        except OSError:
-            raise
-            failed.append((source, destination))
+            record["size"] = os.path.getsize(source)
+        except OSError as er:
+            record["status"] = COPY_FAILED
+            record["error"] = str(er)
+        totalSize += record["size"]
+        manifest.append(record)
+
+    # the parent folders are created up front, the umask is process wide so it can't be changed per thread
+    createdFolders = set()
+    for record in manifest:
+        if record["status"] is not None:
             continue
-    return failed
+        try:
+            _ensureParentExists(record["destination"], permissions, createdFolders)
+        except OSError as er:
+            logger.error("Failed to create the folder for {}", record["destination"], exc_info=True)
+            record["status"] = COPY_FAILED
+            record["error"] = str(er)
+
+    lock = threading.Lock()
+    copied = [0]
+
+    def _addProgress(size):
+        if progress is None or not size:
+            return
+        with lock:
+            copied[0] += size
+            progress(copied[0], totalSize)
+
+    def _copy(record):
+        if record["status"] is not None:
+            return
+        source, destination = record["source"], record["destination"]
+        try:
+            if skip and _isCopyUpToDate(source, destination, skip):
+                record["status"] = COPY_SKIPPED
+                _addProgress(record["size"])
+                return
+            _copyFileData(source, destination, bufferSize, _addProgress)
+            shutil.copystat(source, destination)
+            record["status"] = COPY_COPIED
+        except (IOError, OSError) as er:
+            logger.error("Failed to copy {} --> {}".format(source, destination), exc_info=True)
+            record["status"] = COPY_FAILED
+            record["error"] = str(er)
+
+    if processes > 1 and len(manifest) > 1:
+        pool = ThreadPool(min(processes, len(manifest)))
+        try:
+            pool.map(_copy, manifest, chunksize=1)
+        finally:
+            pool.close()
+    else:
+        for record in manifest:
+            _copy(record)
+    return manifest
+
+
+def _ensureParentExists(filePath, permissions, created):
+    """Creates the missing parent folders of the file and sets their permissions with chmod rather than
+    clearing the umask.
+    """
+    dirname = os.path.dirname(filePath)
+    if not dirname or dirname in created or os.path.isdir(dirname):
+        return
+    missing = []
+    folder = dirname
+    while folder and not os.path.isdir(folder):
+        missing.append(folder)
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            break
+        folder = parent
+    try:
+        os.makedirs(dirname, permissions)
+    except OSError as er:
+        if er.errno != errno.EEXIST:
+            raise
+    for folder in missing:
+        os.chmod(folder, permissions)
+    created.add(dirname)
+
+
+def _isCopyUpToDate(source, destination, method):
+    try:
+        sourceStat = os.stat(source)
+        destinationStat = os.stat(destination)
+    except OSError:
+        return False
+    if sourceStat.st_size != destinationStat.st_size:
+        return False
+    if method == "hash":
+        return fileHash(source) == fileHash(destination)
+    # copystat can lose sub second precision depending on the filesystem
+    return abs(sourceStat.st_mtime - destinationStat.st_mtime) < 1.0
+
+
+def fileHash(filePath, algorithm="sha1", bufferSize=COPY_BUFFER_SIZE):
+    """Returns the hex digest of the file contents, reads the file in chunks.
+
+    :type filePath: str
+    :param algorithm: any hashlib algorithm name
+    :type algorithm: str
+    :type bufferSize: int
+    :rtype: str
+    """
+    hasher = hashlib.new(algorithm)
+    with open(filePath, "rb") as f:
+        for chunk in iter(functools.partial(f.read, bufferSize), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _copyFileData(source, destination, bufferSize, progress):
+    with open(source, "rb") as fsrc:
+        with open(destination, "wb") as fdst:
+            if _copyFileKernel(fsrc, fdst, progress):
+                return
+            while True:
+                chunk = fsrc.read(bufferSize)
+                if not chunk:
+                    break
+                fdst.write(chunk)
+                progress(len(chunk))
+
+
+def _copyFileKernel(fsrc, fdst, progress):
+    """Copies the data in the kernel if supported, returns False if nothing was copied so the caller
+    can fall back to a buffered copy.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    copyFunc = getattr(os, "copy_file_range", None)
+    if copyFunc is None:
+        sendfile = getattr(os, "sendfile", None)
+        if sendfile is None:
+            return False
+        copyFunc = lambda inFd, outFd, count: sendfile(outFd, inFd, None, count)
+    inFd, outFd = fsrc.fileno(), fdst.fileno()
+    blockSize = 64 * 1024 * 1024
+    copiedBytes = 0
+    while True:
+        try:
+            sent = copyFunc(inFd, outFd, blockSize)
+        except OSError as er:
+            # unsupported by the filesystem, fall back when nothing has been written yet
+            if copiedBytes == 0 and er.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTSUP,
+                                                 errno.EBADF):
+                return False
+            raise
+        if not sent:
+            return True
+        copiedBytes += sent
+        progress(sent)
+
+
+class ContentStore(object):
+    """Content addressed file store, file data is stored once per unique content as a read only blob named by
+    its hash and the visible files are hardlinks(or reflinks/copies) of the blobs.
+
+    File hashes are cached against the device, inode, size and modified time of the file so unchanged files
+    are never read twice, the cache is saved in the store root.
+
+    .. code-block:: python
+
+        store = ContentStore("/studio/.zooStore")
+        manifest = store.ingestDirectory("/studio/presets")
+        store.materialise(manifest, "/projects/show/presets")
+        store.saveIndex()
+
+    Blobs are read only copies owned by the store, files linked to a blob share its data and permissions so
+    they have to be replaced rather than edited in place.
+
+    :param root: the store directory, created if it doesn't exist
+    :type root: str
+    :param algorithm: the hashlib algorithm used to address the blobs
+    :type algorithm: str
+    :param processes: the number of hashing threads(hashlib releases the GIL)
+    :type processes: int
+    """
+    LINK_HARDLINK = "hardlink"
+    LINK_REFLINK = "reflink"
+    LINK_COPY = "copy"
+    _FICLONE = 0x40049409
+
+    def __init__(self, root, algorithm="sha1", processes=4):
+        self.root = root
+        self.algorithm = algorithm
+        self.processes = processes
+        self.objectsPath = os.path.join(root, "objects")
+        self.indexPath = os.path.join(root, "hashIndex.json")
+        # "device:inode": (size, mtime, digest)
+        self._hashCache = {}
+        ensureFolderExists(self.objectsPath)
+        if os.path.exists(self.indexPath):
+            try:
+                self._hashCache = dict((str(k), tuple(v)) for k, v in loadJson(self.indexPath).iteritems())
+            except ValueError:
+                logger.warning("Ignoring corrupt content store index: {}".format(self.indexPath))
+
+    def __repr__(self):
+        return "<{}> {}".format(self.__class__.__name__, self.root)
+
+    def saveIndex(self):
+        """Saves the hash cache so future sessions don't need to hash unchanged files.
+        """
+        tempPath = self.indexPath + ".tmp"
+        with open(tempPath, "w") as f:
+            json.dump(self._hashCache, f)
+        if os.path.exists(self.indexPath):
+            os.remove(self.indexPath)
+        os.rename(tempPath, self.indexPath)
+
+    def blobPath(self, digest):
+        """
+        :param digest: the content hash
+        :type digest: str
+        :rtype: str
+        """
+        return os.path.join(self.objectsPath, digest[:2], digest[2:])
+
+    def hasBlob(self, digest):
+        return os.path.exists(self.blobPath(digest))
+
+    def hashFile(self, filePath):
+        """Returns the content hash of the file, cached by the file's inode and modified time.
+
+        :type filePath: str
+        :rtype: str
+        """
+        st = os.stat(filePath)
+        key = "{}:{}".format(st.st_dev, st.st_ino)
+        cached = self._hashCache.get(key)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime:
+            return cached[2]
+        digest = fileHash(filePath, self.algorithm)
+        self._hashCache[key] = (st.st_size, st.st_mtime, digest)
+        return digest
+
+    def hashFiles(self, filePaths):
+        """Hashes the files in parallel.
+
+        :type filePaths: iterable(str)
+        :return: the file path to digest map
+        :rtype: dict(str, str)
+        """
+        filePaths = list(filePaths)
+        if self.processes <= 1 or len(filePaths) <= 1:
+            return dict((filePath, self.hashFile(filePath)) for filePath in filePaths)
+        pool = ThreadPool(min(self.processes, len(filePaths)))
+        try:
+            return dict(zip(filePaths, pool.map(self.hashFile, filePaths, chunksize=8)))
+        finally:
+            pool.close()
+
+    def ingestFile(self, filePath, link=False, digest=None):
+        """Adds a copy of the file to the store, the file itself is left untouched unless link is True.
+
+        :param filePath: the file to add
+        :type filePath: str
+        :param link: if True the file is replaced by a read only hardlink to the blob to share the data, when \
+        the file is on another device from the store it's left as is.
+        :type link: bool
+        :param digest: the file hash if already known
+        :type digest: str
+        :return: the file digest
+        :rtype: str
+        """
+        digest = digest or self.hashFile(filePath)
+        blob = self.blobPath(digest)
+        if not os.path.exists(blob):
+            ensureFolderExists(os.path.dirname(blob))
+            # the blob is always a copy so the caller's file can't be edited into the store
+            tempPath = "{}.{}.tmp".format(blob, uuid.uuid4().hex)
+            shutil.copyfile(filePath, tempPath)
+            os.chmod(tempPath, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            try:
+                os.rename(tempPath, blob)
+            except OSError:
+                # another process stored the same content
+                os.remove(tempPath)
+        if link and not _isSameFile(filePath, blob):
+            self._linkBlob(blob, filePath, self.LINK_HARDLINK, replace=True, digest=digest)
+        return digest
+
+    def ingestDirectory(self, directory, link=False):
+        """Adds every file below the directory to the store.
+
+        :param directory: the directory to add
+        :type directory: str
+        :param link: if True the files are replaced by hardlinks to the blobs, see :meth:`ingestFile`
+        :type link: bool
+        :return: the manifest, relative file paths using forward slashes mapped to the digest.
+        :rtype: dict(str, str)
+        """
+        filePaths = [entry.path for entry in scanDirectory(directory, recursive=True, dirs=False)]
+        digests = self.hashFiles(filePaths)
+        manifest = {}
+        for filePath in filePaths:
+            digest = digests[filePath]
+            self.ingestFile(filePath, link=link, digest=digest)
+            manifest[os.path.relpath(filePath, directory).replace("\\", "/")] = digest
+        return manifest
+
+    def materialise(self, manifest, destination, linkType=LINK_HARDLINK):
+        """Creates the files of a manifest under the destination from the store blobs.
+
+        :param manifest: relative file path to digest map, as returned by :meth:`ingestDirectory`
+        :type manifest: dict(str, str)
+        :param destination: the directory to create the files in
+        :type destination: str
+        :param linkType: LINK_HARDLINK, LINK_REFLINK or LINK_COPY, links fall back to a copy when not \
+        supported by the filesystem.
+        :type linkType: str
+        :return: the created file paths
+        :rtype: list(str)
+        :raise ValueError: when a blob is missing from the store
+        """
+        created = []
+        for relativePath, digest in sorted(manifest.items()):
+            blob = self.blobPath(digest)
+            if not os.path.exists(blob):
+                raise ValueError("Missing blob {} for {}".format(digest, relativePath))
+            filePath = os.path.join(destination, *relativePath.split("/"))
+            ensureFolderExists(os.path.dirname(filePath))
+            if not (os.path.exists(filePath) and _isSameFile(filePath, blob)):
+                self._linkBlob(blob, filePath, linkType, replace=os.path.exists(filePath), digest=digest)
+            created.append(filePath)
+        return created
+
+    def _linkBlob(self, blob, filePath, linkType, replace=False, digest=None):
+        tempPath = "{}.{}.tmp".format(filePath, uuid.uuid4().hex) if replace else filePath
+        try:
+            if linkType == self.LINK_HARDLINK:
+                os.link(blob, tempPath)
+            elif linkType == self.LINK_REFLINK:
+                self._reflink(blob, tempPath)
+            else:
+                shutil.copyfile(blob, tempPath)
+        except (OSError, IOError, AttributeError, ImportError):
+            # cross device or unsupported by the filesystem/platform
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            if linkType == self.LINK_HARDLINK and replace and digest and self.hashFile(filePath) == digest:
+                # the file already has the blob's content, nothing to gain from replacing it with a copy
+                return
+            shutil.copyfile(blob, tempPath)
+        if replace:
+            if os.name == "nt":
+                os.remove(filePath)
+            os.rename(tempPath, filePath)
+
+    @classmethod
+    def _reflink(cls, source, destination):
+        import fcntl
+        with open(source, "rb") as fsrc:
+            with open(destination, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), cls._FICLONE, fsrc.fileno())
+
+
+def _isSameFile(first, second):
+    try:
+        firstStat = os.stat(first)
+        secondStat = os.stat(second)
+    except OSError:
+        return False
+    # python 2 on windows doesn't report inodes
+    if not firstStat.st_ino:
+        return False
+    return firstStat.st_ino == secondStat.st_ino and firstStat.st_dev == secondStat.st_dev
 
 
 def copyDirectoy(src, dst, ignorePattern=None):
@@ -164,6 +585,10 @@ class MoveFileContext(object):
     """With context utility to ensures that files that were moved within the scope are moved to their
     original location if an exception was raised during that scope.
 
+    When a journal path is given each move is recorded in the journal before it happens so if the process
+    dies the moves can be reverted with :meth:`recover`, which is also done automatically when entering
+    a context with a journal left over from an interrupted session.
+
     .. code-block:: python
 
         with MoveFileContext() as FileContext:
@@ -171,14 +596,28 @@ class MoveFileContext(object):
                 FileContext.move(sourceSourcePath, os.path.join(os.path.dirname(sourcePath), "destination.config"))
                 ValueError("raise an error so we revert")
 
+        with MoveFileContext(journalPath="/projects/show/.zooMove.journal") as FileContext:
+            FileContext.move("/projects/show/assets/char", "/projects/show/assets/characters/char")
+
+    :param journalPath: the journal file, None keeps the transaction in memory only.
+    :type journalPath: str or None
     """
 
-    def __init__(self):
+    def __init__(self, journalPath=None):
         self._stack = []
+        self.journalPath = journalPath
+        self._journal = None
+        # directories which need to be synced to make the moves durable
+        self._dirtyDirectories = set()
 
     def __enter__(self):
         """Returns the current class instance
         """
+        if self.journalPath:
+            self.recover(self.journalPath)
+            self._journal = open(self.journalPath, "w")
+            # make the new journal entry durable, otherwise the journal can be lost in a crash
+            _syncDirectories((os.path.dirname(os.path.abspath(self.journalPath)),))
         return self
 
     def move(self, source, destination):
@@ -187,35 +626,363 @@ class MoveFileContext(object):
         :param source: Source file to move.
         :param destination: New location for that file.
         """
-        shutil.move(source, destination)
+        if os.path.isdir(destination):
+            # same as shutil.move, record the real destination so it can be reverted
+            destination = os.path.join(destination, os.path.basename(source.rstrip("/\\")))
+        self._writeJournal({"op": "move", "source": source, "destination": destination})
+        _moveFile(source, destination)
+        self._dirtyDirectories.update((os.path.dirname(os.path.abspath(source)),
+                                       os.path.dirname(os.path.abspath(destination))))
         self._stack.append((source, destination))
 
     def __exit__(self, ex_type, value, traceback):
         """
         If some files have been moved, move them back to their original location.
         """
-        if (ex_type or value or traceback) and self._stack:
-            logger.debug("Reverting file move changes!")
-            # Move files back to their original location.
-            for source, destination in self._stack:
-                logger.debug("Moving {} -> {}".format(destination, source))
-                shutil.move(destination, source)
+        finished = False
+        try:
+            if (ex_type or value or traceback) and self._stack:
+                logger.debug("Reverting file move changes!")
+                # Move files back to their original location.
+                for source, destination in reversed(self._stack):
+                    logger.debug("Moving {} -> {}", destination, source)
+                    _moveFile(destination, source)
+                record = {"op": "rollback"}
+            else:
+                record = {"op": "commit"}
+            # the moves have to be durable before the journal says they're finished, recover() trusts it
+            _syncDirectories(self._dirtyDirectories)
+            self._writeJournal(record)
+            finished = True
+        finally:
+            self._dirtyDirectories.clear()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+                # keep the journal when the rollback failed so the remaining moves can be recovered
+                if finished:
+                    os.remove(self.journalPath)
+
+    def _writeJournal(self, record):
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    @classmethod
+    def recover(cls, journalPath):
+        """Reverts the moves of an interrupted transaction recorded in the journal, transactions which were
+        committed or already rolled back are left as is. The journal is removed afterwards.
+
+        :param journalPath: the journal file path
+        :type journalPath: str
+        :return: the (source, destination) moves which were reverted
+        :rtype: list(tuple(str, str))
+        """
+        if not os.path.exists(journalPath):
+            return []
+        moves = []
+        finished = False
+        with open(journalPath, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # partially written last record
+                    break
+                if record["op"] == "move":
+                    moves.append((record["source"], record["destination"]))
+                else:
+                    finished = True
+        reverted = []
+        if not finished:
+            directories = set()
+            for source, destination in reversed(moves):
+                # the move may not have happened before the process died
+                if os.path.exists(destination) and not os.path.exists(source):
+                    logger.debug("Recovering move {} -> {}", destination, source)
+                    _moveFile(destination, source)
+                    directories.update((os.path.dirname(os.path.abspath(source)),
+                                        os.path.dirname(os.path.abspath(destination))))
+                    reverted.append((source, destination))
+            _syncDirectories(directories)
+        os.remove(journalPath)
+        return reverted
+
+
+def _moveFile(source, destination):
+    """Moves using os.rename when possible which is atomic and doesn't copy, falls back to shutil.move
+    across devices and when the destination exists on windows(where os.rename won't replace a file) so the
+    destination is overwritten like shutil.move.
+    """
+    try:
+        os.rename(source, destination)
+    except OSError as er:
+        if er.errno not in (errno.EXDEV, errno.EEXIST):
+            raise
+        shutil.move(source, destination)
+
+
+def _syncDirectories(directories):
+    """Flushes the directory entries to disk so renames survive a crash, not supported on windows.
+    """
+    if os.name == "nt":
+        return
+    for directory in directories:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
 
 
-def folderSize(path):
+def batchRename(renames, processes=8, logPath=None):
+    """Renames files in parallel using os.rename, if any rename fails then the completed renames are reverted
+    and the error is raised.
+
+    Renames where a destination is also a source(eg. shifting udims u1->u2, u2->u3) are done in two passes via
+    temporary names so the order doesn't matter.
+
+    .. code-block:: python
+
+        renames, unmatched = path.getTexturesNamesMap(textures, "mari", "zbrush")
+        batchRename(renames, logPath="/tmp/textureRename.log")
+
+    :param renames: source to destination paths.
+    :type renames: dict(str, str) or iterable(tuple(str, str))
+    :param processes: the number of threads to use.
+    :type processes: int
+    :param logPath: if specified each completed rename is written to this file as it happens so an \
+    interrupted batch can be reverted with :func:`rollbackRenames`, the file is removed on success.
+    :type logPath: str
+    :return: the renames which were performed in order, including the temporary steps.
+    :rtype: list(tuple(str, str))
+    :raise ValueError: when multiple sources have the same destination or the destination exists.
+    """
+    if isinstance(renames, dict):
+        renames = renames.items()
+    renames = [(source, destination) for source, destination in renames if source != destination]
+    sources = set(source for source, _ in renames)
+    destinations = set()
+    for source, destination in renames:
+        if destination in destinations:
+            raise ValueError("Multiple files are being renamed to: {}".format(destination))
+        destinations.add(destination)
+        if destination not in sources and os.path.exists(destination) and \
+                os.path.normcase(source) != os.path.normcase(destination):
+            raise ValueError("Rename destination already exists: {}".format(destination))
+
+    if sources & destinations:
+        suffix = ".{}.renaming".format(uuid.uuid4().hex)
+        passes = [[(source, source + suffix) for source, _ in renames],
+                  [(source + suffix, destination) for source, destination in renames]]
+    else:
+        passes = [renames]
+
+    completed = []
+    lock = threading.Lock()
+    log = open(logPath, "a") if logPath else None
+
+    def _rename(pair):
+        try:
+            os.rename(*pair)
+        except OSError as er:
+            return er
+        with lock:
+            completed.append(pair)
+            if log is not None:
+                log.write(json.dumps(pair) + "\n")
+                log.flush()
+
+    pool = ThreadPool(processes)
+    try:
+        for renamePass in passes:
+            errors = [er for er in pool.map(_rename, renamePass) if er is not None]
+            if errors:
+                logger.error("Failed to rename {} files, reverting".format(len(errors)))
+                _revertRenames(completed)
+                raise errors[0]
+    finally:
+        pool.close()
+        if log is not None:
+            log.close()
+    if logPath:
+        os.remove(logPath)
+    return completed
+
+
+def rollbackRenames(logPath):
+    """Reverts the renames recorded in the log from an interrupted :func:`batchRename` then removes the log.
+
+    :param logPath: the log file which was passed to batchRename
+    :type logPath: str
+    :return: the renames which were reverted
+    :rtype: list(tuple(str, str))
+    """
+    if not os.path.exists(logPath):
+        return []
+    completed = []
+    with open(logPath, "r") as f:
+        for line in f:
+            try:
+                completed.append(tuple(json.loads(line)))
+            except ValueError:
+                # partially written last line
+                continue
+    reverted = _revertRenames(completed, skipMissing=True)
+    os.remove(logPath)
+    return reverted
+
+
+def _revertRenames(completed, skipMissing=False):
+    reverted = []
+    for source, destination in reversed(completed):
+        if skipMissing and not os.path.exists(destination):
+            continue
+        logger.debug("Renaming {} -> {}", destination, source)
+        os.rename(destination, source)
+        reverted.append((source, destination))
+    return reverted
+
+
+def folderSize(path, processes=8, useCache=False):
     """Retrieves the total folder size in bytes
 
     :param path: Returns the total folder size by walking the directory adding together all child files sizes.
     :type path: str
+    :param processes: the number of threads used to measure the sub directories, see :func:`folderStats`
+    :type processes: int
+    :param useCache: whether to reuse the sizes of unchanged directories from previous calls, see :func:`folderStats`
+    :type useCache: bool
     :return: size in bytes
     :rtype: int
     """
-    totalSize = 0
-    for root, dirs, files in os.walk(path):
-        for f in files:
-            fp = os.path.join(root, f)
-            totalSize += os.path.getsize(fp)
-    return totalSize
+    return folderStats(path, processes, useCache)["size"]
+
+
+def folderStats(path, processes=8, useCache=False):
+    """Returns the total size, file count and directory count of the directory tree.
+
+    The sub directories of `path` are measured in parallel. With useCache the sizes of each directory's files
+    are cached against the directory modified time so subsequent calls only list directories which have
+    changed, unchanged directories only cost a stat call. The modified time of a directory doesn't change
+    when a file is modified in place so cached results can be stale, only use the cache where an
+    approximate size is acceptable. The cache holds at most FOLDER_STATS_CACHE_SIZE directories.
+
+    :param path: the root directory
+    :type path: str
+    :param processes: the number of threads used to measure the sub directories
+    :type processes: int
+    :param useCache: whether to reuse the sizes of unchanged directories from previous calls
+    :type useCache: bool
+    :return: {"size": int, "files": int, "directories": int}, directories doesn't include the root.
+    :rtype: dict
+    """
+    size, files, subDirectories = _directoryStats(path, useCache)
+    stats = {"size": size, "files": files, "directories": 0}
+    if not subDirectories:
+        return stats
+    if processes > 1 and len(subDirectories) > 1:
+        pool = ThreadPool(min(processes, len(subDirectories)))
+        try:
+            results = pool.map(lambda directory: _treeStats(directory, useCache), subDirectories, chunksize=1)
+        finally:
+            pool.close()
+    else:
+        results = [_treeStats(directory, useCache) for directory in subDirectories]
+    for treeSize, treeFiles, treeDirectories in results:
+        stats["size"] += treeSize
+        stats["files"] += treeFiles
+        stats["directories"] += treeDirectories
+    return stats
+
+
+def clearFolderSizeCache():
+    """Clears the cached directory sizes used by :func:`folderSize`
+    """
+    _FOLDER_STATS_CACHE.clear()
+
+
+def saveFolderSizeCache(filePath):
+    """Saves the directory size cache so it can be reused by another session with :func:`loadFolderSizeCache`
+
+    :type filePath: str
+    """
+    saveJson(dict(_FOLDER_STATS_CACHE), filePath)
+
+
+def loadFolderSizeCache(filePath):
+    """Merges a cache saved with :func:`saveFolderSizeCache` into the current cache, entries are still
+    validated against the directory modified time before use.
+
+    :type filePath: str
+    """
+    data = loadJson(filePath) or {}
+    for directory, entry in data.iteritems():
+        _cacheDirectoryStats(str(directory), (entry[0], entry[1], entry[2], [str(i) for i in entry[3]]))
+
+
+def _treeStats(directory, useCache):
+    size = files = directories = 0
+    stack = [directory]
+    while stack:
+        directory = stack.pop()
+        directorySize, directoryFiles, subDirectories = _directoryStats(directory, useCache)
+        size += directorySize
+        files += directoryFiles
+        directories += 1
+        stack.extend(subDirectories)
+    return size, files, directories
+
+
+def _directoryStats(directory, useCache):
+    """Returns the size and count of the files directly under the directory and its sub directories.
+    """
+    try:
+        mtime = os.stat(directory).st_mtime
+    except OSError:
+        return 0, 0, []
+    if useCache:
+        cached = _FOLDER_STATS_CACHE.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1:]
+    size = files = 0
+    subDirectories = []
+    try:
+        for entry in scanDirectory(directory):
+            try:
+                if entry.isDir():
+                    # same as os.walk, don't follow directory links
+                    if not entry.isLink():
+                        subDirectories.append(entry.path)
+                    continue
+                size += entry.stat().st_size
+            except OSError:
+                # broken links, files removed during the scan
+                continue
+            files += 1
+    except OSError:
+        return 0, 0, []
+    if useCache:
+        _cacheDirectoryStats(directory, (mtime, size, files, subDirectories))
+    return size, files, subDirectories
+
+
+def _cacheDirectoryStats(directory, entry):
+    if directory not in _FOLDER_STATS_CACHE:
+        # evict arbitrary entries once full, popitem is atomic so this is safe from the folderStats threads
+        while len(_FOLDER_STATS_CACHE) >= FOLDER_STATS_CACHE_SIZE:
+            try:
+                _FOLDER_STATS_CACHE.popitem()
+            except KeyError:
+                break
+    _FOLDER_STATS_CACHE[directory] = entry
 
 
 def ensureFolderExists(path, permissions=0775, placeHolder=False):
@@ -233,7 +1000,7 @@ def ensureFolderExists(path, permissions=0775, placeHolder=False):
     """
     if not os.path.exists(path):
         try:
-            logger.debug("Creating folder {} [{}]".format(path, permissions))
+            logger.debug("Creating folder {} [{}]", path, permissions)
             os.makedirs(path, permissions)
             if placeHolder:
                 placePath = os.path.join(path, "placeholder")
@@ -269,67 +1036,287 @@ def createValidfilename(name):
         return FILENAMEEXP.sub("_", value.decode("utf-8")).encode("utf-8")
 
 
-def zipwalk(zfilename):
+ZIPWALK_STREAM_THRESHOLD = 32 * 1024 * 1024
+
+
+def zipwalk(zfilename, streamThreshold=ZIPWALK_STREAM_THRESHOLD):
     """Zip file tree generator.
 
     For each file entry in a zip archive, this yields
-    a two tuple of the zip information and the data
-    of the file as a StringIO object.
+    a two tuple of the zip information and a lazy reader
+    of the file data.
 
     zipinfo, filedata
 
     zipinfo is an instance of zipfile.ZipInfo class
     which gives information of the file contained
-    in the zip archive. filedata is a StringIO instance
-    representing the actual file data.
-
-    If the file again a zip file, the generator extracts
-    the contents of the zip file and walks them.
+    in the zip archive. filedata is a :class:`ZipMemberReader`
+    which only reads the member when it's first used, members up
+    to streamThreshold bytes are read into memory and support seek
+    and getvalue, larger members are streamed. The reader is only
+    valid until the walk moves past the archive containing the member.
+
+    If the file again a zip file, the generator opens
+    the nested zip file without extracting it and walks its contents.
+    Nested zips up to streamThreshold are opened from memory, larger
+    ones are opened from the member stream when it's seekable(python 3.7+)
+    otherwise they are spooled.
 
     Inspired by os.walk .
-    """
-
-    tempdir = os.environ.get('TEMP', os.environ.get('TMP', os.environ.get('TMPDIR', '/tmp')))
 
-    try:
-        z = zipfile.ZipFile(zfilename, "r")
+    :param zfilename: the zip file path or a seekable file object
+    :type zfilename: str or file
+    :param streamThreshold: the uncompressed size in bytes above which members are streamed
+    :type streamThreshold: int
+    """
+    with contextlib.closing(zipfile.ZipFile(zfilename, "r")) as z:
         for info in z.infolist():
             fname = info.filename
-            data = z.read(fname)
+            if not fname.endswith(".zip"):
+                yield info, ZipMemberReader(z, info, streamThreshold)
+                continue
+            nested = _openNestedZip(z, info, streamThreshold)
+            if nested is None:
+                continue
+            try:
+                for x in zipwalk(nested, streamThreshold):
+                    yield x
+            except Exception:
+                logger.error("Failed", exc_info=True)
+                raise
+            finally:
+                nested.close()
 
-            if fname.endswith(".zip"):
-                tmpfpath = os.path.join(tempdir, os.path.basename(fname))
-                try:
-                    open(tmpfpath, 'w+b').write(data)
-                except (IOError, OSError):
-                    logger.error("Failed to write file, {}".format(tmpfpath), exc_info=True)
-
-                if zipfile.is_zipfile(tmpfpath):
-                    try:
-                        for x in zipwalk(tmpfpath):
-                            yield x
-                    except Exception:
-                        logger.error("Failed", exc_info=True)
-                        raise
-                try:
-                    os.remove(tmpfpath)
-                except:
-                    pass
+
+def _openNestedZip(archive, info, streamThreshold):
+    """Returns a seekable file object for the nested zip member or None if it isn't a zip file.
+    """
+    if info.file_size <= streamThreshold:
+        nested = cStringIO.StringIO(archive.read(info))
+    else:
+        member = archive.open(info)
+        seekable = getattr(member, "seekable", None)
+        if seekable is not None and seekable():
+            nested = member
+        else:
+            member.close()
+            # python 2 member streams can't seek, only spools to disk when above the threshold
+            nested = tempfile.SpooledTemporaryFile(max_size=streamThreshold)
+            with contextlib.closing(archive.open(info)) as member:
+                shutil.copyfileobj(member, nested, COPY_BUFFER_SIZE)
+            nested.seek(0)
+    if not zipfile.is_zipfile(nested):
+        logger.debug("Skipping invalid nested zip file: {}", info.filename)
+        nested.close()
+        return None
+    nested.seek(0)
+    return nested
+
+
+class ZipMemberReader(object):
+    """Lazy file like reader of a zip archive member yielded by :func:`zipwalk`. The member is read when
+    the reader is first used, members larger than the stream threshold are read from the archive stream
+    instead of being loaded into memory.
+    """
+
+    def __init__(self, archive, info, streamThreshold=ZIPWALK_STREAM_THRESHOLD):
+        self.archive = archive
+        self.info = info
+        self.streamThreshold = streamThreshold
+        self._file = None
+
+    def __repr__(self):
+        return "<{}> {}".format(self.__class__.__name__, self.info.filename)
+
+    def __iter__(self):
+        return iter(self._open())
+
+    def __getattr__(self, item):
+        # seek, tell, readline etc.
+        return getattr(self._open(), item)
+
+    def isStreamed(self):
+        """
+        :return: True if the member is streamed from the archive instead of being read into memory
+        :rtype: bool
+        """
+        return self.info.file_size > self.streamThreshold
+
+    def _open(self):
+        if self._file is None:
+            if self.isStreamed():
+                self._file = self.archive.open(self.info)
             else:
-                yield (info, cStringIO.StringIO(data))
-    except (RuntimeError, zipfile.error):
-        raise
+                self._file = cStringIO.StringIO(self.archive.read(self.info))
+        return self._file
 
+    def read(self, size=-1):
+        return self._open().read(size)
 
-def directoryTreeToDict(path):
-    d = {'name': os.path.basename(path),
-         "path": path}
-    if os.path.isdir(path):
-        d['type'] = "directory"
-        d['children'] = [directoryTreeToDict(os.path.join(path, x)) for x in os.listdir(path)]
-    else:
-        d['type'] = "file"
-    return d
+    def getvalue(self):
+        """Returns the whole member data, for streamed members this reads the full member into memory.
+
+        :rtype: str
+        """
+        if self.isStreamed():
+            return self.archive.read(self.info)
+        return self._open().getvalue()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def directoryTreeToDict(path, maxDepth=None, extensions=None, filterFunc=None):
+    """Builds a nested dict of the directory tree, each dict has the keys "name", "path", "type" and directories
+    also have "children".
+
+    For large trees use :func:`directoryTree` which lists directories on demand.
+
+    :param path: the root path
+    :type path: str
+    :param maxDepth: the number of levels below the root to include, None for unlimited.
+    :type maxDepth: int or None
+    :param extensions: case insensitive file extensions to include, directories are always included.
+    :type extensions: iterable(str)
+    :param filterFunc: called with each file :class:`zoo.libs.utils.path.DirectoryEntry`, return False to exclude it.
+    :type filterFunc: callable or None
+    :rtype: dict
+    """
+    return directoryTree(path, maxDepth, extensions, filterFunc).toDict()
+
+
+def directoryTree(path, maxDepth=None, extensions=None, filterFunc=None):
+    """Returns a lazy directory tree where each directory is only listed when its children are first accessed.
+
+    .. code-block:: python
+
+        tree = directoryTree("/projects/show", maxDepth=3, extensions=("ma", "mb"))
+        for node in tree.iterFlatten():
+            print node.depth, node.path
+        tree.writeJsonLines("/tmp/show.jsonl")
+
+    :param path: the root path
+    :type path: str
+    :param maxDepth: the number of levels below the root to include, None for unlimited.
+    :type maxDepth: int or None
+    :param extensions: case insensitive file extensions to include, directories are always included.
+    :type extensions: iterable(str)
+    :param filterFunc: called with each file :class:`zoo.libs.utils.path.DirectoryEntry`, return False to exclude it.
+    :type filterFunc: callable or None
+    :rtype: :class:`DirectoryTreeNode`
+    """
+    return DirectoryTreeNode(path, os.path.isdir(path), 0, (maxDepth, extensions, filterFunc))
+
+
+class DirectoryTreeNode(object):
+    """A node in a lazy directory tree created by :func:`directoryTree`.
+
+    Accessing children lists the directory once and keeps the child nodes, use :meth:`iterFlatten` to walk
+    a tree without keeping the nodes in memory.
+    """
+    DIRECTORY = "directory"
+    FILE = "file"
+
+    def __init__(self, path, isDir, depth, options):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.type = self.DIRECTORY if isDir else self.FILE
+        self.depth = depth
+        self._options = options
+        self._children = None
+
+    def __repr__(self):
+        return "<{}> {}".format(self.__class__.__name__, self.path)
+
+    def isDir(self):
+        return self.type == self.DIRECTORY
+
+    @property
+    def children(self):
+        """The child nodes, directories are listed on first access, files and directories at the max depth
+        don't have children.
+
+        :rtype: list(:class:`DirectoryTreeNode`)
+        """
+        if self._children is None:
+            self._children = list(self._iterChildren())
+        return self._children
+
+    def _listable(self):
+        maxDepth = self._options[0]
+        return self.isDir() and (maxDepth is None or self.depth < maxDepth)
+
+    def _iterChildren(self):
+        if not self._listable():
+            return
+        _, extensions, filterFunc = self._options
+        try:
+            for entry in scanDirectory(self.path, extensions=extensions):
+                isDir = entry.isDir()
+                if isDir or filterFunc is None or filterFunc(entry):
+                    yield DirectoryTreeNode(entry.path, isDir, self.depth + 1, self._options)
+        except OSError:
+            logger.debug("Failed to list directory: {}", self.path, exc_info=True)
+
+    def iterFlatten(self):
+        """Walks the tree top down yielding this node then every descendant node. Nodes are created as the
+        directories are listed and not kept by the tree unless the children have already been accessed.
+
+        :rtype: generator(:class:`DirectoryTreeNode`)
+        """
+        stack = [iter((self,))]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+            yield node
+            if node._children is not None:
+                stack.append(iter(node._children))
+            elif node._listable():
+                stack.append(node._iterChildren())
+
+    def toDict(self):
+        """Returns the tree as nested dicts in the same format as :func:`directoryTreeToDict`, this will
+        list the whole tree.
+
+        :rtype: dict
+        """
+        data = {"name": self.name, "path": self.path, "type": self.type}
+        if self.isDir():
+            data["children"] = [child.toDict() for child in self.children]
+        return data
+
+    def iterJsonLines(self):
+        """Serializes the tree one node per line in the :meth:`iterFlatten` order, each line is a json
+        object with the keys "name", "path", "type", "depth" and "parent".
+
+        :rtype: generator(str)
+        """
+        parents = {}
+        for node in self.iterFlatten():
+            # the parent of a node is the last node seen at the depth above
+            parents[node.depth] = node.path
+            yield json.dumps({"name": node.name,
+                              "path": node.path,
+                              "type": node.type,
+                              "depth": node.depth,
+                              "parent": parents.get(node.depth - 1)})
+
+    def writeJsonLines(self, filePath):
+        """Writes :meth:`iterJsonLines` to the file as it walks the tree.
+
+        :param filePath: the output file path or an open file object
+        :type filePath: str or file
+        """
+        if hasattr(filePath, "write"):
+            for line in self.iterJsonLines():
+                filePath.write(line + "\n")
+            return
+        with open(filePath, "w") as f:
+            self.writeJsonLines(f)
 
 
 if os.name == "nt" and sys.version_info[0] < 3:
@@ -417,40 +1404,144 @@ def loadFile(filepath):
         yield f
 
 
-def createZipWithProgress(zippath, files):
+def createZipWithProgress(zippath, files, processes=None):
     """Same as function createZip() but has a stdout progress bar which is useful for commandline work
     :param zippath: the file path for the zip file
     :type zippath: str
-    :param files: A Sequence of file paths that will be archived.
-    :type files: seq(str)
+    :param files: A Sequence of (file path, archive name) pairs that will be archived.
+    :type files: seq(tuple(str, str))
+    :param processes: the number of compression threads, defaults to the cpu count
+    :type processes: int or None
+    :return: the archive statistics, see :func:`createZip`
+    :rtype: dict
     """
-    dir = os.path.dirname(zippath)
-    if not os.path.exists(os.path.join(dir, os.path.dirname(zippath))):
-        os.makedirs(os.path.join(dir, os.path.dirname(zippath)))
-    logger.debug("writing file: {}".format(zippath))
-    length = len(files)
-    progressBar = commandline.CommandProgressBar(length, prefix='Progress:', suffix='Complete', barLength=50)
+    files = list(files)
+    progressBar = commandline.CommandProgressBar(len(files), prefix='Progress:', suffix='Complete', barLength=50)
     progressBar.start()
-    with zipfile.ZipFile(zippath, "w", zipfile.ZIP_DEFLATED) as archive:
-        for p in iter(files):
-            logger.debug("Archiving file: {} ----> :{}\n".format(p[0], p[1]))
-            archive.write(p[0], p[1])
-            progressBar.increment(1)
-    logger.debug("finished writing zip file to : {}".format(zippath))
+    return createZip(zippath, files, processes=processes,
+                     progress=lambda stats: progressBar.increment(1))
+
+
+# already compressed formats which are stored as is rather than deflated again
+ZIP_STORED_EXTENSIONS = frozenset(("png", "exr", "jpg", "jpeg", "zip", "gz", "bz2", "7z", "mp4", "mov"))
+# files larger than this are deflated by zipfile in the writing thread rather than read into memory
+ZIP_PARALLEL_MAX_SIZE = 64 * 1024 * 1024
+# the members compressed in the pool are written through ZipFile internals(_writecheck, _didModify, fp) which
+# are only relied on for python 2.7, other versions let zipfile compress every member in the writing thread
+_ZIP_PARALLEL_SUPPORTED = sys.version_info[:2] == (2, 7)
 
 
-def createZip(zippath, files):
+def createZip(zippath, files, processes=None, progress=None, compressLevel=zlib.Z_DEFAULT_COMPRESSION):
     """Creates a zip file for the files, each path will be stored relative to the zippath which avoids abspath
+
+    Members are compressed concurrently by a thread pool(zlib releases the GIL) and written to the archive
+    in the order of `files`. Already compressed formats(:data:`ZIP_STORED_EXTENSIONS`) are stored without
+    being deflated again.
+
     :param zippath: the file path for the zip file
     :type zippath: str
-    :param files: A Sequence of file paths that will be archived.
-    :type files: seq(str)
+    :param files: A Sequence of (file path, archive name) pairs that will be archived.
+    :type files: seq(tuple(str, str))
+    :param processes: the number of compression threads, defaults to the cpu count
+    :type processes: int or None
+    :param progress: called after each member is written with the current statistics dict
+    :type progress: callable or None
+    :param compressLevel: the zlib compression level
+    :type compressLevel: int
+    :return: {"files": int, "bytes": int, "compressedBytes": int, "seconds": float, "bytesPerSecond": float}
+    :rtype: dict
     """
     dir = os.path.dirname(zippath)
-    if not os.path.exists(os.path.join(dir, os.path.dirname(zippath))):
-        os.makedirs(os.path.join(dir, os.path.dirname(zippath)))
-    logger.debug("writing file: {}".format(zippath))
-    with zipfile.ZipFile(zippath, "w", zipfile.ZIP_DEFLATED) as archive:
-        for p in iter(files):
-            archive.write(p[0], p[1])
-    logger.debug("finished writing zip file to : {}".format(zippath))
\ No newline at end of file
+    if dir and not os.path.exists(dir):
+        os.makedirs(dir)
+    logger.debug("writing file: {}", zippath)
+    stats = {"files": 0, "bytes": 0, "compressedBytes": 0, "seconds": 0.0, "bytesPerSecond": 0.0}
+    start = time.time()
+    processes = processes or multiprocessing.cpu_count()
+    # only a few members per thread are read ahead of the writer which keeps the memory bounded
+    window = processes * 4
+    compress = functools.partial(_compressZipMember, compressLevel=compressLevel)
+    files = iter(files)
+    pool = ThreadPool(processes)
+    try:
+        with zipfile.ZipFile(zippath, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            while True:
+                batch = list(itertools.islice(files, window))
+                if not batch:
+                    break
+                for filePath, arcname, zinfo, data in pool.imap(compress, batch):
+                    logger.debug("Archiving file: {} ----> :{}\n", filePath, arcname)
+                    if zinfo is None:
+                        archive.write(filePath, arcname, compress_type=_zipCompressType(filePath))
+                        zinfo = archive.filelist[-1]
+                    else:
+                        _writeZipMember(archive, zinfo, data)
+                    stats["files"] += 1
+                    stats["bytes"] += zinfo.file_size
+                    stats["compressedBytes"] += zinfo.compress_size
+                    stats["seconds"] = time.time() - start
+                    stats["bytesPerSecond"] = stats["bytes"] / stats["seconds"] if stats["seconds"] else 0.0
+                    if progress is not None:
+                        progress(stats)
+    finally:
+        pool.close()
+    stats["seconds"] = time.time() - start
+    stats["bytesPerSecond"] = stats["bytes"] / stats["seconds"] if stats["seconds"] else 0.0
+    logger.debug("finished writing zip file to : {} ({}/s)", zippath, general.humanizeBytes(stats["bytesPerSecond"]))
+    return stats
+
+
+def _compressZipMember(item, compressLevel):
+    """Reads and compresses the file in a pool thread, returns (filePath, arcname, zinfo, data), zinfo is None
+    for files which zipfile should write itself(directories, large files and unsupported python versions).
+    """
+    filePath, arcname = item
+    if not _ZIP_PARALLEL_SUPPORTED:
+        return filePath, arcname, None, None
+    st = os.stat(filePath)
+    if stat.S_ISDIR(st.st_mode) or st.st_size > ZIP_PARALLEL_MAX_SIZE:
+        return filePath, arcname, None, None
+    # same as ZipFile.write
+    arcname = os.path.normpath(os.path.splitdrive(arcname)[1])
+    while arcname[0] in (os.sep, os.altsep):
+        arcname = arcname[1:]
+    zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[0:6])
+    zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+    with open(filePath, "rb") as f:
+        data = f.read()
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data) & 0xffffffff
+    zinfo.compress_type = _zipCompressType(filePath)
+    if zinfo.compress_type == zipfile.ZIP_DEFLATED:
+        compressor = zlib.compressobj(compressLevel, zlib.DEFLATED, -15)
+        data = compressor.compress(data) + compressor.flush()
+    zinfo.compress_size = len(data)
+    return filePath, arcname, zinfo, data
+
+
+def _zipCompressType(filePath):
+    if os.path.splitext(filePath)[1][1:].lower() in ZIP_STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _writeZipMember(archive, zinfo, data):
+    """Writes an already compressed member to the archive, this mirrors what ZipFile.write does after compressing.
+
+    ZipFile has no public api for writing compressed data so this depends on the python 2.7 ZipFile internals,
+    see :data:`_ZIP_PARALLEL_SUPPORTED`.
+    """
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    # python 3 keeps the end of the written data in start_dir
+    startDir = getattr(archive, "start_dir", None)
+    if startDir is not None:
+        archive.fp.seek(startDir)
+    zinfo.header_offset = archive.fp.tell()
+    archive._writecheck(zinfo)
+    archive._didModify = True
+    archive.fp.write(zinfo.FileHeader(zip64))
+    archive.fp.write(data)
+    archive.filelist.append(zinfo)
+    archive.NameToInfo[zinfo.filename] = zinfo
+    if startDir is not None:
+        archive.start_dir = archive.fp.tell()
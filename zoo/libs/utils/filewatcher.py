@@ -0,0 +1,492 @@
+"""Shared file watcher service, components subscribe to a root directory and receive debounced, coalesced
+change events so caches can be invalidated instead of re-scanning the disk.
+
+Uses inotify on linux and falls back to polling on other platforms.
+
+.. code-block:: python
+
+    from zoo.libs.utils import filewatcher
+
+    def onChanged(events):
+        for event in events:
+            print event.type, event.path
+
+    subscription = filewatcher.watcher().subscribe("/projects/show/icons", onChanged)
+    ...
+    filewatcher.watcher().unsubscribe(subscription)
+
+Callbacks are called from the watcher thread, gui code needs to pass the events onto the main thread.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from zoo.libs.utils import zlogging
+from zoo.libs.utils.path import scanDirectory
+
+logger = zlogging.getLogger(__name__)
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+
+# inotify constants from sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+               IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+_WATCHER = None
+_WATCHER_LOCK = threading.Lock()
+
+
+def watcher():
+    """Returns the shared :class:`FileWatcher`, started on first use and restarted if it has been stopped.
+
+    :rtype: :class:`FileWatcher`
+    """
+    global _WATCHER
+    with _WATCHER_LOCK:
+        if _WATCHER is None:
+            _WATCHER = FileWatcher()
+        _WATCHER.start()
+    return _WATCHER
+
+
+class FileEvent(object):
+    """A coalesced change to a path, type is one of CREATED, MODIFIED or DELETED.
+    """
+    __slots__ = ("path", "type")
+
+    def __init__(self, path, eventType):
+        self.path = path
+        self.type = eventType
+
+    def __repr__(self):
+        return "<{}> {} {}".format(self.__class__.__name__, self.type, self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, FileEvent) and self.path == other.path and self.type == other.type
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.path, self.type))
+
+
+class Subscription(object):
+    """Returned by :meth:`FileWatcher.subscribe`, holds the pending events for the subscriber.
+    """
+
+    def __init__(self, root, callback, recursive):
+        self.root = os.path.normpath(os.path.abspath(root))
+        self.callback = callback
+        self.recursive = recursive
+        # path: event type, in the order of the first change
+        self._pending = {}
+        self._order = []
+        self._lastEventTime = 0.0
+
+    def __repr__(self):
+        return "<{}> {}".format(self.__class__.__name__, self.root)
+
+    def matches(self, filePath):
+        if filePath == self.root:
+            return True
+        prefix = self.root if self.root.endswith(os.sep) else self.root + os.sep
+        if not filePath.startswith(prefix):
+            return False
+        return self.recursive or os.sep not in filePath[len(prefix):]
+
+    def add(self, filePath, eventType, now):
+        """Coalesces the event with any pending event for the same path.
+        """
+        self._lastEventTime = now
+        previous = self._pending.get(filePath)
+        if previous is None:
+            self._pending[filePath] = eventType
+            self._order.append(filePath)
+        elif previous == CREATED:
+            if eventType == DELETED:
+                # created and removed within the debounce window
+                del self._pending[filePath]
+                self._order.remove(filePath)
+        elif previous == DELETED:
+            if eventType != DELETED:
+                self._pending[filePath] = MODIFIED
+        elif eventType == DELETED:
+            self._pending[filePath] = DELETED
+
+    def takeEvents(self, now, debounce):
+        """Returns the pending events if nothing has changed for the debounce time.
+        """
+        if not self._order or now - self._lastEventTime < debounce:
+            return []
+        events = [FileEvent(filePath, self._pending[filePath]) for filePath in self._order]
+        self._pending = {}
+        self._order = []
+        return events
+
+
+class FileWatcher(object):
+    """Watches directories and calls the subscribers with the changes once the directory has been quiet for
+    the debounce time.
+
+    :param debounce: seconds without changes before the events are sent to a subscriber.
+    :type debounce: float
+    :param pollInterval: seconds between directory scans when polling.
+    :type pollInterval: float
+    :param usePolling: force the polling backend, by default inotify is used when available.
+    :type usePolling: bool
+    """
+
+    def __init__(self, debounce=0.2, pollInterval=1.0, usePolling=False):
+        self.debounce = debounce
+        self.pollInterval = pollInterval
+        self.usePolling = usePolling
+        self._lock = threading.RLock()
+        self._subscriptions = []
+        self._thread = None
+        self._running = False
+        self._backend = None
+        self._ensureBackend()
+
+    def _ensureBackend(self):
+        """Returns the backend, creating it and watching the subscribed roots again after :meth:`stop`.
+        """
+        with self._lock:
+            if self._backend is not None:
+                return self._backend
+            backend = None
+            if not self.usePolling and sys.platform.startswith("linux"):
+                try:
+                    backend = _InotifyBackend()
+                except (OSError, AttributeError):
+                    logger.debug("inotify isn't available, falling back to polling", exc_info=True)
+            backend = backend or _PollingBackend(self.pollInterval)
+            for subscription in self._subscriptions:
+                backend.addRoot(subscription.root, subscription.recursive)
+            self._backend = backend
+            return backend
+
+    def isPolling(self):
+        return isinstance(self._ensureBackend(), _PollingBackend)
+
+    def subscribe(self, root, callback, recursive=True):
+        """Subscribes the callback to the changes below root.
+
+        :param root: the directory to watch
+        :type root: str
+        :param callback: called with a list of :class:`FileEvent`
+        :type callback: callable
+        :param recursive: whether to include changes in sub directories
+        :type recursive: bool
+        :rtype: :class:`Subscription`
+        """
+        subscription = Subscription(root, callback, recursive)
+        with self._lock:
+            self._ensureBackend().addRoot(subscription.root, recursive)
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        :type subscription: :class:`Subscription`
+        """
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.remove(subscription)
+            if self._backend is not None:
+                self._backend.removeRoot(subscription.root, subscription.recursive)
+
+    def start(self):
+        """Starts the background thread which processes the events.
+        """
+        if self._running:
+            return
+        self._ensureBackend()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="zooFileWatcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread and releases the watches, the subscriptions are kept and watched again
+        when the watcher is used or started again.
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self._backend is not None:
+                self._backend.close()
+                self._backend = None
+
+    def _run(self):
+        while self._running:
+            try:
+                self.processEvents(self.debounce / 2.0)
+            except Exception:
+                logger.error("File watcher failed to process events", exc_info=True)
+
+    def processEvents(self, timeout=0.0):
+        """Reads the changes and calls the subscribers which are due, used by the background thread and can be
+        called directly when the watcher isn't started.
+
+        :param timeout: the max seconds to wait for changes
+        :type timeout: float
+        """
+        changes = self._ensureBackend().read(timeout)
+        now = time.time()
+        due = []
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            for filePath, eventType in changes:
+                for subscription in subscriptions:
+                    if subscription.matches(filePath):
+                        subscription.add(filePath, eventType, now)
+            for subscription in subscriptions:
+                events = subscription.takeEvents(now, self.debounce)
+                if events:
+                    due.append((subscription, events))
+        for subscription, events in due:
+            try:
+                subscription.callback(events)
+            except Exception:
+                logger.error("File watcher subscriber failed: {}".format(subscription), exc_info=True)
+
+
+class _PollingBackend(object):
+    """Compares directory snapshots, used when inotify isn't available.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        # (root, recursive): {path: (isDir, mtime, size)}
+        self._snapshots = {}
+        # guards the snapshots, roots are added and removed from other threads while reading
+        self._lock = threading.Lock()
+        self._lastPoll = 0.0
+
+    def addRoot(self, root, recursive):
+        key = (root, recursive)
+        with self._lock:
+            if key in self._snapshots:
+                return
+        snapshot = self._snapshot(root, recursive)
+        with self._lock:
+            self._snapshots.setdefault(key, snapshot)
+
+    def removeRoot(self, root, recursive):
+        with self._lock:
+            self._snapshots.pop((root, recursive), None)
+
+    def close(self):
+        with self._lock:
+            self._snapshots.clear()
+
+    def _snapshot(self, root, recursive):
+        snapshot = {}
+        try:
+            for entry in scanDirectory(root, recursive=recursive):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                snapshot[entry.path] = (entry.isDir(), st.st_mtime, st.st_size)
+        except OSError:
+            pass
+        return snapshot
+
+    def read(self, timeout):
+        wait = self._lastPoll + self.interval - time.time()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if wait > timeout:
+                return []
+        self._lastPoll = time.time()
+        changes = []
+        seen = set()
+        with self._lock:
+            snapshots = list(self._snapshots.items())
+        for key, previous in snapshots:
+            current = self._snapshot(*key)
+            with self._lock:
+                # the root may have been removed or re-added while scanning
+                if self._snapshots.get(key) is not previous:
+                    continue
+                self._snapshots[key] = current
+            for filePath, info in current.iteritems():
+                previousInfo = previous.get(filePath)
+                if previousInfo is None:
+                    change = (filePath, CREATED)
+                elif previousInfo != info and not info[0]:
+                    change = (filePath, MODIFIED)
+                else:
+                    continue
+                if change not in seen:
+                    seen.add(change)
+                    changes.append(change)
+            for filePath in previous:
+                if filePath not in current and (filePath, DELETED) not in seen:
+                    seen.add((filePath, DELETED))
+                    changes.append((filePath, DELETED))
+        return changes
+
+
+class _InotifyBackend(object):
+    """Linux inotify through ctypes, each directory below a recursive root gets a watch.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._addWatch = libc.inotify_add_watch
+        self._rmWatch = libc.inotify_rm_watch
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # watch descriptor: directory, directory: watch descriptor
+        self._directories = {}
+        self._watches = {}
+        self._roots = []
+        # guards the watch tables, roots are added and removed from other threads while reading
+        self._lock = threading.RLock()
+
+    def _isRecursive(self, directory):
+        """Returns whether new sub directories of the directory need to be watched.
+        """
+        for root, recursive in self._roots:
+            if recursive and (directory == root or directory.startswith(root.rstrip(os.sep) + os.sep)):
+                return True
+        return False
+
+    def _watch(self, directory):
+        if directory in self._watches:
+            return
+        wd = self._addWatch(self._fd, directory, _WATCH_MASK)
+        if wd < 0:
+            logger.debug("Failed to watch {}: {}".format(directory, os.strerror(ctypes.get_errno())))
+            return
+        self._watches[directory] = wd
+        self._directories[wd] = directory
+
+    def _watchTree(self, directory):
+        """Watches the directory and its sub directories, returns the paths already inside the directory.
+        """
+        self._watch(directory)
+        existing = []
+        try:
+            for entry in scanDirectory(directory, recursive=True):
+                existing.append(entry.path)
+                if entry.isDir() and not entry.isLink():
+                    self._watch(entry.path)
+        except OSError:
+            pass
+        return existing
+
+    def addRoot(self, root, recursive):
+        with self._lock:
+            self._roots.append((root, recursive))
+            if recursive:
+                self._watchTree(root)
+            else:
+                self._watch(root)
+
+    def removeRoot(self, root, recursive):
+        with self._lock:
+            self._removeRoot(root, recursive)
+
+    def _removeRoot(self, root, recursive):
+        self._roots.remove((root, recursive))
+        for directory, wd in self._watches.items():
+            if directory != root and not directory.startswith(root.rstrip(os.sep) + os.sep):
+                continue
+            # still needed by another subscription
+            if any(directory == other or (otherRecursive and directory.startswith(other.rstrip(os.sep) + os.sep))
+                   for other, otherRecursive in self._roots):
+                continue
+            self._rmWatch(self._fd, wd)
+            del self._watches[directory]
+            del self._directories[wd]
+
+    def close(self):
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+            self._watches.clear()
+            self._directories.clear()
+            del self._roots[:]
+
+    def read(self, timeout):
+        try:
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+        except select.error:
+            return []
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except OSError as er:
+            if er.errno == errno.EAGAIN:
+                return []
+            raise
+        with self._lock:
+            return self._parseEvents(data)
+
+    def _parseEvents(self, data):
+        changes = []
+        offset = 0
+        headerSize = _EVENT_HEADER.size
+        while offset + headerSize <= len(data):
+            wd, mask, _, nameLength = _EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + headerSize:offset + headerSize + nameLength].rstrip(b"\0")
+            offset += headerSize + nameLength
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, report the roots as modified so subscribers rebuild
+                changes.extend((root, MODIFIED) for root, _ in self._roots)
+                continue
+            directory = self._directories.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+                if self._watches.get(directory) == wd:
+                    del self._watches[directory]
+                continue
+            filePath = os.path.join(directory, name) if name else directory
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                changes.append((filePath, CREATED))
+                if mask & IN_ISDIR and self._isRecursive(directory):
+                    # files can be created before the watch is added
+                    changes.extend((existing, CREATED) for existing in self._watchTree(filePath))
+            elif mask & (IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF | IN_MOVE_SELF):
+                if not name and mask & IN_MOVE_SELF:
+                    # the directory has been moved, the watch no longer matches its path
+                    self._rmWatch(self._fd, wd)
+                changes.append((filePath, DELETED))
+            elif not mask & IN_ISDIR or name:
+                changes.append((filePath, MODIFIED))
+        return changes
@@ -0,0 +1,215 @@
+"""Indexed fuzzy search for command palettes and searchable menus.
+
+.. code-block:: python
+
+    index = FuzzyIndex(["createJoint", "deleteJoint", "jointOrient", "createCurve"])
+    index.search("cj")
+    # ['createJoint']
+    index.search("jo", limit=2)
+    # ['jointOrient', 'createJoint']
+"""
+import heapq
+
+# scoring weights
+SCORE_MATCH = 1
+SCORE_WORD_START = 8
+SCORE_CONSECUTIVE = 5
+SCORE_FIRST_CHARACTER = 4
+PENALTY_GAP = 1
+PENALTY_LENGTH = 0.01
+
+WORD_SEPARATORS = frozenset(" _-./:\\|")
+
+
+def wordStarts(text):
+    """Returns the indices in the text which start a word, a word starts at the beginning of the string, after a
+    separator, at a camelCase hump or at the first digit of a number.
+
+    :type text: str
+    :rtype: frozenset(int)
+
+    .. code-block:: python
+
+        sorted(wordStarts("createJoint_L01"))
+        # [0, 6, 12, 13]
+    """
+    starts = set()
+    previous = ""
+    for index, character in enumerate(text):
+        if index == 0:
+            if character not in WORD_SEPARATORS:
+                starts.add(index)
+        elif previous in WORD_SEPARATORS:
+            if character not in WORD_SEPARATORS:
+                starts.add(index)
+        elif character.isupper() and not previous.isupper():
+            starts.add(index)
+        elif character.isdigit() and not previous.isdigit():
+            starts.add(index)
+        previous = character
+    return frozenset(starts)
+
+
+def score(query, text, starts=None):
+    """Returns the best fuzzy match score of the lower case query against the text or None if the query isn't
+    a subsequence of the text. Matches on word starts and consecutive characters score higher, gaps between
+    matched characters lower the score.
+
+    :param query: the lower case query
+    :type query: str
+    :param text: the text to score
+    :type text: str
+    :param starts: the precomputed :func:`wordStarts` of the text
+    :type starts: frozenset(int)
+    :rtype: float or None
+    """
+    lowered = text.lower()
+    if not query:
+        return 0.0
+    if starts is None:
+        starts = wordStarts(text)
+    length = len(lowered)
+    # scores of the previous query character matched at each text index, None when it can't be matched there
+    previous = None
+    for queryIndex, character in enumerate(query):
+        current = [None] * length
+        # best score of the previous query character matched before index - 1 ie. with a gap
+        bestBefore = None
+        found = False
+        for index in range(queryIndex, length):
+            if previous is not None and index >= 2:
+                candidate = previous[index - 2]
+                if candidate is not None and (bestBefore is None or candidate > bestBefore):
+                    bestBefore = candidate
+            if lowered[index] != character:
+                continue
+            characterScore = SCORE_MATCH
+            if index in starts:
+                characterScore += SCORE_WORD_START
+            if previous is None:
+                value = characterScore + (SCORE_FIRST_CHARACTER if index == 0 else -PENALTY_GAP * min(index, 3))
+            else:
+                adjacent = previous[index - 1] if index else None
+                options = []
+                if adjacent is not None:
+                    options.append(adjacent + SCORE_CONSECUTIVE)
+                if bestBefore is not None:
+                    options.append(bestBefore - PENALTY_GAP)
+                if not options:
+                    continue
+                value = characterScore + max(options)
+            current[index] = value
+            found = True
+        if not found:
+            return None
+        previous = current
+    return max(value for value in previous if value is not None) - PENALTY_LENGTH * length
+
+
+class FuzzyIndex(object):
+    """Fuzzy search index over a collection of items.
+
+    Each lower case character has a postings set of the items containing it, a query only scores the items in
+    the intersection of its characters' postings. When a query extends the previous query(typing another
+    character) only the previous matches are searched. The best matches are selected with a heap rather than
+    sorting every match.
+
+    :param items: the items to index
+    :type items: iterable
+    :param key: returns the text to search for an item, defaults to the item itself
+    :type key: callable or None
+    """
+
+    def __init__(self, items=(), key=None):
+        self.key = key
+        self._items = []
+        self._texts = []
+        self._starts = []
+        # character: set(item index)
+        self._postings = {}
+        self._lastQuery = None
+        self._lastMatches = None
+        self.extend(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        """Adds an item to the index.
+        """
+        text = self.key(item) if self.key is not None else item
+        itemId = len(self._items)
+        self._items.append(item)
+        self._texts.append(text)
+        self._starts.append(wordStarts(text))
+        for character in set(text.lower()):
+            postings = self._postings.get(character)
+            if postings is None:
+                self._postings[character] = postings = set()
+            postings.add(itemId)
+        self._lastQuery = None
+        self._lastMatches = None
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def clear(self):
+        self.__init__(key=self.key)
+
+    def _candidates(self, query):
+        if self._lastQuery is not None and query.startswith(self._lastQuery):
+            # narrowing, the new matches are a subset of the previous
+            candidates = self._lastMatches
+        else:
+            candidates = None
+        postings = sorted((self._postings.get(character, ()) for character in set(query)), key=len)
+        if candidates is not None:
+            postings.insert(0, candidates)
+        if not postings[0]:
+            return set()
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return result
+
+    def searchWithScores(self, query, limit=None):
+        """Returns the best matching items with their scores, highest score first.
+
+        :param query: the search text, case insensitive
+        :type query: str
+        :param limit: the max number of results, None returns every match
+        :type limit: int or None
+        :rtype: list(tuple(float, object))
+        """
+        query = query.lower()
+        if not query:
+            items = self._items if limit is None else self._items[:limit]
+            return [(0.0, item) for item in items]
+        matches = []
+        texts = self._texts
+        starts = self._starts
+        for itemId in self._candidates(query):
+            itemScore = score(query, texts[itemId], starts[itemId])
+            if itemScore is not None:
+                matches.append((itemScore, -itemId))
+        self._lastQuery = query
+        self._lastMatches = set(-itemId for _, itemId in matches)
+        if limit is None:
+            ranked = sorted(matches, reverse=True)
+        else:
+            ranked = heapq.nlargest(limit, matches)
+        return [(itemScore, self._items[-itemId]) for itemScore, itemId in ranked]
+
+    def search(self, query, limit=None):
+        """Returns the best matching items, highest score first, ties keep the index order.
+
+        :param query: the search text, case insensitive
+        :type query: str
+        :param limit: the max number of results, None returns every match
+        :type limit: int or None
+        :rtype: list
+        """
+        return [item for _, item in self.searchWithScores(query, limit)]
@@ -1,26 +1,164 @@
+import bisect
+import collections
+import heapq
+import itertools
 import re
+from multiprocessing.pool import ThreadPool
 
 
-def merge(a, b, path=None):
-    """Merges two dicts
+def raiseOnConflict(path, first, second):
+    """Default merge conflict policy, raises an Exception with the path of the conflicting key.
+    """
+    raise Exception('Conflict at %s' % '.'.join(str(key) for key in path))
+
+
+def preferFirst(path, first, second):
+    """Merge conflict policy which keeps the value from the first mapping.
+    """
+    return first
+
+
+def preferSecond(path, first, second):
+    """Merge conflict policy which uses the value from the second mapping.
+    """
+    return second
+
+
+def merge(a, b, path=None, onConflict=raiseOnConflict):
+    """Merges two dicts, b is merged into a in place
     http://stackoverflow.com/questions/7204805/dictionaries-of-dictionaries-merge/7205107#7205107
+
+    Nested dicts are merged iteratively so deep configs don't hit the recursion limit, use :func:`mergedCopy`
+    to leave a unchanged.
+
+    :param a: the dict to merge into
+    :type a: dict
+    :param b: the dict to merge from
+    :type b: dict
+    :param path: the key path prefix of a used in conflict messages
+    :type path: list(str) or None
+    :param onConflict: called with (keyPath, aValue, bValue) when a leaf value differs, returns the value \
+    to use, raises by default.
+    :type onConflict: callable
+    :return: a
+    :rtype: dict
     """
-    if path is None:
-        path = list()
-    for key in b:
-        if key not in a:
-            a[key] = b[key]
-            continue
-        if isinstance(a[key], dict) and isinstance(b[key], dict):
-            merge(a[key], b[key], path + [str(key)])
-        elif a[key] == b[key]:
-            pass  # same leaf value
-        else:
-            raise Exception('Conflict at %s' % '.'.join(path + [str(key)]))
+    stack = [(a, b, tuple(path or ()))]
+    while stack:
+        first, second, keyPath = stack.pop()
+        for key in second:
+            if key not in first:
+                first[key] = second[key]
+                continue
+            existing = first[key]
+            value = second[key]
+            if isinstance(existing, dict) and isinstance(value, dict):
+                if existing is not value:
+                    stack.append((existing, value, keyPath + (key,)))
+            elif existing == value:
+                pass  # same leaf value
+            else:
+                first[key] = onConflict(keyPath + (key,), existing, value)
 
     return a
 
 
+def mergedCopy(a, b, onConflict=raiseOnConflict):
+    """Returns a new dict of b merged into a without modifying either. Unchanged sub dicts are shared with the
+    inputs rather than copied so repeated merges of large layered configs only copy the changed paths,
+    the result should be treated as read only as modifying a shared sub dict changes the inputs.
+
+    .. code-block:: python
+
+        base = {"rules": {"default": "{side}_{type}"}, "tokens": {"side": {"L": "left"}}}
+        merged = mergedCopy(base, {"tokens": {"side": {"R": "right"}}})
+        merged["rules"] is base["rules"]
+        # True
+
+    :param a: the base dict
+    :type a: dict
+    :param b: the dict merged on top
+    :type b: dict
+    :param onConflict: called with (keyPath, aValue, bValue) when a leaf value differs, returns the value \
+    to use, raises by default.
+    :type onConflict: callable
+    :return: the merged dict, `a` itself when b doesn't change anything
+    :rtype: dict
+    """
+    # frame: [first dict, changed keys, parent frame, key in the parent]
+    frames = []
+    stack = [(a, b, (), None, None)]
+    while stack:
+        first, second, keyPath, parentFrame, parentKey = stack.pop()
+        frame = (first, {}, parentFrame, parentKey)
+        frames.append(frame)
+        changes = frame[1]
+        for key, value in second.iteritems():
+            if key not in first:
+                changes[key] = value
+                continue
+            existing = first[key]
+            if existing is value:
+                continue
+            if isinstance(existing, dict) and isinstance(value, dict):
+                stack.append((existing, value, keyPath + (key,), frame, key))
+            elif existing != value:
+                changes[key] = onConflict(keyPath + (key,), existing, value)
+
+    # children are always after their parent so build the results bottom up
+    result = a
+    for first, changes, parentFrame, parentKey in reversed(frames):
+        if changes:
+            result = dict(first)
+            result.update(changes)
+        else:
+            result = first
+        if parentFrame is not None and result is not first:
+            parentFrame[1][parentKey] = result
+    return result
+
+
+NUMERICAL_SPLIT_REGEX = re.compile("([0-9]+)")
+# max memoised sort keys, the cache is cleared once full
+NATURAL_KEY_CACHE_SIZE = 1000000
+_NATURAL_KEY_CACHE = {}
+
+
+def clearNaturalSortKeyCache():
+    """Clears the memoised :func:`naturalSortKey` keys.
+    """
+    _NATURAL_KEY_CACHE.clear()
+
+
+def naturalSortKey(text):
+    """Returns the natural sort key for the text, numbers within the text are compared by value. Keys are
+    memoised so repeated sorts of the same names only split each name once.
+
+    The key is a single string rather than a list so comparisons happen in C, each number is encoded as
+    "\\x00" + the digit count padded to 8 digits + the digits without leading zeros which orders the same as
+    comparing [text, int, text...] lists.
+
+    .. code-block:: python
+
+        naturalSortKey("frame_0010.exr")
+        # 'frame_\x000000000210.exr'
+
+    :type text: str
+    :rtype: str
+    """
+    key = _NATURAL_KEY_CACHE.get(text)
+    if key is None:
+        parts = NUMERICAL_SPLIT_REGEX.split(text)
+        for index in xrange(1, len(parts), 2):
+            digits = parts[index].lstrip("0")
+            parts[index] = "\x00%08d%s" % (len(digits), digits)
+        key = "".join(parts)
+        if len(_NATURAL_KEY_CACHE) >= NATURAL_KEY_CACHE_SIZE:
+            _NATURAL_KEY_CACHE.clear()
+        _NATURAL_KEY_CACHE[text] = key
+    return key
+
+
 def numericalSort(data):
     """Numerically sorts a list of strings that may have integers within
 
@@ -33,7 +171,99 @@ def numericalSort(data):
         print numericalSort(data)
         # Result: ['joint', 'joint1', 'joint2', 'joint50'] #
     """
-    return sorted(data, key=lambda key: [int(c) if c.isdigit() else c for c in re.split('([0-9]+)', key)])
+    return sorted(data, key=naturalSortKey)
+
+
+def numericalTopN(data, count, reverse=False):
+    """Returns the first `count` strings of the iterable in natural sort order without sorting or storing the
+    whole iterable.
+
+    :param data: any iterable of strings, eg. a generator over a directory listing
+    :type data: iterable(str)
+    :param count: the number of strings to return
+    :type count: int
+    :param reverse: if True returns the last `count` strings, highest first
+    :type reverse: bool
+    :rtype: list(str)
+    """
+    if reverse:
+        return heapq.nlargest(count, data, key=naturalSortKey)
+    return heapq.nsmallest(count, data, key=naturalSortKey)
+
+
+class NumericalSortedList(object):
+    """List of strings kept in natural sort order, inserts use bisect on the precomputed keys so adding to a
+    large sorted list doesn't require sorting again. Equal keys keep their insertion order.
+
+    .. code-block:: python
+
+        names = NumericalSortedList(["shot10", "shot2"])
+        names.add("shot9")
+        list(names)
+        # ['shot2', 'shot9', 'shot10']
+
+    :param data: the initial strings
+    :type data: iterable(str)
+    """
+
+    def __init__(self, data=()):
+        self._items = numericalSort(data)
+        self._keys = [naturalSortKey(item) for item in self._items]
+
+    def __repr__(self):
+        return "<{}> {}".format(self.__class__.__name__, self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __contains__(self, item):
+        return self.index(item) >= 0
+
+    def add(self, item):
+        """Inserts the item after any items with an equal key.
+
+        :type item: str
+        :return: the insert index
+        :rtype: int
+        """
+        key = naturalSortKey(item)
+        index = bisect.bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._items.insert(index, item)
+        return index
+
+    def update(self, data):
+        for item in data:
+            self.add(item)
+
+    def index(self, item):
+        """
+        :return: the index of the item or -1 if the item isn't in the list
+        :rtype: int
+        """
+        key = naturalSortKey(item)
+        index = bisect.bisect_left(self._keys, key)
+        while index < len(self._keys) and self._keys[index] == key:
+            if self._items[index] == item:
+                return index
+            index += 1
+        return -1
+
+    def remove(self, item):
+        """
+        :raise ValueError: if the item isn't in the list
+        """
+        index = self.index(item)
+        if index < 0:
+            raise ValueError("{} not in list".format(item))
+        del self._keys[index]
+        del self._items[index]
 
 
 def formatFrameToTime(start, current, frameRate):
@@ -108,6 +338,9 @@ def getDuplicates(seq):
 def fuzzyFinder(input, collection):
     """ A poor person fuzzy finder function.
 
+    For ranked searches of the same collection repeatedly(per keystroke) use
+    :class:`zoo.libs.utils.fuzzysearch.FuzzyIndex`.
+
     :param input: A partial string which is typically entered by a user.
     :type input: str.
     :param collection: A collection of strings which will be filtered based on the `input`.
@@ -139,7 +372,102 @@ def isIteratable(obj):
 
 
 def chunks(iteratable, size, overlap=0):
-    """Yield successive sized chunks from `iteratable`.
+    """Yield successive sized chunks from `iteratable`, each chunk starts `size - overlap` items after the
+    previous chunk and the last chunk may be shorter.
+
+    Sequences are sliced, numpy arrays are sliced into views and bytearrays/memoryviews are yielded as
+    memoryview slices so no data is copied, wrap a str in a memoryview to chunk it without copying.
+    Any other iterable(generators, sets etc.) is consumed once through a ring buffer and yields lists.
+
+    .. code-block:: python
+
+        list(chunks(range(7), 3, overlap=1))
+        # [[0, 1, 2], [2, 3, 4], [4, 5, 6]]
+        list(chunks(iter(range(7)), 3))
+        # [[0, 1, 2], [3, 4, 5], [6]]
+
+    :param iteratable: the data to chunk
+    :type iteratable: iterable
+    :param size: the number of items in each chunk
+    :type size: int
+    :param overlap: the number of items each chunk shares with the previous chunk
+    :type overlap: int
+    :raise ValueError: when the overlap isn't smaller than the size
+    """
+    if overlap >= size:
+        raise ValueError("Chunk overlap({}) must be smaller than the size({})".format(overlap, size))
+    if isinstance(iteratable, bytearray):
+        iteratable = memoryview(iteratable)
+    if isinstance(iteratable, (collections.Sequence, memoryview)) or hasattr(iteratable, "__array_interface__"):
+        for i in range(0, len(iteratable) - overlap, size - overlap):
+            yield iteratable[i:i + size]
+        return
+    for chunk in _iterChunks(iter(iteratable), size, overlap):
+        yield chunk
+
+
+def _iterChunks(iterator, size, overlap):
+    """Ring buffer chunking for iterators, yields the same chunks as slicing the equivalent sequence.
     """
-    for i in range(0, len(iteratable)-overlap, size-overlap):
-        yield iteratable[i:i + size]
\ No newline at end of file
+    window = collections.deque(maxlen=size)
+    step = size - overlap
+    # items added since the last chunk, the first chunk needs a full window
+    pending = 0
+    required = size
+    emitted = False
+    for item in iterator:
+        window.append(item)
+        pending += 1
+        if pending == required:
+            yield list(window)
+            emitted = True
+            pending = 0
+            required = step
+    if emitted:
+        if pending:
+            # the final chunk is shorter, it starts `step` items after the previous chunk
+            yield list(window)[-(overlap + pending):]
+    elif pending > overlap:
+        yield list(window)
+
+
+def mapChunks(func, iteratable, size, overlap=0, processes=4, ordered=True):
+    """Calls func with each chunk from :func:`chunks` on a thread pool and yields the results.
+
+    Threads suit functions which release the GIL such as io, zlib, hashlib or numpy. Chunks are submitted in
+    batches of a few chunks per thread so only a bounded part of the iterable is read ahead, which makes it
+    safe for large or endless iterables. Closing the generator early cancels the chunks which haven't started.
+
+    :param func: called with each chunk
+    :type func: callable
+    :param iteratable: the data to chunk
+    :type iteratable: iterable
+    :param size: the number of items in each chunk
+    :type size: int
+    :param overlap: the number of items each chunk shares with the previous chunk
+    :type overlap: int
+    :param processes: the number of threads
+    :type processes: int
+    :param ordered: if True the results are yielded in chunk order otherwise as they finish
+    :type ordered: bool
+    :rtype: generator
+    """
+    window = processes * 4
+    chunkIterator = chunks(iteratable, size, overlap)
+    pool = ThreadPool(processes)
+    finished = False
+    try:
+        mapper = pool.imap if ordered else pool.imap_unordered
+        while True:
+            batch = list(itertools.islice(chunkIterator, window))
+            if not batch:
+                break
+            for result in mapper(func, batch):
+                yield result
+        finished = True
+    finally:
+        if finished:
+            pool.close()
+        else:
+            # the consumer stopped early or func raised, drop the queued chunks
+            pool.terminate()
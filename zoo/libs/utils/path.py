@@ -1,4 +1,6 @@
+import bisect
 import ctypes
+import fnmatch
 import imghdr
 import inspect
 
@@ -8,11 +10,32 @@ import shutil
 import stat
 import sys
 
+try:
+    from os import scandir as _scandir
+except ImportError:
+    try:
+        # python 2 backport
+        from scandir import scandir as _scandir
+    except ImportError:
+        _scandir = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 ENV_REGEX = re.compile("\%[^%]+\%")
 UDIM_PATTERN = "u\d+_v\d+"
 PATCH_PATTERN = "\d{4,}"
 VERSION_REGEX = re.compile("(.*)([._-])v(\d+)\.?([^.]+)?$", re.IGNORECASE)
 FRAME_REGEX = re.compile("(.*)([._-])(\d+)\.([^.]+)$", re.IGNORECASE)
+UDIM_REGEX = re.compile("({0})".format(UDIM_PATTERN))
+PATCH_REGEX = re.compile("({0})".format(PATCH_PATTERN))
+# max number of resolved paths kept by the Path construction cache, see :func:`resolveAndSplitCached`
+PATH_CACHE_SIZE = 20000
+_RESOLVE_CACHE = {}
+_VERSION_INDEXES = {}
+
 
 class Path(str):
     """Wrapper class around file and folder paths providing compability with unc
@@ -37,15 +60,21 @@ class Path(str):
         # set to an empty string if we've been init'd with None
         path = "" if path is None else path
 
-        resolvedPath, pathTokens, isUnc = resolveAndSplit(path, envDict)
+        resolvedPath, pathTokens, isUnc = resolveAndSplitCached(path, envDict)
+        return cls._fromResolved(resolvedPath, pathTokens, isUnc, path, caseMatters)
+
+    @classmethod
+    def _fromResolved(cls, resolvedPath, pathTokens, isUnc, passed, caseMatters=None):
+        """Creates a new instance from an already resolved path string and its tokens, skipping resolution
+        """
         new = str.__new__(cls, resolvedPath)
         new.isUNC = isUnc
         new.hasTrailing = resolvedPath.endswith('/')
         new._splits = tuple(pathTokens)
-        new._passed = path
+        new._passed = passed
 
         # case sensitivity, if not specified, defaults to system behaviour
-        if caseMatters:
+        if caseMatters is not None:
             new.caseMatters = caseMatters
 
         return new
@@ -63,7 +92,46 @@ class Path(str):
     def __add__(self, other):
         """add to paths to together
         """
-        return self.__class__("".join([self, '/', other]), self.caseMatters)
+        passed = "".join([self, '/', other])
+        entry = _RESOLVE_CACHE.get(passed)
+        # only env independent entries can be reused without checking the environment
+        if entry is not None and not entry[3]:
+            return self._fromResolved(entry[0], entry[1], entry[2], passed, self.caseMatters)
+        joined = self._joinResolved(other, passed)
+        if joined is not None:
+            return joined
+        return self.__class__(passed, self.caseMatters)
+
+    def _joinResolved(self, other, passed):
+        """Fast join which appends the tokens of `other` onto this already normalised path without re-resolving
+        it. Returns None when `other` needs resolving(env variables, '..', backslashes) or this path is a special
+        case, in which case the caller should fall back to resolving the full joined string.
+
+        :param other: the path fragment to append.
+        :type other: str
+        :param passed: the unresolved joined path string.
+        :type passed: str
+        :rtype: :class:`Path` or None
+        """
+        selfStr = str(self)
+        otherStr = str(other)
+        if (not self._splits or selfStr == '/' or '%' in selfStr or '%' in otherStr or '\\' in otherStr or
+                '..' in otherStr or selfStr.startswith('~') or '..' in self._splits):
+            return None
+        otherToks = otherStr.split('/')
+        hasTrailing = not otherToks[-1]
+        if '' in otherToks:
+            otherToks = [tok for tok in otherToks if tok]
+        pathsToUse = self._splits + tuple(otherToks)
+        resolvedPath = '/'.join(pathsToUse)
+        if hasTrailing:
+            resolvedPath += '/'
+        elif not pathsToUse[-1]:
+            pathsToUse = pathsToUse[:-1]
+        if self.isUNC:
+            resolvedPath = '//' + resolvedPath
+        _cacheResolved(passed, (resolvedPath, pathsToUse, self.isUNC, ()))
+        return self._fromResolved(resolvedPath, pathsToUse, self.isUNC, passed, self.caseMatters)
 
     def __radd__(self, other):
         return self.__class__(other, self.caseMatters) + self
@@ -89,13 +157,33 @@ class Path(str):
 
     def __hash__(self):
         """
-        the hash for two paths that are identical should match - the most reliable way to do this
-        is to use a tuple from self.split to generate the hash from
+        the hash for two paths that are identical should match - the hash is generated from the
+        normalised key which is what isEqual compares, it's computed once and cached on the instance
         """
-        if not self.caseMatters:
-            return hash(tuple([s.lower() for s in self._splits]))
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(self._normalisedKey())
+            return self._hash
+
+    def _normalisedKey(self):
+        """Returns the string used for equality testing and hashing, ie. the path without trailing separators
+        and lower cased if case doesn't matter. The key is computed lazily and cached on the instance since
+        paths are immutable.
+
+        .. note::
+            str subclasses can't define non-empty __slots__ so the cache lives in the instance dict.
 
-        return hash(tuple(self._splits))
+        :rtype: str
+        """
+        try:
+            return self._key
+        except AttributeError:
+            key = str(self.asFile())
+            if not self.caseMatters:
+                key = key.lower()
+            self._key = key
+            return key
 
     def __getslice__(self, a, b):
         isUNC = self.isUNC
@@ -143,16 +231,19 @@ class Path(str):
             This doesn't take into account any sort of linking on nix systems.
 
         """
+        if other is self:
+            return True
         if not isinstance(other, Path):
             other = Path(other, self.caseMatters)
 
-        selfStr = str(self.asFile())
+        if other.caseMatters == self.caseMatters:
+            return self._normalisedKey() == other._normalisedKey()
+
         otherStr = str(other.asFile())
         if not self.caseMatters:
-            selfStr = selfStr.lower()
             otherStr = otherStr.lower()
 
-        return selfStr == otherStr
+        return self._normalisedKey() == otherStr
 
     __eq__ = isEqual
 
@@ -715,31 +806,30 @@ class Path(str):
         if not self.exists():
             return
 
-        if recursive:
-            walker = os.walk(self)
-            for path, subs, files in walker:
-                path = Path(path, self.caseMatters)
+        for entry in scanDirectory(self, recursive=recursive):
+            p = entry.toPath(self.caseMatters)
+            if itemtest(p):
+                yield p
 
-                for sub in subs:
-                    p = path / sub
-                    if itemtest(p):
-                        yield p
+    def scan(self, recursive=False, dirs=True, files=True, pattern=None, extensions=None, maxDepth=None):
+        """Lazily lists the directory, see :func:`scanDirectory` for the arguments.
 
-                for item in files:
-                    p = path / item
-                    if itemtest(p):
-                        yield p
-        else:
-            for item in os.listdir(self):
-                p = self / item
-                if itemtest(p):
-                    yield p
+        :return: generator yielding lightweight :class:`DirectoryEntry` objects, use entry.toPath() to get \
+        a Path instance.
+        :rtype: generator(:class:`DirectoryEntry`)
+        """
+        if not self.exists():
+            return iter(())
+        return scanDirectory(self, recursive=recursive, dirs=dirs, files=files, pattern=pattern,
+                             extensions=extensions, maxDepth=maxDepth)
 
-    def dirs(self, recursive=False):
-        return self._list_filesystem_items(os.path.isdir, recursive)
+    def dirs(self, recursive=False, pattern=None, maxDepth=None):
+        for entry in self.scan(recursive, files=False, pattern=pattern, maxDepth=maxDepth):
+            yield entry.toPath(self.caseMatters)
 
-    def files(self, recursive=False):
-        return self._list_filesystem_items(os.path.isfile, recursive)
+    def files(self, recursive=False, pattern=None, extensions=None, maxDepth=None):
+        for entry in self.scan(recursive, dirs=False, pattern=pattern, extensions=extensions, maxDepth=maxDepth):
+            yield entry.toPath(self.caseMatters)
 
     def toUnc(self):
         drive, path = os.path.splitdrive(str(self))
@@ -755,6 +845,158 @@ class Path(str):
         return str(self).replace("\\", "//")
 
 
+class DirectoryEntry(object):
+    """Lightweight directory listing entry returned by :func:`scanDirectory`, the file type comes from the
+    directory listing itself so no extra stat calls are required. Path instances are only created on request.
+    """
+    __slots__ = ("name", "path", "depth", "_entry", "_isDir")
+
+    def __init__(self, entry, depth, isDir):
+        self.name = entry.name
+        self.path = entry.path
+        self.depth = depth
+        self._entry = entry
+        self._isDir = isDir
+
+    def __repr__(self):
+        return "<{}> {}".format(self.__class__.__name__, self.path)
+
+    def isDir(self):
+        return self._isDir
+
+    def isFile(self):
+        return not self._isDir and self._entry.is_file()
+
+    def isLink(self):
+        return self._entry.is_symlink()
+
+    def stat(self):
+        """Returns the stat result for the entry, this is cached by the entry and on windows is free.
+        """
+        return self._entry.stat()
+
+    def toPath(self, caseMatters=None):
+        """
+        :rtype: :class:`Path`
+        """
+        return Path(self.path, caseMatters)
+
+
+class _ListDirEntry(object):
+    """os.DirEntry stand in used when scandir isn't available, the information is looked up on demand
+    """
+    __slots__ = ("name", "path", "_stat")
+
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, name)
+        self._stat = None
+
+    def is_dir(self, follow_symlinks=True):
+        if not follow_symlinks and self.is_symlink():
+            return False
+        return os.path.isdir(self.path)
+
+    def is_file(self, follow_symlinks=True):
+        if not follow_symlinks and self.is_symlink():
+            return False
+        return os.path.isfile(self.path)
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+    def stat(self, follow_symlinks=True):
+        if not follow_symlinks:
+            return os.lstat(self.path)
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+
+def _iterDirEntries(directory):
+    if _scandir is not None:
+        return _scandir(directory)
+    return (_ListDirEntry(directory, name) for name in os.listdir(directory))
+
+
+def scanDirectory(root, recursive=False, dirs=True, files=True, pattern=None, extensions=None, maxDepth=None,
+                  followLinks=False):
+    """Generator which lists `root` using os.scandir(the scandir backport on python 2, falling back to
+    os.listdir). Entries are yielded as soon as they are listed so consumers can start working straight away,
+    the file type information from the listing is reused so there's no extra stat per entry.
+
+    Walks top down in the same order as os.walk, filters only affect what's yielded not which directories
+    are walked. Unreadable sub directories are skipped like os.walk does.
+
+    .. code-block:: python
+
+        for entry in scanDirectory("/renders/shot010", recursive=True, extensions=("exr",), maxDepth=2):
+            print entry.path, entry.stat().st_size
+
+    :param root: the directory to list
+    :type root: str
+    :param recursive: if True then sub directories are walked as well
+    :type recursive: bool
+    :param dirs: whether directory entries are yielded
+    :type dirs: bool
+    :param files: whether file entries are yielded
+    :type files: bool
+    :param pattern: glob pattern or patterns(fnmatch) which the entry name has to match eg. "*.exr"
+    :type pattern: str or iterable(str) or None
+    :param extensions: case insensitive file extensions without the period, only applies to files eg. ("exr",)
+    :type extensions: iterable(str) or None
+    :param maxDepth: when recursive, the max depth to walk, the root's children are depth 0 so a maxDepth of 1 \
+    also lists the children of the root's sub directories. None is unlimited.
+    :type maxDepth: int or None
+    :param followLinks: whether to walk into symlinked directories
+    :type followLinks: bool
+    :rtype: generator(:class:`DirectoryEntry`)
+    """
+    if isinstance(pattern, basestring):
+        pattern = (pattern,)
+    if pattern:
+        # same as fnmatch.fnmatch, the pattern and the name are both normalised
+        patternRegex = re.compile("|".join(fnmatch.translate(os.path.normcase(p)) for p in pattern))
+    else:
+        patternRegex = None
+    if extensions:
+        extensions = frozenset("." + ext.lstrip(".").lower() for ext in extensions)
+    if not recursive:
+        maxDepth = 0
+
+    stack = [(str(root), 0)]
+    while stack:
+        directory, depth = stack.pop()
+        subDirectories = []
+        try:
+            entries = _iterDirEntries(directory)
+        except OSError:
+            if depth == 0:
+                raise
+            continue
+        try:
+            for entry in entries:
+                isDir = entry.is_dir()
+                if isDir and (maxDepth is None or depth < maxDepth) and (followLinks or not entry.is_symlink()):
+                    subDirectories.append((entry.path, depth + 1))
+                if isDir:
+                    if not dirs:
+                        continue
+                elif not files or (extensions and os.path.splitext(entry.name)[1].lower() not in extensions):
+                    continue
+                if patternRegex is not None and patternRegex.match(os.path.normcase(entry.name)) is None:
+                    continue
+                yield DirectoryEntry(entry, depth, isDir)
+        finally:
+            # release the directory handle when the caller stops iterating early, the scandir backport's
+            # iterator has no close method
+            close = getattr(entries, "close", None)
+            if close is not None:
+                close()
+        # reversed so the sub directories are walked in listing order
+        stack.extend(reversed(subDirectories))
+
+
 def findFirstInPaths(filename, paths):
     """
     given a filename or path fragment, this will return the first occurance of a file with that name
@@ -838,36 +1080,101 @@ def pathToUnc(path):
     return remoteName.value
 
 
-def resolveAndSplit(path, envDict=None, raiseOnMissing=False):
-    """recursively expands all environment variables and '..' tokens in a pathname
+def clearPathCache():
+    """Clears the resolved path cache used by :class:`Path` construction
+    """
+    _RESOLVE_CACHE.clear()
+
+
+def resolveAndSplitCached(path, envDict=None):
+    """Same as :func:`resolveAndSplit` but the results are memoized in a bounded cache and the tokens are
+    returned as a tuple of interned strings.
+
+    The cache is keyed on the user expanded path string. Along with the result each entry stores a snapshot of
+    the environment variables the path referenced, on lookup that snapshot is compared against `envDict` so
+    changes to the environment(or a different envDict) are always honoured. Paths without any variables are a
+    plain dict lookup. Case sensitivity doesn't affect resolution so it isn't part of the key.
+
+    :param path: the path to resolve
+    :type path: str
+    :param envDict: the environment to resolve variables from, defaults to os.environ
+    :type envDict: dict or None
+    :return: the resolved path, the path tokens and whether the path is a UNC path
+    :rtype: tuple(str, tuple(str), bool)
     """
     if envDict is None:
         envDict = os.environ
-
     path = os.path.expanduser(str(path))
+    entry = _RESOLVE_CACHE.get(path)
+    if entry is not None:
+        for name, value in entry[3]:
+            if envDict.get(name) != value:
+                break
+        else:
+            return entry[0], entry[1], entry[2]
 
-    # performing this check is faster than doing the regex
-    if '%' in path:
-        findall = re.findall
+    envSnapshot = {}
+    resolvedPath, pathTokens, isUNC = resolveAndSplit(path, envDict, envSnapshot=envSnapshot)
+    pathTokens = tuple(intern(tok) for tok in pathTokens)
+    _cacheResolved(path, (resolvedPath, pathTokens, isUNC, tuple(envSnapshot.items())))
+    return resolvedPath, pathTokens, isUNC
 
-        # first resolve any env variables
-        matches = findall(ENV_REGEX, path)
-        missingVars = set()
-        while matches:
-            for match in matches:
-                try:
-                    path = path.replace(match, envDict[match[1:-1]])
-                except KeyError:
-                    if raiseOnMissing:
-                        raise
 
-                    missingVars.add(match)
+def _cacheResolved(path, entry):
+    # simple bound, once full start again rather than paying for LRU bookkeeping on every lookup
+    if len(_RESOLVE_CACHE) >= PATH_CACHE_SIZE:
+        _RESOLVE_CACHE.clear()
+    _RESOLVE_CACHE[path] = entry
 
-            matches = set(findall(ENV_REGEX, path))
 
-            # remove any variables that have been found to be missing...
-            for missing in missingVars:
-                matches.remove(missing)
+def _resolveEnvVars(path, envDict, raiseOnMissing=False, envSnapshot=None):
+    """Recursively expands all the environment variables in the path string, see :func:`resolveAndSplit`
+    """
+    findall = re.findall
+
+    # first resolve any env variables
+    matches = findall(ENV_REGEX, path)
+    missingVars = set()
+    while matches:
+        for match in matches:
+            try:
+                value = envDict[match[1:-1]]
+            except KeyError:
+                if envSnapshot is not None:
+                    envSnapshot[match[1:-1]] = None
+                if raiseOnMissing:
+                    raise
+
+                missingVars.add(match)
+                continue
+            if envSnapshot is not None:
+                envSnapshot[match[1:-1]] = value
+            path = path.replace(match, value)
+
+        matches = set(findall(ENV_REGEX, path))
+
+        # remove any variables that have been found to be missing...
+        for missing in missingVars:
+            matches.remove(missing)
+
+    return path
+
+
+def resolveAndSplit(path, envDict=None, raiseOnMissing=False, envSnapshot=None):
+    """recursively expands all environment variables and '..' tokens in a pathname
+
+    :param envSnapshot: if a dict is given it will be filled with the value(None if missing) of every \
+    environment variable looked up while resolving the path.
+    :type envSnapshot: dict or None
+    """
+    if envDict is None:
+        envDict = os.environ
+
+    path = os.path.expanduser(str(path))
+
+    # performing this check is faster than doing the regex
+    if '%' in path:
+        path = _resolveEnvVars(path, envDict, raiseOnMissing, envSnapshot)
 
     # now resolve any subpath navigation
     # NOTE: believe it or not, checking this first is faster
@@ -911,6 +1218,144 @@ def resolveAndSplit(path, envDict=None, raiseOnMissing=False):
     return path, pathsToUse, isUNC
 
 
+def resolveMany(paths, envDict=None):
+    """Generator version of :func:`resolveAndSplit` built for resolving large batches of paths which share
+    env variables and directory prefixes, ie. texture or cache paths.
+
+    Env variables are resolved(including nested variables) once per variable rather than per path and
+    substituted in a single regex pass. Directories are resolved through a prefix trie where each unique
+    directory is resolved once from its parent, and each unique unresolved directory string is substituted
+    once, so for the common case only the last token of each path needs processing.
+    Paths which can't be substituted cleanly(missing variables etc) fall back to :func:`resolveAndSplit` so
+    the results always match it.
+
+    .. code-block:: python
+
+        for resolved, tokens, isUNC in resolveMany(["%PROJECT%/textures/wood_1001.exr",
+                                                    "%PROJECT%/textures/wood_1002.exr"]):
+            print resolved
+
+    :param paths: the paths to resolve
+    :type paths: iterable(str)
+    :param envDict: the environment to resolve variables from, defaults to os.environ
+    :type envDict: dict or None
+    :return: generator yielding the resolved path, the path tokens and whether the path is a UNC path
+    :rtype: generator(tuple(str, tuple(str), bool))
+    """
+    if envDict is None:
+        envDict = os.environ
+    resolvedVars = {}
+    # flattened tries(regular, UNC), nodes are keyed by their env substituted prefix, the parent of a node is its
+    # prefix up to the last separator. Each node stores the resolved tokens and whether a '..' couldn't be resolved
+    nodes = ({}, {})
+
+    def substitute(match):
+        name = match.group(0)
+        value = resolvedVars.get(name)
+        if value is None:
+            value = envDict.get(name[1:-1])
+            if value is None:
+                value = name
+            elif '%' in value:
+                # nested variables, anything left unresolved is caught by the fallback below
+                value = _resolveEnvVars(value, envDict)
+            resolvedVars[name] = value
+        return value
+
+    def resolveNode(prefix, uncNodes):
+        node = uncNodes.get(prefix)
+        if node is None:
+            head, sep, tail = prefix.rpartition('/')
+            if not sep:
+                node = _tokenStep((), False, prefix, True)
+            else:
+                parentToks, parentBroken = resolveNode(head, uncNodes)
+                node = _tokenStep(parentToks, parentBroken, tail)
+            uncNodes[prefix] = node
+        return node
+
+    envSub = ENV_REGEX.sub
+
+    def resolveSubstituted(path):
+        if '\\' in path:
+            path = path.replace('\\', '/')
+        isUNC = path.startswith('//')
+        if isUNC:
+            path = path[2:]
+        head, sep, tail = path.rpartition('/')
+        if not sep:
+            return _tokenStep((), False, path, True)[0], isUNC
+        pathsToUse, broken = resolveNode(head, nodes[isUNC])
+        if tail:
+            return _tokenStep(pathsToUse, broken, tail)[0], isUNC
+        return pathsToUse + ('',), isUNC
+
+    # unresolved directory -> (resolved tokens, broken, isUNC) or None if it can't be substituted cleanly
+    heads = {}
+    expanduser = os.path.expanduser
+    for path in paths:
+        path = str(path)
+        if path.startswith('~'):
+            path = expanduser(path)
+        head, sep, tail = path.rpartition('/')
+        entry = None
+        if sep and '%' not in tail and '\\' not in tail:
+            try:
+                entry = heads[head]
+            except KeyError:
+                substituted = envSub(substitute, head) if '%' in head else head
+                if '%' not in substituted:
+                    # resolve a dummy leaf so the directory node is shared with the full path resolution
+                    parentToks, isUNC = resolveSubstituted(substituted + '/_')
+                    if parentToks and parentToks[-1] == '_':
+                        entry = parentToks[:-1], isUNC
+                heads[head] = entry
+        if entry is not None:
+            # fast path, only the leaf token needs resolving
+            if tail == "..":
+                entry = None
+            elif tail:
+                pathsToUse = entry[0] + (tail,)
+            else:
+                pathsToUse = entry[0] + ('',)
+        if entry is None:
+            if '%' in path:
+                substituted = envSub(substitute, path)
+                if '%' in substituted:
+                    resolvedPath, pathTokens, isUNC = resolveAndSplit(path, envDict)
+                    yield resolvedPath, tuple(pathTokens), isUNC
+                    continue
+                path = substituted
+            pathsToUse, isUNC = resolveSubstituted(path)
+        else:
+            isUNC = entry[1]
+
+        resolvedPath = '/'.join(pathsToUse)
+        if pathsToUse and not pathsToUse[-1]:
+            pathsToUse = pathsToUse[:-1]
+        if isUNC:
+            resolvedPath = '//' + resolvedPath
+        yield resolvedPath, pathsToUse, isUNC
+
+
+def _tokenStep(pathsToUse, broken, tok, isFirst=False):
+    """Applies a single path token to the already resolved tokens, this mirrors the token loop in
+    :func:`resolveAndSplit`.
+
+    :return: the new tokens and whether a '..' token couldn't be resolved, once that happens the remaining \
+    tokens are kept as is
+    :rtype: tuple(tuple(str), bool)
+    """
+    if not tok and not isFirst:
+        # duplicate separators
+        return pathsToUse, broken
+    elif tok == ".." and not broken:
+        if pathsToUse:
+            return pathsToUse[:-1], False
+        return (tok,), True
+    return pathsToUse + (tok,), broken
+
+
 def getTexturesNames(textures, input="zbrush", output="mari", prefix=None):
     """Renames given textures.
 
@@ -942,48 +1387,84 @@ def getTexturesNames(textures, input="zbrush", output="mari", prefix=None):
 
     """
 
-    inputMethod = "udim" if input in ("mudbox", "zbrush") else "patch"
-    outputMethod = "udim" if output in ("mudbox", "zbrush") else "patch"
-    pattern = UDIM_PATTERN if inputMethod == "udim" else PATCH_PATTERN
-
-    offsetUdim = lambda x, y: (x[0] + y, x[1] + y)
-
     if input == "zbrush" and output == "mudbox":
         textures = reversed(textures)
 
-    texturesMapping = []
+    texturesMapping, unmatched = _batchTexturesNames(textures, input, output, prefix)
+    for texture in unmatched:
+        print("'{0}' | '{1}' file doesn't match '{2}' pattern!".format(inspect.getmodulename(__file__),
+                                                                       texture,
+                                                                       _textureMethod(input).title()))
+    return texturesMapping
+
+
+def getTexturesNamesMap(textures, input="zbrush", output="mari", prefix=None):
+    """Batch version of :func:`getTexturesNames` which returns a rename map, the udim patterns are only compiled
+    once and the tile conversions are done in one pass(vectorized when numpy is available).
+
+    :param textures: Textures.
+    :type textures: iterable(str)
+    :param input: Input format ( "mari", "mudbox", "zbrush" ).
+    :type input: str
+    :param output: Output format ( "mari", "mudbox", "zbrush" ).
+    :type output: str
+    :param prefix: Rename prefix.
+    :type prefix: str
+    :return: The source to destination rename map and the textures which didn't match the input pattern
+    :rtype: tuple(dict(str, str), list(str))
+    """
+    texturesMapping, unmatched = _batchTexturesNames(textures, input, output, prefix)
+    return dict(texturesMapping), unmatched
+
+
+def _textureMethod(application):
+    return "udim" if application in ("mudbox", "zbrush") else "patch"
+
+
+def _batchTexturesNames(textures, input, output, prefix):
+    inputMethod = _textureMethod(input)
+    outputMethod = _textureMethod(output)
+    regex = UDIM_REGEX if inputMethod == "udim" else PATCH_REGEX
+
+    matched = []
+    unmatched = []
+    tiles = []
     for texture in textures:
         basename = os.path.basename(texture)
-        search = re.search(r"({0})".format(pattern), basename)
+        search = regex.search(basename)
         if not search:
-            print("'{0}' | '{1}' file doesn't match '{2}' pattern!".format(inspect.getmodulename(__file__),
-                                                                           texture,
-                                                                           inputMethod.title()))
+            unmatched.append(texture)
             continue
-
+        token = search.group(0)
         if inputMethod == "udim":
-            udim = [int(value[1:]) for value in search.group(0).split("_")]
-        elif inputMethod == "patch":
-            udim = udimFromPatch(int(search.group(0)))
-
-        udim = offsetUdim(udim, -1) if input == "mudbox" else udim
-        udim = offsetUdim(udim, 1) if output == "mudbox" else udim
-
-        if outputMethod == "udim":
-            outputAffix = "u{0}_v{1}".format(*udim)
-        elif outputMethod == "patch":
-            outputAffix = patchFromUdim(udim)
+            u, v = token.split("_")
+            tiles.append((int(u[1:]), int(v[1:])))
+        else:
+            tiles.append(int(token))
+        matched.append((texture, basename))
+    if not matched:
+        return [], unmatched
+
+    if inputMethod == "udim":
+        udims = tiles
+    else:
+        udims = udimsFromPatches(tiles)
+    offset = (-1 if input == "mudbox" else 0) + (1 if output == "mudbox" else 0)
+    if offset:
+        udims = [(u + offset, v + offset) for u, v in udims]
+    if outputMethod == "udim":
+        affixes = ["u{0}_v{1}".format(u, v) for u, v in udims]
+    else:
+        affixes = [str(patch) for patch in patchesFromUdims(udims)]
 
+    texturesMapping = []
+    for (texture, basename), outputAffix in zip(matched, affixes):
         if prefix is not None:
-            path = os.path.join(os.path.dirname(texture), "{0}{1}{2}".format(prefix,
-                                                                             outputAffix,
-                                                                             os.path.splitext(texture)[-1]))
+            name = "{0}{1}{2}".format(prefix, outputAffix, os.path.splitext(texture)[-1])
         else:
-            path = os.path.join(os.path.dirname(texture), re.sub(r"({0})".format(pattern), str(outputAffix), basename))
-
-        texturesMapping.append((texture, path))
-
-    return texturesMapping
+            name = regex.sub(outputAffix, basename)
+        texturesMapping.append((texture, os.path.join(os.path.dirname(texture), name)))
+    return texturesMapping, unmatched
 
 
 def patchFromUdim(udim):
@@ -1022,6 +1503,43 @@ def udimFromPatch(patch):
     return 9 if u == 0 else u - 1, v - 1 if u % 10 == 0 else v
 
 
+def patchesFromUdims(udims):
+    """Batch version of :func:`patchFromUdim`, uses numpy when available.
+
+    :param udims: sequence of (u, v) tiles or a (N, 2) array
+    :type udims: sequence(tuple(int, int))
+    :rtype: list(int)
+
+    .. code-block:: python
+
+        patchesFromUdims([(0, 0), (9, 0), (0, 1)])
+        #[1001, 1010, 1011]
+    """
+    if numpy is not None and len(udims):
+        tiles = numpy.asarray(udims, dtype=numpy.int64).reshape(-1, 2)
+        return (1001 + tiles[:, 0] + tiles[:, 1] * 10).tolist()
+    return [1001 + u + v * 10 for u, v in udims]
+
+
+def udimsFromPatches(patches):
+    """Batch version of :func:`udimFromPatch`, uses numpy when available.
+
+    :param patches: sequence of patches or a 1D array
+    :type patches: sequence(int)
+    :rtype: list(tuple(int, int))
+
+    .. code-block:: python
+
+        udimsFromPatches([1001, 1010, 1011])
+        #[(0, 0), (9, 0), (0, 1)]
+    """
+    if numpy is not None and len(patches):
+        # same as udimFromPatch ie. 1010 is u9 of the row below 1010 // 10
+        patchesMinus = numpy.asarray(patches, dtype=numpy.int64) - 1001
+        return zip(*(numpy.mod(patchesMinus, 10).tolist(), numpy.floor_divide(patchesMinus, 10).tolist()))
+    return [udimFromPatch(patch) for patch in patches]
+
+
 def getFrameSequencePath(path, frameSpec=None):
     """Converts the given path with the frame number into a sequence path using 
     the frameSpec value. If not frameSpec then it will default to '%4d'
@@ -1053,6 +1571,205 @@ def getFrameSequencePath(path, frameSpec=None):
     return os.path.join(os.path.dirname(path), newSeqName)
 
 
+class FrameSequence(object):
+    """Represents a group of files which only differ by their frame number eg. render.0001.exr, render.0002.exr.
+    Created by :func:`collapseFrameSequences`.
+
+    .. code-block:: python
+
+        seq = FrameSequence("/renders/", "beauty", ".", 4, "exr", [1, 2, 3, 5])
+        seq.path()
+        # /renders/beauty.%04d.exr
+        seq.rangeString()
+        # 1-3,5
+
+    :param directory: the directory the sequence lives in including the trailing separator, can be empty
+    :type directory: str
+    :param head: the file name up to the frame separator
+    :type head: str
+    :param separator: the character between the head and the frame number, one of "._-"
+    :type separator: str
+    :param padding: the number of digits of the frame number
+    :type padding: int
+    :param extension: the file extension without the period
+    :type extension: str
+    :param frames: the frame numbers, these will be sorted
+    :type frames: iterable(int)
+    """
+
+    def __init__(self, directory, head, separator, padding, extension, frames):
+        self._prefix = directory
+        self.directory = directory[:-1] if len(directory) > 1 else directory
+        self.head = head
+        self.separator = separator
+        self.padding = padding
+        self.extension = extension
+        self.frames = sorted(frames)
+
+    def __repr__(self):
+        return "<{}> {} [{}]".format(self.__class__.__name__, self.path(), self.rangeString())
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        return (self.framePath(frame) for frame in self.frames)
+
+    @property
+    def start(self):
+        return self.frames[0]
+
+    @property
+    def end(self):
+        return self.frames[-1]
+
+    def _join(self, token):
+        return "".join((self._prefix, self.head, self.separator, token, ".", self.extension))
+
+    def path(self, frameSpec=None):
+        """Returns the sequence path, matching :func:`getFrameSequencePath`.
+
+        :param frameSpec: The frame specification to replace the frame number with, defaults to the padding \
+        of the sequence eg. '%04d'
+        :type frameSpec: str
+        :rtype: str
+        """
+        return self._join(frameSpec or "%0{:d}d".format(self.padding))
+
+    def framePath(self, frame):
+        """Returns the file path for the frame.
+
+        :type frame: int
+        :rtype: str
+        """
+        return self._join(str(frame).zfill(self.padding))
+
+    def ranges(self):
+        """Returns the contiguous frame ranges of the sequence.
+
+        :return: the inclusive (start, end) pairs eg. [(1, 100), (102, 200)]
+        :rtype: list(tuple(int, int))
+        """
+        frames = self.frames
+        if not frames:
+            return []
+        result = []
+        start = previous = frames[0]
+        for frame in frames[1:]:
+            if frame != previous + 1:
+                result.append((start, previous))
+                start = frame
+            previous = frame
+        result.append((start, previous))
+        return result
+
+    def rangeString(self):
+        """
+        :return: the frame ranges as a string eg. "1-100,102-200"
+        :rtype: str
+        """
+        return ",".join(str(start) if start == end else "{}-{}".format(start, end) for start, end in self.ranges())
+
+    def missingFrames(self):
+        """
+        :return: the frames between the start and end frame which don't exist
+        :rtype: list(int)
+        """
+        missing = []
+        ranges = self.ranges()
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            missing.extend(xrange(end + 1, start))
+        return missing
+
+    def isUdim(self):
+        """Returns True when the frame numbers are all valid UDIM patches(1001-9999).
+
+        :rtype: bool
+        """
+        return bool(self.frames) and 1001 <= self.frames[0] and self.frames[-1] <= 9999
+
+    def udims(self):
+        """Returns the frames as udim tiles using :func:`udimFromPatch`
+
+        :rtype: list(tuple(int, int))
+        """
+        return [udimFromPatch(frame) for frame in self.frames]
+
+    def udimPath(self):
+        """Returns the sequence path using the mari <UDIM> token
+
+        :rtype: str
+        """
+        return self._join("<UDIM>")
+
+
+def collapseFrameSequences(paths, minLength=2):
+    """Groups the file paths into frame sequences in a single pass, files are grouped by their directory,
+    head, separator, padding and extension so render.0001.exr and render.1.exr are separate sequences.
+    Uses FRAME_REGEX so the sequences match :func:`getFrameSequencePath`.
+
+    Memory use and time are linear to the number of paths which makes this suitable for large listings,
+    paths can be any iterable including the generator from :func:`scanDirectory`.
+
+    .. code-block:: python
+
+        sequences, others = collapseFrameSequences(["/r/beauty.0001.exr", "/r/beauty.0002.exr", "/r/notes.txt"])
+        # [<FrameSequence> /r/beauty.%04d.exr [1-2]], ["/r/notes.txt"]
+
+    :param paths: the file paths or :class:`DirectoryEntry` instances, backslashes are treated as a directory \
+    separator
+    :type paths: iterable(str)
+    :param minLength: the min number of frames a group needs to be considered a sequence, smaller groups are \
+    returned with the other paths
+    :type minLength: int
+    :return: the sequences sorted by path and the paths which aren't part of a sequence, the frames of groups \
+    shorter than minLength are added after the paths which don't have a frame number
+    :rtype: tuple(list(:class:`FrameSequence`), list(str))
+    """
+    groups = {}
+    others = []
+    match = FRAME_REGEX.match
+    for filePath in paths:
+        filePath = str(getattr(filePath, "path", filePath))
+        index = max(filePath.rfind("/"), filePath.rfind("\\"))
+        result = match(filePath, index + 1)
+        if result is None:
+            others.append(filePath)
+            continue
+        head, separator, frame, extension = result.groups()
+        key = (filePath[:index + 1], head, separator, len(frame), extension)
+        frames = groups.get(key)
+        if frames is None:
+            groups[key] = frames = []
+        frames.append(int(frame))
+
+    sequences = []
+    for key in sorted(groups):
+        frames = groups[key]
+        sequence = FrameSequence(*(key + (frames,)))
+        if len(frames) < minLength:
+            others.extend(sequence)
+        else:
+            sequences.append(sequence)
+    return sequences, others
+
+
+def frameSequencesInDirectory(directory, recursive=False, extensions=None, minLength=2):
+    """Lists the directory and collapses the files into frame sequences, see :func:`collapseFrameSequences`.
+
+    :param directory: the directory to list
+    :type directory: str
+    :param recursive: whether to include sub directories
+    :type recursive: bool
+    :param extensions: case insensitive file extensions to include eg. ("exr", "dpx")
+    :type extensions: iterable(str) or None
+    :type minLength: int
+    :rtype: tuple(list(:class:`FrameSequence`), list(str))
+    """
+    entries = scanDirectory(directory, recursive=recursive, dirs=False, extensions=extensions)
+    return collapseFrameSequences((entry.path for entry in entries), minLength=minLength)
+
+
 def getVersionNumber(path):
     """
     Extract a version number from the supplied path.
@@ -1087,6 +1804,183 @@ def getVersionNumberAsStr(path):
     return version_number
 
 
+class VersionIndex(object):
+    """Index of the versioned files in a directory, maps the base name ie. everything before the version
+    separator to the sorted versions so queries don't need to list the directory or run the version regex again.
+
+    The index is rebuilt when the directory modified time changes, use :func:`versionIndex` to share indexes.
+
+    .. code-block:: python
+
+        # /publish contains asset_v001.ma, asset_v002.ma, asset_v002.abc, asset_v010.ma
+        index = versionIndex("/publish")
+        index.versions("asset")
+        # [1, 2, 10]
+        index.latestVersion("asset")
+        # 10
+        index.nextVersion("asset")
+        # 11
+        index.paths("asset", 2)
+        # ["/publish/asset_v002.abc", "/publish/asset_v002.ma"]
+
+    :param directory: the directory to index
+    :type directory: str
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._mtime = None
+        # baseName: sorted list(int)
+        self._versions = {}
+        # (baseName, version): sorted list(str)
+        self._names = {}
+
+    def __repr__(self):
+        return "<{}> {}".format(self.__class__.__name__, self.directory)
+
+    def refresh(self, force=False):
+        """Rebuilds the index if the directory has changed since the last build.
+
+        :param force: rebuild even if the directory modified time hasn't changed, filesystems with a coarse \
+        modified time resolution won't report changes made within the same tick.
+        :type force: bool
+        :return: True if the index was rebuilt
+        :rtype: bool
+        """
+        try:
+            mtime = os.stat(self.directory).st_mtime
+        except OSError:
+            mtime = None
+        if not force and mtime == self._mtime and self._mtime is not None:
+            return False
+        versions = {}
+        names = {}
+        if mtime is not None:
+            match = VERSION_REGEX.match
+            for entry in scanDirectory(self.directory):
+                result = match(entry.name)
+                if result is None:
+                    continue
+                baseName = result.group(1)
+                version = int(result.group(3))
+                key = (baseName, version)
+                fileNames = names.get(key)
+                if fileNames is None:
+                    names[key] = [entry.name]
+                    versions.setdefault(baseName, []).append(version)
+                else:
+                    fileNames.append(entry.name)
+            for versionList in versions.itervalues():
+                versionList.sort()
+            for fileNames in names.itervalues():
+                fileNames.sort()
+        self._versions = versions
+        self._names = names
+        self._mtime = mtime
+        return True
+
+    def baseNames(self):
+        """
+        :return: all the base names in the directory which have at least one version
+        :rtype: list(str)
+        """
+        self.refresh()
+        return sorted(self._versions)
+
+    def versions(self, baseName):
+        """
+        :param baseName: the file name before the version separator eg. "asset" for asset_v001.ma
+        :type baseName: str
+        :return: the sorted versions
+        :rtype: list(int)
+        """
+        self.refresh()
+        return list(self._versions.get(baseName, ()))
+
+    def hasVersion(self, baseName, version):
+        """
+        :type baseName: str
+        :type version: int
+        :rtype: bool
+        """
+        self.refresh()
+        versions = self._versions.get(baseName, ())
+        index = bisect.bisect_left(versions, version)
+        return index < len(versions) and versions[index] == version
+
+    def latestVersion(self, baseName):
+        """
+        :type baseName: str
+        :return: the highest version or -1 if there isn't a version, the same as :func:`getVersionNumber`
+        :rtype: int
+        """
+        self.refresh()
+        versions = self._versions.get(baseName)
+        return versions[-1] if versions else -1
+
+    def previousVersion(self, baseName, version):
+        """
+        :type baseName: str
+        :param version: the version to find the previous version for, doesn't need to exist
+        :type version: int
+        :return: the highest version lower than `version` or -1
+        :rtype: int
+        """
+        self.refresh()
+        versions = self._versions.get(baseName, ())
+        index = bisect.bisect_left(versions, version)
+        return versions[index - 1] if index else -1
+
+    def nextVersion(self, baseName):
+        """
+        :type baseName: str
+        :return: the version after the latest version, 1 if there aren't any versions
+        :rtype: int
+        """
+        return max(self.latestVersion(baseName), 0) + 1
+
+    def latestPaths(self, baseName):
+        """
+        :type baseName: str
+        :return: the full paths of the files with the latest version, empty if there isn't a version
+        :rtype: list(str)
+        """
+        return self.paths(baseName, self.latestVersion(baseName))
+
+    def paths(self, baseName, version):
+        """
+        :type baseName: str
+        :type version: int
+        :return: the full paths of the files with the version
+        :rtype: list(str)
+        """
+        self.refresh()
+        return [os.path.join(self.directory, name) for name in self._names.get((baseName, version), ())]
+
+
+def versionIndex(directory, force=False):
+    """Returns the shared :class:`VersionIndex` for the directory, refreshed if the directory has changed.
+
+    :param directory: the directory to index
+    :type directory: str
+    :param force: rebuild the index even if the directory modified time hasn't changed
+    :type force: bool
+    :rtype: :class:`VersionIndex`
+    """
+    key = os.path.normcase(os.path.abspath(directory))
+    index = _VERSION_INDEXES.get(key)
+    if index is None:
+        index = _VERSION_INDEXES[key] = VersionIndex(directory)
+    index.refresh(force)
+    return index
+
+
+def clearVersionIndexCache():
+    """Clears the shared version indexes.
+    """
+    _VERSION_INDEXES.clear()
+
+
 QTSUPPORTEDIMAGES = ('bmp', 'gif', 'jpg', 'jpeg', 'mng', 'png', 'pbm', 'pgm', 'ppm', 'tiff', 'xbm', 'xpm', 'svg', 'tga')
 
 
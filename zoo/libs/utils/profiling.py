@@ -1,11 +1,64 @@
-"""Python profiling tools"""
+"""Python profiling tools
+
+Besides the cProfile helpers this module has low overhead instrumentation which can be left in production code,
+named spans and counters are recorded into a per thread ring buffer while instrumentation is enabled and cost a
+single flag check while it's disabled. A statistical sampling profiler thread records the call stacks of every
+thread in the collapsed stack format used by flame graph tools. Both can be toggled at runtime.
+
+.. code-block:: python
+
+    from zoo.libs.utils import profiling
+
+    @profiling.timed()
+    def buildRig(...):
+        with profiling.span("buildRig.skeleton"):
+            ...
+        profiling.increment("buildRig.joints", len(joints))
+
+    profiling.enable()
+    profiling.startSampling()
+    ...
+    profiling.stopSampling().writeCollapsed("/tmp/session.folded")
+    profiling.exportTrace("/tmp/session.json")  # chrome://tracing or speedscope
+    profiling.disable()
+
+Spans can also be enabled at startup by setting the environment variable ZOO_PROFILING=1.
+"""
 
 import cProfile
+import collections
+import json
+import os
+import sys
+import threading
 import time
+import timeit
 from zoo.libs.utils import zlogging
 from functools import wraps
 
-logger = zlogging.zooLogger
+logger = zlogging.LazyLogger(zlogging.zooLogger)
+
+# the number of spans kept per thread, the oldest spans are discarded first
+RING_BUFFER_SIZE = 10000
+SAMPLE_INTERVAL = 0.005
+SAMPLE_MAX_DEPTH = 128
+
+if hasattr(time, "perf_counter_ns"):
+    clockNs = time.perf_counter_ns
+elif hasattr(time, "perf_counter"):
+    def clockNs():
+        """Returns a monotonic clock in nanoseconds"""
+        return int(time.perf_counter() * 1e9)
+else:
+    def clockNs():
+        """Returns the highest resolution clock available in nanoseconds"""
+        return int(timeit.default_timer() * 1e9)
+
+_ENABLED = os.environ.get("ZOO_PROFILING", "0") == "1"
+_LOCAL = threading.local()
+_STATES = []
+_STATES_LOCK = threading.Lock()
+_SAMPLER = None
 
 
 def profileit(name):
@@ -32,12 +85,414 @@ def profileit(name):
 
 
 def fnTimer(function):
+    """Decorator which logs the time the function took at debug level and records a span when instrumentation
+    is enabled.
+    """
+    spanName = "{}.{}".format(function.__module__, function.__name__)
+
     @wraps(function)
     def function_timer(*args, **kwargs):
-        t0 = time.time()
-        result = function(*args, **kwargs)
-        t1 = time.time()
-        logger.debug("Total time running {}: %s seconds".format(function.func_name, str(t1 - t0)))
+        with span(spanName):
+            t0 = clockNs()
+            result = function(*args, **kwargs)
+            t1 = clockNs()
+        logger.debug("Total time running {}: {} seconds", function.__name__, (t1 - t0) / 1e9)
         return result
 
     return function_timer
+
+
+def enable():
+    """Starts recording spans and counters.
+    """
+    global _ENABLED
+    _ENABLED = True
+
+
+def disable():
+    """Stops recording spans and counters, the recorded data is kept until :func:`clear` is called.
+    """
+    global _ENABLED
+    _ENABLED = False
+
+
+def isEnabled():
+    return _ENABLED
+
+
+class _ThreadState(object):
+    """The spans and counters recorded by a single thread.
+    """
+
+    def __init__(self):
+        thread = threading.current_thread()
+        self.threadId = thread.ident
+        self.threadName = thread.name
+        self.spans = collections.deque(maxlen=RING_BUFFER_SIZE)
+        self.counters = collections.defaultdict(int)
+        self.depth = 0
+
+
+def _state():
+    try:
+        return _LOCAL.state
+    except AttributeError:
+        state = _LOCAL.state = _ThreadState()
+        with _STATES_LOCK:
+            _STATES.append(state)
+        return state
+
+
+def _threadStates():
+    with _STATES_LOCK:
+        return list(_STATES)
+
+
+def setBufferSize(size):
+    """Changes the number of spans kept per thread, the most recent spans are kept.
+
+    :type size: int
+    """
+    global RING_BUFFER_SIZE
+    RING_BUFFER_SIZE = size
+    for state in _threadStates():
+        state.spans = collections.deque(state.spans, maxlen=size)
+
+
+def clear():
+    """Removes every recorded span and counter and forgets the threads which have finished.
+    """
+    liveThreads = set(thread.ident for thread in threading.enumerate())
+    with _STATES_LOCK:
+        for state in _STATES:
+            state.spans.clear()
+            state.counters.clear()
+        _STATES[:] = [state for state in _STATES if state.threadId in liveThreads]
+
+
+class Span(object):
+    """Context manager which records the wall time of the block as a named span in the thread's ring buffer.
+
+    :param name: the span name
+    :type name: str
+    """
+    __slots__ = ("name", "start", "duration", "_state")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0
+        self.duration = 0
+        self._state = None
+
+    def __enter__(self):
+        state = self._state = _state()
+        state.depth += 1
+        self.start = clockNs()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = clockNs() - self.start
+        state = self._state
+        state.depth -= 1
+        state.spans.append((self.name, state.threadId, self.start, self.duration, state.depth))
+        return False
+
+
+class _NullSpan(object):
+    """Span returned while instrumentation is disabled.
+    """
+    __slots__ = ()
+    name = None
+    start = 0
+    duration = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Returns a context manager which records the block as a named span while instrumentation is enabled.
+
+    :param name: the span name
+    :type name: str
+    :rtype: :class:`Span`
+    """
+    if not _ENABLED:
+        return _NULL_SPAN
+    return Span(name)
+
+
+def timed(name=None):
+    """Decorator which records every call of the function as a span while instrumentation is enabled.
+
+    :param name: the span name, defaults to module.function
+    :type name: str or None
+    """
+
+    def inner(func):
+        spanName = name or "{}.{}".format(func.__module__, func.__name__)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return func(*args, **kwargs)
+            state = _state()
+            state.depth += 1
+            start = clockNs()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                duration = clockNs() - start
+                state.depth -= 1
+                state.spans.append((spanName, state.threadId, start, duration, state.depth))
+
+        return wrapper
+
+    return inner
+
+
+def increment(name, value=1):
+    """Adds the value to the named counter while instrumentation is enabled.
+
+    :param name: the counter name
+    :type name: str
+    :param value: the amount to add
+    :type value: int or float
+    """
+    if _ENABLED:
+        _state().counters[name] += value
+
+
+def spans():
+    """Returns the recorded spans of every thread ordered by start time.
+
+    :return: (name, threadId, startNs, durationNs, depth) for each span
+    :rtype: list(tuple)
+    """
+    result = []
+    for state in _threadStates():
+        result.extend(list(state.spans))
+    result.sort(key=lambda item: item[2])
+    return result
+
+
+def counters():
+    """Returns the counters summed across every thread.
+
+    :rtype: dict
+    """
+    result = collections.defaultdict(int)
+    for state in _threadStates():
+        for name, value in state.counters.items():
+            result[name] += value
+    return dict(result)
+
+
+def summary():
+    """Returns the count, total and max duration in nanoseconds of the recorded spans per name.
+
+    :return: {name: {"count": int, "totalNs": int, "maxNs": int}}
+    :rtype: dict
+    """
+    result = {}
+    for name, _, _, duration, _ in spans():
+        stats = result.get(name)
+        if stats is None:
+            result[name] = {"count": 1, "totalNs": duration, "maxNs": duration}
+            continue
+        stats["count"] += 1
+        stats["totalNs"] += duration
+        if duration > stats["maxNs"]:
+            stats["maxNs"] = duration
+    return result
+
+
+def exportTrace(filePath):
+    """Writes the recorded spans and counters in the chrome trace event format which can be loaded by
+    chrome://tracing, perfetto or speedscope.
+
+    :param filePath: the json file to write
+    :type filePath: str
+    :return: the number of spans written
+    :rtype: int
+    """
+    pid = os.getpid()
+    events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": state.threadId,
+               "args": {"name": state.threadName}} for state in _threadStates()]
+    recorded = spans()
+    for name, threadId, start, duration, depth in recorded:
+        events.append({"name": name, "ph": "X", "pid": pid, "tid": threadId, "ts": start / 1000.0,
+                       "dur": duration / 1000.0, "args": {"depth": depth}})
+    counterValues = counters()
+    if counterValues:
+        events.append({"name": "counters", "ph": "C", "pid": pid, "tid": 0,
+                       "ts": clockNs() / 1000.0, "args": counterValues})
+    with open(filePath, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    logger.debug("Exported {} spans to {}", len(recorded), filePath)
+    return len(recorded)
+
+
+class SamplingProfiler(object):
+    """Statistical profiler which samples the call stack of every thread on a background thread.
+
+    The samples are stored as collapsed stacks, the root frame first with frames separated by ";", which is
+    the input format of flamegraph.pl, speedscope and inferno.
+
+    :param interval: seconds between samples
+    :type interval: float
+    :param maxDepth: the max number of frames kept per stack, the frames nearest the root are dropped
+    :type maxDepth: int
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, maxDepth=SAMPLE_MAX_DEPTH):
+        self.interval = interval
+        self.maxDepth = maxDepth
+        self.sampleCount = 0
+        self._stacks = collections.defaultdict(int)
+        self._labels = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.isRunning():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ZooSamplingProfiler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if not self.isRunning():
+            return
+        self._running = False
+        self._thread.join()
+        self._thread = None
+
+    def clear(self):
+        with self._lock:
+            self._stacks.clear()
+            self.sampleCount = 0
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = "{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename),
+                                                             code.co_firstlineno)
+        return label
+
+    def _run(self):
+        ownId = threading.current_thread().ident
+        names = {}
+        while True:
+            # python 2 Event.wait polls with a coarse delay, sleep keeps the interval accurate
+            time.sleep(self.interval)
+            if not self._running:
+                break
+            self.sample(ownId, names)
+
+    def sample(self, ignoreThreadId=None, threadNames=None):
+        """Records the current call stack of every thread.
+
+        :param ignoreThreadId: the thread to skip, the sampling thread itself
+        :type ignoreThreadId: int or None
+        :param threadNames: thread id to name cache
+        :type threadNames: dict or None
+        """
+        if threadNames is None:
+            threadNames = {}
+        frames = sys._current_frames()
+        stacks = []
+        for threadId, frame in frames.items():
+            if threadId == ignoreThreadId:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.maxDepth:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            threadName = threadNames.get(threadId)
+            if threadName is None:
+                threadName = threadNames[threadId] = _threadName(threadId)
+            labels.append(threadName)
+            labels.reverse()
+            stacks.append(";".join(labels))
+        del frames
+        with self._lock:
+            for stack in stacks:
+                self._stacks[stack] += 1
+            self.sampleCount += 1
+
+    def stacks(self):
+        """Returns the number of samples per collapsed stack.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._stacks)
+
+    def collapsedStacks(self):
+        """Returns the samples in the collapsed stack format, one "frame;frame;frame count" line per stack.
+
+        :rtype: list(str)
+        """
+        return ["{} {}".format(stack, count) for stack, count in sorted(self.stacks().items())]
+
+    def writeCollapsed(self, filePath):
+        """Writes the collapsed stacks to a file for flamegraph.pl, speedscope or inferno.
+
+        :param filePath: the output file path
+        :type filePath: str
+        """
+        with open(filePath, "w") as f:
+            for line in self.collapsedStacks():
+                f.write(line + "\n")
+        logger.debug("Wrote {} samples to {}", self.sampleCount, filePath)
+
+
+def _threadName(threadId):
+    for thread in threading.enumerate():
+        if thread.ident == threadId:
+            return thread.name
+    return "thread-{}".format(threadId)
+
+
+def samplingProfiler():
+    """Returns the shared sampling profiler or None if sampling hasn't been started.
+
+    :rtype: :class:`SamplingProfiler` or None
+    """
+    return _SAMPLER
+
+
+def startSampling(interval=SAMPLE_INTERVAL, maxDepth=SAMPLE_MAX_DEPTH):
+    """Starts the shared sampling profiler, the previous samples are discarded.
+
+    :param interval: seconds between samples
+    :type interval: float
+    :rtype: :class:`SamplingProfiler`
+    """
+    global _SAMPLER
+    stopSampling()
+    _SAMPLER = SamplingProfiler(interval, maxDepth)
+    _SAMPLER.start()
+    return _SAMPLER
+
+
+def stopSampling():
+    """Stops the shared sampling profiler, the samples are kept until sampling is started again.
+
+    :rtype: :class:`SamplingProfiler` or None
+    """
+    if _SAMPLER is not None:
+        _SAMPLER.stop()
+    return _SAMPLER
@@ -1,6 +1,6 @@
 import threading
 
-import shutil
+from zoo.libs.utils import filesystem
 
 
 class Threaded(object):
@@ -43,13 +43,16 @@ class Threaded(object):
         return wrapper
 
 
-def threadedCopy(filepaths):
+def threadedCopy(filepaths, **kwargs):
     """Copies a set of files in a separate thread.
 
     Uses the :class:`CopyThread` class.
 
     :param filepaths: is a list of (from_path, to_path) pairs.
     :type filepaths: list(str)
+    :param kwargs: extra arguments for :func:`zoo.libs.utils.filesystem.copyFiles` eg. processes, progress
+    :return: the started copy thread, join it to wait for the copy to finish.
+    :rtype: :class:`CopyThread`
 
     .. code-block:: python
 
@@ -57,18 +60,26 @@ def threadedCopy(filepaths):
         ('C:/src/path1.txt', 'C:/destination/path1.txt'),
         ('C:/src/path2.txt', 'C:/destination/path2.txt')]
         threadedCopy(paths)
+        # only copy the files which changed since the last copy
+        threadedCopy(paths, skip="stat")
 
 
     """
-    CopyThread(filepaths).start()
+    thread = CopyThread(filepaths, **kwargs)
+    thread.start()
+    return thread
 
 
 class CopyThread(threading.Thread):
-    def __init__(self, filepaths):
+    """Copies the files in the background using :func:`zoo.libs.utils.filesystem.copyFiles`, once finished
+    the copy manifest is available from the manifest attribute.
+    """
+
+    def __init__(self, filepaths, **kwargs):
         super(CopyThread, self).__init__()
         self.filepaths = filepaths
+        self.copyKwargs = kwargs
+        self.manifest = []
 
     def run(self):
-        for paths in self.filepaths:
-            src, dst = paths
-            shutil.copyfile(src, dst)
+        self.manifest = filesystem.copyFiles(self.filepaths, **self.copyKwargs)
@@ -1,44 +1,429 @@
+import Queue
+import atexit
 import datetime
+import json
 import logging
+import logging.handlers
 import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
 
 import jsonlogger
 from zoo.libs.utils import classtypes
 
 CENTRAL_LOGGER_NAME = "zoocore"
 
+# queue full policies for AsyncLogHandler
+QUEUE_BLOCK = "block"
+QUEUE_DROP_NEWEST = "dropNewest"
+QUEUE_DROP_OLDEST = "dropOldest"
+
+# bumped whenever logger levels change so LazyLogger level caches are rebuilt
+_LEVEL_GENERATION = 0
+
 
 class ZooJsonFormatter(jsonlogger.JsonFormatter):
     """Overrriding the addFields since the timestamp is using utcnow instead of the local timezone.
     We also add support for static fields passed into the __init__
+
+    With the default serializer the static extra fields are serialized once and spliced into every record,
+    the record is encoded with a single reused encoder which uses simplejson when it's installed. Unless
+    orderedFields is True the fields are collected in a plain dict so they aren't written in format order.
     """
 
     def __init__(self,
                  fmt="%(message)",
                  datefmt="%Y-%m-%dT%H:%M:%SZ%z",
                  style='%',
-                 extra={}, *args, **kwargs):
+                 extra={}, orderedFields=False, *args, **kwargs):
         """
         :note: see :class:`jsonlogger.JsonFormatter` for information on arguments
 
         :param extra: static fields to pass to all records
         :type extra: dict
+        :param orderedFields: if True the fields are written in the format order which is slower
+        :type orderedFields: bool
         """
         self._extra = extra
+        self.orderedFields = orderedFields
         jsonlogger.JsonFormatter.__init__(self, fmt=fmt, datefmt=datefmt, *args, **kwargs)
+        self._skipFieldSet = frozenset(self._skip_fields)
+        self._encoder = None
+        defaultSerializer = self.json_serializer is json.dumps and self.json_default is None
+        if defaultSerializer and self.json_encoder is jsonlogger.JsonEncoder:
+            self._encoder = _createJsonEncoder(self.json_indent, self.json_ensure_ascii)
+        self.setExtra(extra)
+
+    def setExtra(self, extra):
+        """Sets the static fields added to all records.
+
+        :param extra: static fields to pass to all records
+        :type extra: dict
+        """
+        self._extra = extra
+        self._extraKeys = tuple(extra)
+        self._extraJson = None
+        if extra and self._encoder is not None and self.json_indent is None:
+            self._extraJson = self._encoder.encode(extra)[1:-1]
 
     def add_fields(self, log_record, record, message_dict):
+        recordDict = record.__dict__
         for field in self._required_fields:
-            log_record[field] = record.__dict__.get(field)
-        log_record.update(message_dict)
-        jsonlogger.merge_record_extra(record, log_record, reserved=self._skip_fields)
+            log_record[field] = recordDict.get(field)
+        for key, value in message_dict.iteritems():
+            log_record[key] = value
+        skipFields = self._skipFieldSet
+        for key, value in recordDict.iteritems():
+            # this allows to have numeric keys
+            if key not in skipFields and not (hasattr(key, "startswith") and key.startswith("_")):
+                log_record[key] = value
 
         if self.timestamp:
             key = self.timestamp if type(self.timestamp) == str else 'timestamp'
             log_record[key] = datetime.datetime.now().isoformat()
-        # add all the static extra fields into the record
-        for key, value in self._extra.items():
-            log_record[key] = value
+        if self._extraJson is None:
+            # add all the static extra fields into the record
+            for key, value in self._extra.items():
+                log_record[key] = value
+        else:
+            # the pre-serialized static fields are added by jsonify_log_record and take precedence
+            for key in self._extraKeys:
+                if key in log_record:
+                    del log_record[key]
+
+    def format(self, record):
+        if self.orderedFields:
+            return jsonlogger.JsonFormatter.format(self, record)
+        message_dict = {}
+        if isinstance(record.msg, dict):
+            message_dict = record.msg
+            record.message = None
+        else:
+            record.message = record.getMessage()
+        # only format time if needed
+        if "asctime" in self._required_fields:
+            record.asctime = self.formatTime(record, self.datefmt)
+
+        # Display formatted exception, but allow overriding it in the
+        # user-supplied dict.
+        if record.exc_info and not message_dict.get('exc_info'):
+            message_dict['exc_info'] = self.formatException(record.exc_info)
+        if not message_dict.get('exc_info') and record.exc_text:
+            message_dict['exc_info'] = record.exc_text
+
+        log_record = {}
+        self.add_fields(log_record, record, message_dict)
+        log_record = self.process_log_record(log_record)
+        return "%s%s" % (self.prefix, self.jsonify_log_record(log_record))
+
+    def jsonify_log_record(self, log_record):
+        if self._encoder is None:
+            return jsonlogger.JsonFormatter.jsonify_log_record(self, log_record)
+        text = self._encoder.encode(log_record)
+        if self._extraJson is None:
+            return text
+        if not log_record:
+            return "{" + self._extraJson + "}"
+        return "".join((text[:-1], ", ", self._extraJson, "}"))
+
+
+def _createJsonEncoder(indent=None, ensureAscii=True):
+    """Returns a reusable encoder which encodes the same way as :class:`jsonlogger.JsonEncoder`.
+    """
+    if simplejson is not None:
+        # simplejson encodes namedtuples as objects by default, json encodes them as arrays
+        return simplejson.JSONEncoder(default=jsonlogger.JsonEncoder().default, indent=indent,
+                                      ensure_ascii=ensureAscii, namedtuple_as_object=False,
+                                      tuple_as_array=True)
+    return jsonlogger.JsonEncoder(indent=indent, ensure_ascii=ensureAscii)
+
+
+class BatchRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler which flushes the stream once per batch of records instead of once per record.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._batching = False
+        logging.handlers.RotatingFileHandler.__init__(self, *args, **kwargs)
+
+    def flush(self):
+        if not self._batching:
+            logging.handlers.RotatingFileHandler.flush(self)
+
+    def handleBatch(self, records):
+        """Writes the records and flushes the stream once.
+
+        :type records: list(:class:`logging.LogRecord`)
+        """
+        self._batching = True
+        try:
+            for record in records:
+                self.handle(record)
+        finally:
+            self._batching = False
+            self.flush()
+
+
+class QueueListener(object):
+    """Background thread which takes records off a queue and passes them in batches to the handlers.
+
+    Handlers with a handleBatch method(see :class:`BatchRotatingFileHandler`) receive the whole batch, every
+    other handler receives the records one by one and is flushed once per batch. Exceptions raised by a
+    handler are reported with :meth:`logging.Handler.handleError` and the listener carries on.
+
+    :param queue: the queue the records are taken from
+    :type queue: :class:`Queue.Queue`
+    :param handlers: the handlers which format and write the records
+    :type handlers: list(:class:`logging.Handler`)
+    :param batchSize: the max number of records written per batch
+    :type batchSize: int
+    :param flushInterval: seconds to wait for the first record of a batch
+    :type flushInterval: float
+    """
+    _sentinel = object()
+
+    def __init__(self, queue, handlers, batchSize=256, flushInterval=0.5):
+        self.queue = queue
+        self.handlers = list(handlers)
+        self.batchSize = batchSize
+        self.flushInterval = flushInterval
+        self.droppedCount = 0
+        self._reportedDrops = 0
+        self._thread = None
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.isRunning():
+            return
+        self._thread = threading.Thread(target=self._run, name="ZooLogQueueListener")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Writes every queued record then stops the thread.
+
+        :param timeout: max seconds to wait for the queue to drain, None waits until it's empty
+        :type timeout: float or None
+        """
+        if not self.isRunning():
+            return
+        self.queue.put(self._sentinel)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        running = True
+        while running:
+            try:
+                record = self.queue.get(True, self.flushInterval)
+            except Queue.Empty:
+                continue
+            batch = []
+            count = 1
+            while True:
+                if record is self._sentinel:
+                    running = False
+                    break
+                batch.append(record)
+                if len(batch) >= self.batchSize:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except Queue.Empty:
+                    break
+                count += 1
+            try:
+                self.handleBatch(batch)
+            except Exception:
+                # keep the thread alive, producers blocked on a full queue would otherwise wait forever
+                if sys.stderr:
+                    traceback.print_exc(None, sys.stderr)
+            finally:
+                for _ in xrange(count):
+                    self.queue.task_done()
+
+    def _droppedRecord(self):
+        dropped = self.droppedCount - self._reportedDrops
+        if dropped <= 0:
+            return
+        self._reportedDrops += dropped
+        return logging.LogRecord(CENTRAL_LOGGER_NAME, logging.WARNING, __file__, 0,
+                                 "Logging queue full, dropped %d log records", (dropped,), None)
+
+    def handleBatch(self, records):
+        dropRecord = self._droppedRecord()
+        if dropRecord is not None:
+            records = [dropRecord] + records
+        if not records:
+            return
+        for handler in self.handlers:
+            handlerRecords = [record for record in records if record.levelno >= handler.level]
+            if not handlerRecords:
+                continue
+            record = handlerRecords[0]
+            try:
+                if hasattr(handler, "handleBatch"):
+                    handler.handleBatch(handlerRecords)
+                    continue
+                for record in handlerRecords:
+                    handler.handle(record)
+                handler.flush()
+            except Exception:
+                # a failing handler loses the rest of its batch but doesn't stop the other handlers
+                handler.handleError(record)
+
+
+class AsyncLogHandler(logging.Handler):
+    """Handler which puts records on a queue so the calling thread doesn't format or write them, a single
+    :class:`QueueListener` thread passes them to the wrapped handlers.
+
+    When the queue is full the policy decides what happens, QUEUE_BLOCK waits for space(up to blockTimeout
+    seconds then drops the record), QUEUE_DROP_NEWEST drops the new record and QUEUE_DROP_OLDEST drops the
+    oldest queued record. Dropped records are counted and reported as a warning by the listener.
+
+    Every open handler is closed at exit which writes all of the queued records.
+
+    :param handlers: the handlers which format and write the records
+    :type handlers: list(:class:`logging.Handler`)
+    :param maxSize: the max number of queued records, 0 for unbounded
+    :type maxSize: int
+    :param policy: QUEUE_BLOCK, QUEUE_DROP_NEWEST or QUEUE_DROP_OLDEST
+    :type policy: str
+    :param batchSize: the max number of records written per batch
+    :type batchSize: int
+    :param flushInterval: seconds the listener waits for the first record of a batch
+    :type flushInterval: float
+    :param blockTimeout: max seconds to wait for space with the QUEUE_BLOCK policy, None waits forever
+    :type blockTimeout: float or None
+    """
+
+    def __init__(self, handlers, maxSize=10000, policy=QUEUE_DROP_NEWEST, batchSize=256, flushInterval=0.5,
+                 blockTimeout=None, level=logging.NOTSET):
+        if policy not in (QUEUE_BLOCK, QUEUE_DROP_NEWEST, QUEUE_DROP_OLDEST):
+            raise ValueError("Unknown queue policy: {}".format(policy))
+        logging.Handler.__init__(self, level)
+        self.policy = policy
+        self.blockTimeout = blockTimeout
+        self.queue = Queue.Queue(maxSize)
+        self.listener = QueueListener(self.queue, handlers, batchSize=batchSize, flushInterval=flushInterval)
+        self._dropLock = threading.Lock()
+        self.listener.start()
+        _ASYNC_HANDLERS.add(self)
+
+    @property
+    def handlers(self):
+        return self.listener.handlers
+
+    @property
+    def droppedCount(self):
+        return self.listener.droppedCount
+
+    def prepare(self, record):
+        """Merges the message arguments into the message so the record no longer references mutable arguments
+        which may change before the listener formats it.
+        """
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def _drop(self):
+        with self._dropLock:
+            self.listener.droppedCount += 1
+
+    def enqueue(self, record):
+        queue = self.queue
+        try:
+            if self.policy == QUEUE_BLOCK:
+                queue.put(record, True, self.blockTimeout)
+            else:
+                queue.put_nowait(record)
+            return
+        except Queue.Full:
+            if self.policy != QUEUE_DROP_OLDEST:
+                self._drop()
+                return
+        try:
+            oldest = queue.get_nowait()
+            queue.task_done()
+        except Queue.Empty:
+            oldest = None
+        if oldest is QueueListener._sentinel:
+            # the listener is stopping, don't swallow the stop request
+            queue.put(oldest)
+            self._drop()
+            return
+        self._drop()
+        try:
+            queue.put_nowait(record)
+        except Queue.Full:
+            self._drop()
+
+    def emit(self, record):
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self, timeout=None):
+        """Blocks until every queued record has been written.
+
+        :param timeout: max seconds to wait, None waits until the queue is empty
+        :type timeout: float or None
+        :return: True if the queue was drained
+        :rtype: bool
+        """
+        if not self.listener.isRunning():
+            return self.queue.unfinished_tasks == 0
+        endTime = None if timeout is None else time.time() + timeout
+        condition = self.queue.all_tasks_done
+        with condition:
+            while self.queue.unfinished_tasks:
+                if endTime is None:
+                    # wake up periodically so a stopped listener can't hang the caller
+                    condition.wait(self.listener.flushInterval)
+                    if not self.listener.isRunning():
+                        break
+                    continue
+                remaining = endTime - time.time()
+                if remaining <= 0:
+                    break
+                condition.wait(remaining)
+            return self.queue.unfinished_tasks == 0
+
+    def close(self):
+        """Writes the queued records, stops the listener and closes the wrapped handlers.
+        """
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        _ASYNC_HANDLERS.discard(self)
+        logging.Handler.close(self)
+
+
+_ASYNC_HANDLERS = weakref.WeakSet()
+
+
+def _closeAsyncHandlers():
+    for handler in list(_ASYNC_HANDLERS):
+        try:
+            handler.close()
+        except Exception:
+            pass
+
+
+# registered after logging's own shutdown hook so it runs first
+atexit.register(_closeAsyncHandlers)
 
 
 class CentralLogManager(object):
@@ -84,6 +469,7 @@ class CentralLogManager(object):
             log = self.logs[loggerName]
             if log.level != level:
                 log.setLevel(level)
+                invalidateLevelCache()
 
     def addRotateHandler(self, loggerName, filePath):
         logger = self.logs.get(loggerName)
@@ -95,6 +481,45 @@ class CentralLogManager(object):
         logger.addHandler(handler)
         return logger
 
+    def addAsyncHandler(self, loggerName, handlers, **kwargs):
+        """Adds an :class:`AsyncLogHandler` to the logger which writes the records to the handlers on a
+        background thread.
+
+        :param loggerName: The logger instance name.
+        :type loggerName: str
+        :param handlers: the handlers which format and write the records
+        :type handlers: list(:class:`logging.Handler`)
+        :param kwargs: see :class:`AsyncLogHandler`
+        :return: the async handler or None if the logger isn't managed
+        :rtype: :class:`AsyncLogHandler` or None
+        """
+        logger = self.logs.get(loggerName)
+        if not logger:
+            return
+        handler = AsyncLogHandler(handlers, **kwargs)
+        logger.addHandler(handler)
+        return handler
+
+    def addAsyncRotateHandler(self, loggerName, filePath, maxBytes=1.5e6, backupCount=5, extra=None, **kwargs):
+        """Adds a queued json rotating file handler to the logger, the records are formatted with
+        :class:`ZooJsonFormatter` and written in batches on a background thread.
+
+        :param loggerName: The logger instance name.
+        :type loggerName: str
+        :param filePath: the log file path
+        :type filePath: str
+        :param extra: static fields to add to all records
+        :type extra: dict
+        :param kwargs: see :class:`AsyncLogHandler`
+        :return: the async handler or None if the logger isn't managed
+        :rtype: :class:`AsyncLogHandler` or None
+        """
+        if loggerName not in self.logs:
+            return
+        fileHandler = BatchRotatingFileHandler(filePath, maxBytes=maxBytes, backupCount=backupCount)
+        fileHandler.setFormatter(ZooJsonFormatter(self.jsonFormatter, extra=extra or {}))
+        return self.addAsyncHandler(loggerName, [fileHandler], **kwargs)
+
     def addShellHandler(self, loggerName):
         logger = self.logs.get(loggerName)
         if not loggerName:
@@ -135,27 +560,154 @@ def getLogger(name):
     return logger
 
 
+def getLazyLogger(name):
+    """Returns a :class:`LazyLogger` for the logger name, see :func:`getLogger`.
+
+    :param name: the logger name
+    :type name: str
+    :rtype: :class:`LazyLogger`
+    """
+    return LazyLogger(getLogger(name))
+
+
+def invalidateLevelCache():
+    """Clears every :class:`LazyLogger` level cache, this is called by :meth:`CentralLogManager.changeLevel`
+    and :meth:`LazyLogger.setLevel`, call it after changing a level directly with :meth:`logging.Logger.setLevel`.
+    """
+    global _LEVEL_GENERATION
+    _LEVEL_GENERATION += 1
+
+
+class _BraceMessage(object):
+    """Log message which is formatted with str.format when the record is formatted.
+    """
+    __slots__ = ("msg", "args")
+
+    def __init__(self, msg, args):
+        self.msg = msg
+        self.args = args
+
+    def __str__(self):
+        return str(self.msg).format(*self.args)
+
+
+class LazyLogger(object):
+    """Wraps a logger so messages are only formatted when the level is enabled and a handler writes them.
+
+    The message arguments use str.format style and are passed separately instead of calling format at the
+    call site, whether a level is enabled is cached until :func:`invalidateLevelCache` is called.
+
+    .. code-block:: python
+
+        logger = LazyLogger(zlogging.zooLogger)
+        # free when debug logging is off
+        logger.debug("registering plugin -> {}", name)
+
+    :param logger: the logger to wrap
+    :type logger: :class:`logging.Logger`
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self._enabled = {}
+        self._generation = _LEVEL_GENERATION
+
+    def __getattr__(self, name):
+        return getattr(self.logger, name)
+
+    def setLevel(self, level):
+        """Sets the level of the wrapped logger and invalidates the level caches.
+
+        :param level: the logging level
+        :type level: int
+        """
+        self.logger.setLevel(level)
+        invalidateLevelCache()
+
+    def isEnabledFor(self, level):
+        if self._generation != _LEVEL_GENERATION:
+            self._enabled = {}
+            self._generation = _LEVEL_GENERATION
+        try:
+            return self._enabled[level]
+        except KeyError:
+            enabled = self._enabled[level] = self.logger.isEnabledFor(level)
+            return enabled
+
+    def _log(self, level, msg, args, exc_info=None, extra=None):
+        # the caller of the public logging method, Logger.findCaller would find this module instead
+        frame = sys._getframe(2)
+        code = frame.f_code
+        if exc_info and not isinstance(exc_info, tuple):
+            exc_info = sys.exc_info()
+        logger = self.logger
+        record = logger.makeRecord(logger.name, level, code.co_filename, frame.f_lineno,
+                                   _BraceMessage(msg, args) if args else msg, (), exc_info, code.co_name, extra)
+        logger.handle(record)
+
+    def debug(self, msg, *args, **kwargs):
+        if self.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, msg, args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        if self.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, msg, args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        if self.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, msg, args, **kwargs)
+
+    warn = warning
+
+    def error(self, msg, *args, **kwargs):
+        if self.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, msg, args, **kwargs)
+
+    def exception(self, msg, *args, **kwargs):
+        if self.isEnabledFor(logging.ERROR):
+            kwargs["exc_info"] = True
+            self._log(logging.ERROR, msg, args, **kwargs)
+
+    def critical(self, msg, *args, **kwargs):
+        if self.isEnabledFor(logging.CRITICAL):
+            self._log(logging.CRITICAL, msg, args, **kwargs)
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.isEnabledFor(level):
+            self._log(level, msg, args, **kwargs)
+
+
 def globalLogLevelOverride(logger):
     globalLoggingLevel = os.environ.get("ZOO_LOG_LEVEL", "INFO")
-    envLvl = levelsDict()[globalLoggingLevel]
+    envLvl = _envLevel(globalLoggingLevel)
     currentLevel = logger.getEffectiveLevel()
 
     if not currentLevel or currentLevel != envLvl:
         logger.setLevel(envLvl)
+        invalidateLevelCache()
+
+
+_ENV_LEVELS = {}
+
+
+def _envLevel(levelName):
+    try:
+        return _ENV_LEVELS[levelName]
+    except KeyError:
+        level = _ENV_LEVELS[levelName] = levelsDict()[levelName]
+        return level
 
 
 def reloadLoggerHierarchy():
-    for log in logging.Logger.manager.loggingDict.values():
+    children = {}
+    for log in logging.Logger.manager.loggerDict.values():
         if hasattr(log, "children"):
             del log.children
-    for name, log in logging.Logger.manager.loggingDict.items():
-        if not isinstance(log, logging.Logger):
-            continue
-        try:
-            if log not in log.parent.children:
-                log.parent.children.append(log)
-        except AttributeError:
-            log.parent.children = [log]
+        if isinstance(log, logging.Logger) and log.parent is not None:
+            children.setdefault(log.parent, []).append(log)
+    for parent, logs in children.items():
+        parent.children = logs
+    invalidateLevelCache()
 
 
 zooLogger = getLogger(CENTRAL_LOGGER_NAME)